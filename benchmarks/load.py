@@ -0,0 +1,367 @@
+"""
+Load Benchmark
+
+Drives a mixed workload against the whole application, booted offline (see
+benchmarks.offline), and reports throughput and latency percentiles per
+operation.
+
+Every virtual user logs in once and then sends requests back to back, picking
+operations by weight. Reads favour a small set of popular images, as real
+traffic does; writes create comments, ratings, tags and images. Requests run
+in process through the ASGI interface, so the numbers measure the application,
+the database and Redis, not the network.
+
+A warm-up phase fills the caches before measuring. Results can be saved as
+JSON to compare two versions of the code.
+
+Usage:
+    python -m benchmarks.load [--requests 1000] [--concurrency 16]
+        [--database-url postgresql+asyncpg://...] [--redis-url redis://...]
+        [--json results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+import httpx
+
+from benchmarks.offline import PASSWORD, Dataset, Volumes, login, offline_app
+
+
+@dataclass
+class VirtualUser:
+    headers: dict[str, str]
+    email: str
+    rng: random.Random
+    dataset: Dataset
+    comments: int
+    etags: dict[str, str]
+
+    def image(self) -> int:
+        if self.rng.random() < 0.7:
+            return self.rng.choice(self.dataset.popular_images)
+        return self.rng.choice(self.dataset.images)
+
+    def tags(self, count: int) -> list[str]:
+        # Popular tags are at the start of the list.
+        head = self.dataset.tags[: max(count, len(self.dataset.tags) // 10)]
+        return self.rng.sample(head, count)
+
+
+Operation = Callable[[httpx.AsyncClient, VirtualUser], Awaitable[httpx.Response]]
+
+
+async def get_image(client, user):
+    return await client.get(f"/api/image/{user.image()}", headers=user.headers)
+
+
+async def get_image_conditional(client, user):
+    url = f"/api/image/{user.image()}"
+    headers = dict(user.headers)
+    if url in user.etags:
+        headers["If-None-Match"] = user.etags[url]
+    response = await client.get(url, headers=headers)
+    if "etag" in response.headers:
+        user.etags[url] = response.headers["etag"]
+    return response
+
+
+async def get_comment_page(client, user):
+    return await client.get(
+        f"/api/comment/by-image/{user.image()}",
+        params={"limit": 20},
+        headers=user.headers,
+    )
+
+
+async def get_comment(client, user):
+    comment_id = user.rng.randint(1, user.comments)
+    return await client.get(f"/api/comment/{comment_id}", headers=user.headers)
+
+
+async def create_comment(client, user):
+    return await client.post(
+        "/api/comment/create",
+        json={"image_id": user.image(), "text": "benchmark comment " * 4},
+        headers=user.headers,
+    )
+
+
+async def search_tags(client, user):
+    first, *rest = user.tags(3)
+    return await client.get(
+        "/api/tag/search",
+        params={"all": first, "any": rest, "limit": 20},
+        headers=user.headers,
+    )
+
+
+async def top_tags(client, user):
+    return await client.get("/api/tag/top", headers=user.headers)
+
+
+async def create_tags(client, user):
+    names = user.tags(2) + [f"bench{user.rng.randint(1, 500)}"]
+    return await client.post(
+        "/api/tag/create",
+        json={"image_id": user.image(), "names": names},
+        headers=user.headers,
+    )
+
+
+async def rating_summary(client, user):
+    image_ids = [user.image() for _ in range(10)]
+    return await client.get(
+        "/api/rating/summary", params={"image_ids": image_ids}, headers=user.headers
+    )
+
+
+async def create_rating(client, user):
+    return await client.post(
+        "/api/rating/create",
+        json={"image_id": user.image(), "value": user.rng.randint(1, 5)},
+        headers=user.headers,
+    )
+
+
+async def top_images(client, user):
+    return await client.get("/api/ranking/top", headers=user.headers)
+
+
+async def current_user(client, user):
+    return await client.get("/user/me", headers=user.headers)
+
+
+async def log_in(client, user):
+    return await client.post(
+        "/auth/jwt/login",
+        data={"username": user.email, "password": PASSWORD},
+    )
+
+
+async def create_image(client, user):
+    return await client.post(
+        "/api/image/create",
+        data={"title": "benchmark"},
+        files={"image_file": ("bench.jpg", os.urandom(64 * 1024), "image/jpeg")},
+        headers=user.headers,
+    )
+
+
+async def transform_image(client, user):
+    return await client.post(
+        f"/api/image/transform/{user.image()}",
+        json={"rotation": {"angle": 90}, "scale": {"Width": 400, "Height": 300}},
+        headers=user.headers,
+    )
+
+
+OPERATIONS: dict[str, tuple[int, Operation]] = {
+    "image.get": (25, get_image),
+    "image.get_conditional": (5, get_image_conditional),
+    "image.create": (2, create_image),
+    "image.transform": (1, transform_image),
+    "comment.page": (15, get_comment_page),
+    "comment.get": (5, get_comment),
+    "comment.create": (5, create_comment),
+    "tag.search": (10, search_tags),
+    "tag.top": (4, top_tags),
+    "tag.create": (3, create_tags),
+    "rating.summary": (8, rating_summary),
+    "rating.create": (5, create_rating),
+    "ranking.top": (5, top_images),
+    "auth.me": (5, current_user),
+    "auth.login": (1, log_in),
+}
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    """
+    Return the nearest-rank percentile of sorted values.
+
+    :param ordered: list[float]: The values, sorted.
+    :param q: float: The percentile, 0-100.
+    :return: The percentile, or 0 without values.
+    """
+    if not ordered:
+        return 0.0
+    rank = max(1, round(q / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.first_error: dict[str, str] = {}
+
+    def record(self, name: str, seconds: float, response: httpx.Response) -> None:
+        self.latencies[name].append(seconds)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+            self.first_error.setdefault(
+                name, f"{response.status_code} {response.text[:200]}"
+            )
+
+    def summary(self, elapsed: float) -> dict:
+        operations = {}
+        everything = []
+        for name in sorted(self.latencies):
+            ordered = sorted(self.latencies[name])
+            everything.extend(ordered)
+            operations[name] = {
+                "requests": len(ordered),
+                "errors": self.errors[name],
+                "p50_ms": percentile(ordered, 50) * 1000,
+                "p95_ms": percentile(ordered, 95) * 1000,
+                "p99_ms": percentile(ordered, 99) * 1000,
+                "max_ms": ordered[-1] * 1000,
+            }
+        everything.sort()
+        return {
+            "elapsed_s": elapsed,
+            "requests": len(everything),
+            "errors": sum(self.errors.values()),
+            "throughput_rps": len(everything) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(everything, 50) * 1000,
+            "p95_ms": percentile(everything, 95) * 1000,
+            "p99_ms": percentile(everything, 99) * 1000,
+            "operations": operations,
+        }
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    users: list[VirtualUser],
+    requests: int,
+    recorder: Recorder | None,
+) -> float:
+    """
+    Send a number of requests from all virtual users concurrently.
+
+    :param client: httpx.AsyncClient: The client of the application.
+    :param users: list[VirtualUser]: The virtual users.
+    :param requests: int: The total number of requests.
+    :param recorder: Recorder | None: Where to record latencies; None for a warm-up.
+    :return: The elapsed time in seconds.
+    """
+    names = list(OPERATIONS)
+    weights = [OPERATIONS[name][0] for name in names]
+    remaining = requests
+
+    async def run(user: VirtualUser) -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            name = user.rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            response = await OPERATIONS[name][1](client, user)
+            if recorder is not None:
+                recorder.record(name, time.perf_counter() - started, response)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run(user) for user in users))
+    return time.perf_counter() - started
+
+
+def report(summary: dict, first_error: dict[str, str]) -> None:
+    print(
+        f"{'operation':24} {'requests':>8} {'errors':>6} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    )
+    for name, row in summary["operations"].items():
+        print(
+            f"{name:24} {row['requests']:8} {row['errors']:6} {row['p50_ms']:8.2f} "
+            f"{row['p95_ms']:8.2f} {row['p99_ms']:8.2f} {row['max_ms']:8.2f}"
+        )
+    print(
+        f"{'all':24} {summary['requests']:8} {summary['errors']:6} "
+        f"{summary['p50_ms']:8.2f} {summary['p95_ms']:8.2f} {summary['p99_ms']:8.2f}"
+    )
+    print(
+        f"\n{summary['throughput_rps']:.1f} requests/s "
+        f"over {summary['elapsed_s']:.2f} s"
+    )
+    for name, error in first_error.items():
+        print(f"first error of {name}: {error}")
+
+
+async def wait_for_tag_index(timeout: float = 30.0) -> None:
+    from src.tag.index import tag_index
+
+    deadline = time.monotonic() + timeout
+    while not tag_index.ready and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    volumes = Volumes(
+        users=args.users,
+        images=args.images,
+        comments=args.comments,
+        ratings=args.ratings,
+        tags=args.tags,
+        seed=args.seed,
+    )
+    async with offline_app(volumes, args.database_url, args.redis_url) as env:
+        dataset = env.dataset
+        print(
+            f"seeded {len(dataset.users)} users, {len(dataset.images)} images, "
+            f"{args.comments} comments, {args.ratings} ratings "
+            f"in {dataset.seconds:.1f} s"
+        )
+        async with env.client() as client:
+            users = []
+            for n in range(args.concurrency):
+                _, email = dataset.users[n % len(dataset.users)]
+                users.append(
+                    VirtualUser(
+                        headers=await login(client, email),
+                        email=email,
+                        rng=random.Random(args.seed * 1000 + n),
+                        dataset=dataset,
+                        comments=args.comments,
+                        etags={},
+                    )
+                )
+            await wait_for_tag_index()
+            await drive(client, users, args.warmup, None)
+            recorder = Recorder()
+            elapsed = await drive(client, users, args.requests, recorder)
+    summary = recorder.summary(elapsed)
+    summary["config"] = vars(args)
+    report(summary, recorder.first_error)
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--images", type=int, default=1000)
+    parser.add_argument("--comments", type=int, default=20000)
+    parser.add_argument("--ratings", type=int, default=8000)
+    parser.add_argument("--tags", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database-url", help="default: a temporary SQLite file")
+    parser.add_argument("--redis-url", help="default: fakeredis")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(summary, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Micro Benchmarks
+
+Times single functions on the hot paths of the write routes, outside of HTTP:
+
+- AccessService: the permission check run by every write route;
+- RatingQuery._update_average_rating: the aggregate, commit, cache
+  invalidation and ranking update after every vote, for images with few and
+  with many ratings;
+- TagRepository.create: attaching known tags, creating new tags and attaching
+  tags that are already attached.
+
+The database functions run against the offline environment of
+benchmarks.offline, one session per call as in a request.
+
+Usage:
+    python -m benchmarks.micro [--repeat 300] [--database-url ...] [--redis-url ...]
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Awaitable, Callable
+
+from fastapi import HTTPException
+
+from benchmarks.load import percentile
+from benchmarks.offline import Volumes, offline_app
+from src.auth.utils.access import access_service
+from src.database.cache.redis_conn import cache_database
+from src.database.sql.models import Image, Permission, User
+from src.database.sql.postgres import database
+from src.rating.repository import RatingQuery
+from src.tag.repository import TagRepository
+from src.tag.schemas import TagSchemaRequest
+
+
+def timed(func: Callable[[], object], repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+async def timed_async(
+    func: Callable[[int], Awaitable[float]], repeat: int
+) -> list[float]:
+    # The function times its own critical section, so that setup is excluded.
+    return [await func(i) for i in range(repeat)]
+
+
+def access_benchmarks(repeat: int) -> dict[str, list[float]]:
+    permission = Permission(
+        role_name="User", can_add_image=True, can_update_image=False
+    )
+    user = User(id=uuid.uuid4(), email="a@b.c", is_verified=True, is_superuser=False)
+    user.permission = permission
+    own = Image(owner_id=user.id)
+    other = Image(owner_id=uuid.uuid4())
+
+    def denied():
+        try:
+            access_service("can_update_image", user, other)
+        except HTTPException:
+            pass
+
+    return {
+        "access: general allowed": timed(
+            lambda: access_service("can_add_image", user), repeat
+        ),
+        "access: owner allowed": timed(
+            lambda: access_service("can_update_image", user, own), repeat
+        ),
+        "access: denied": timed(denied, repeat),
+    }
+
+
+async def rating_benchmarks(image_ids: list[int], repeat: int) -> dict:
+    cache = await cache_database()
+
+    def update(image_id: int, with_cache: bool):
+        async def call(i: int) -> float:
+            async with database.async_session() as session:
+                image = await session.get(Image, image_id)
+                started = time.perf_counter()
+                await RatingQuery._update_average_rating(
+                    image, session, cache if with_cache else None
+                )
+                return time.perf_counter() - started
+
+        return call
+
+    many, few = image_ids[0], image_ids[-1]
+    return {
+        "rating: many votes": await timed_async(update(many, True), repeat),
+        "rating: few votes": await timed_async(update(few, True), repeat),
+        "rating: many votes, no cache": await timed_async(update(many, False), repeat),
+    }
+
+
+async def tag_benchmarks(image_ids: list[int], tags: list[str], repeat: int) -> dict:
+    def attach(names: Callable[[int], list[str]], image: Callable[[int], int]):
+        async def call(i: int) -> float:
+            async with database.async_session() as session:
+                target = await session.get(Image, image(i))
+                schema = TagSchemaRequest(image_id=target.id, names=names(i))
+                started = time.perf_counter()
+                await TagRepository.create(target, schema, session)
+                return time.perf_counter() - started
+
+        return call
+
+    count = len(image_ids)
+    return {
+        "tags: known names": await timed_async(
+            attach(lambda i: tags[i % 50 : i % 50 + 5], lambda i: image_ids[i % count]),
+            repeat,
+        ),
+        "tags: new names": await timed_async(
+            attach(
+                lambda i: [f"micro{i}x{k}" for k in range(5)],
+                lambda i: image_ids[i % count],
+            ),
+            repeat,
+        ),
+        "tags: already attached": await timed_async(
+            attach(lambda i: tags[:5], lambda i: image_ids[0]), repeat
+        ),
+    }
+
+
+def report(results: dict[str, list[float]]) -> None:
+    print(f"{'benchmark':32} {'calls':>6} {'mean us':>10} {'p50 us':>10} {'p95 us':>10}")
+    for name, timings in results.items():
+        ordered = sorted(timings)
+        print(
+            f"{name:32} {len(ordered):6} {sum(ordered) / len(ordered) * 1e6:10.1f} "
+            f"{percentile(ordered, 50) * 1e6:10.1f} {percentile(ordered, 95) * 1e6:10.1f}"
+        )
+
+
+async def run(args: argparse.Namespace) -> None:
+    results = access_benchmarks(args.repeat * 100)
+    volumes = Volumes(users=50, images=200, comments=2000, ratings=10000)
+    async with offline_app(
+        volumes, args.database_url, args.redis_url, lifespan=False
+    ) as env:
+        dataset = env.dataset
+        # Ordered by comments, which follow the same skew as ratings.
+        images = dataset.popular_images + [
+            image for image in dataset.images if image not in dataset.popular_images
+        ]
+        results.update(await rating_benchmarks(images, args.repeat))
+        results.update(await tag_benchmarks(images, dataset.tags, args.repeat))
+    report(results)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=300)
+    parser.add_argument("--database-url", help="default: a temporary SQLite file")
+    parser.add_argument("--redis-url", help="default: fakeredis")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
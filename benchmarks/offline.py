@@ -0,0 +1,394 @@
+"""
+Offline Environment
+
+This module boots the application for benchmarks without any external service:
+
+- the database is a SQLite file in a temporary directory, or any database URL,
+  e.g. a local Postgres;
+- Redis is replaced by fakeredis behind the same bounded connection pools,
+  unless a Redis URL is given;
+- Cloudinary uploads are replaced by StubStorage, which keeps the uploaded
+  bytes in memory and returns Cloudinary-like results.
+
+The singletons of the application (`database`, `cache_database`) are
+repointed before the lifespan starts, so routes, background tasks and metrics
+use the offline services without dependency overrides.
+
+`seed` fills the database with a realistic shape: images have a long-tailed
+number of comments and ratings, and tags follow a Zipf-like popularity.
+Denormalized counters are filled in as the app would maintain them. Users get a
+role with every permission, so that all write routes can be exercised.
+
+Usage:
+    async with offline_app(Volumes(), database_url, redis_url) as env:
+        async with env.client() as client:
+            headers = await login(client, env.dataset.users[0][1])
+            ...
+
+Classes:
+- StubStorage: In-memory replacement of Cloudinary uploads.
+- Volumes: The amount of seed data.
+- Dataset: IDs and credentials of the seeded data.
+- OfflineEnvironment: The booted application and its services.
+
+Functions:
+- offline_app: Boot the application against offline services.
+- seed: Fill the database with benchmark data.
+- login: Log in as a seeded user.
+"""
+
+import contextlib
+import random
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator
+
+import httpx
+from fastapi_users.password import PasswordHelper
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.config import settings
+from src.database.cache.redis_conn import CountingConnectionPool, TracedRedis, cache_database
+from src.database.cache.sharding import HashRing
+from src.database.sql.default_records import permissions
+from src.database.sql.models import (
+    Base,
+    Comment,
+    Image,
+    ImageTag,
+    Permission,
+    Rating,
+    Tag,
+    User,
+)
+from src.database.sql.postgres import database
+from src.image.utils.cloudinary_service import UploadImage
+from src.monitoring.sql import instrument_engine
+
+PASSWORD = "benchmark-password"
+
+WORDS = (
+    "sunset beach mountain city night portrait street forest river winter "
+    "summer autumn spring snow rain cloud sky ocean lake desert bridge tower "
+    "cat dog bird flower tree road car train market food coffee friends "
+    "family travel architecture abstract macro black white film vintage"
+).split()
+
+
+class StubStorage:
+    def __init__(self):
+        self.objects: dict[str, int] = {}
+
+    def upload(self, file, public_id: str) -> dict:
+        data = file.read() if hasattr(file, "read") else str(file).encode()
+        self.objects[public_id] = len(data)
+        return {"public_id": public_id, "version": 1, "bytes": len(data)}
+
+    def install(self) -> None:
+        UploadImage.upload = staticmethod(self.upload)
+
+
+@dataclass
+class Volumes:
+    users: int = 50
+    images: int = 1000
+    comments: int = 20000
+    ratings: int = 8000
+    tags: int = 200
+    tags_per_image: int = 5
+    seed: int = 1
+
+
+@dataclass
+class Dataset:
+    users: list[tuple[uuid.UUID, str]] = field(default_factory=list)
+    images: list[int] = field(default_factory=list)
+    popular_images: list[int] = field(default_factory=list)
+    tags: list[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+def _fake_redis_client(url: str, server):
+    from fakeredis.aioredis import FakeConnection
+
+    pool = CountingConnectionPool(
+        connection_class=FakeConnection,
+        server=server,
+        max_connections=settings.redis_max_connections,
+        timeout=settings.redis_pool_timeout,
+    )
+    cache_database.pools[url] = pool
+    cache_database.clients[url] = TracedRedis(connection_pool=pool)
+
+
+def use_redis(redis_url: str | None) -> None:
+    """
+    Point the Redis connector at a real Redis or at fakeredis.
+
+    :param redis_url: str | None: A Redis URL, or None for fakeredis.
+    :return: None.
+    """
+    if redis_url is not None:
+        cache_database.redis_url = redis_url
+        cache_database.ring = HashRing([redis_url], settings.redis_vnodes)
+        return
+    try:
+        import fakeredis
+    except ImportError:
+        raise SystemExit("Install fakeredis or pass --redis-url") from None
+    for node in {cache_database.redis_url, *cache_database.ring.nodes}:
+        _fake_redis_client(node, fakeredis.FakeServer())
+
+
+def use_database(database_url: str) -> AsyncEngine:
+    """
+    Point the database connector at another database.
+
+    SQLite allows one writer at a time, so its engine has a single pooled
+    connection and requests wait for it instead of failing with "database is
+    locked". Use Postgres for realistic concurrency.
+
+    :param database_url: str: An async SQLAlchemy URL.
+    :return: The new engine.
+    """
+    options = {}
+    if database_url.startswith("sqlite"):
+        options = {
+            "poolclass": AsyncAdaptedQueuePool,
+            "pool_size": 1,
+            "max_overflow": 0,
+            "pool_timeout": 300,
+        }
+    engine = create_async_engine(database_url, **options)
+    instrument_engine(engine)
+    database.engine = engine
+    database.async_session = async_sessionmaker(engine, expire_on_commit=False)
+    return engine
+
+
+class OfflineEnvironment:
+    def __init__(self, app, engine: AsyncEngine, storage: StubStorage, dataset: Dataset):
+        self.app = app
+        self.engine = engine
+        self.storage = storage
+        self.dataset = dataset
+
+    def client(self) -> httpx.AsyncClient:
+        """
+        Create an HTTP client that calls the application in process.
+
+        :return: The client.
+        """
+        return httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=self.app, raise_app_exceptions=False),
+            base_url="http://bench",
+        )
+
+
+@contextlib.asynccontextmanager
+async def offline_app(
+    volumes: Volumes,
+    database_url: str | None = None,
+    redis_url: str | None = None,
+    lifespan: bool = True,
+) -> AsyncIterator[OfflineEnvironment]:
+    """
+    Boot the application against offline services with a seeded database.
+
+    The lifespan of the app is entered after seeding, so the tag index and the
+    rankings are built from the seeded data by their first rebuild.
+
+    :param volumes: Volumes: The amount of seed data.
+    :param database_url: str | None: An async SQLAlchemy URL; a temporary SQLite file by default.
+    :param redis_url: str | None: A Redis URL; fakeredis by default.
+    :param lifespan: bool: Run the startup and shutdown of the app.
+    :return: The environment, as an async context manager.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        if database_url is None:
+            database_url = f"sqlite+aiosqlite:///{Path(directory) / 'bench.db'}"
+        engine = use_database(database_url)
+        use_redis(redis_url)
+        storage = StubStorage()
+        storage.install()
+
+        from main import app
+
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        role = Permission(
+            role_name="Benchmark",
+            **{
+                column: True
+                for column in Permission.__table__.columns.keys()
+                if column.startswith("can_")
+            },
+        )
+        async with database.async_session() as session:
+            session.add_all([*permissions, role])
+            await session.commit()
+
+        dataset = await seed(engine, volumes, role)
+        env = OfflineEnvironment(app, engine, storage, dataset)
+        try:
+            if lifespan:
+                async with app.router.lifespan_context(app):
+                    yield env
+            else:
+                yield env
+                await cache_database.close()
+        finally:
+            await engine.dispose()
+
+
+async def seed(engine: AsyncEngine, volumes: Volumes, role: Permission) -> Dataset:
+    """
+    Fill the database with users, images, comments, tags and ratings.
+
+    :param engine: AsyncEngine: The engine of the database.
+    :param volumes: Volumes: The amount of data.
+    :param role: Permission: The role of the users.
+    :return: The IDs and credentials of the seeded data.
+    """
+    started = time.perf_counter()
+    rng = random.Random(volumes.seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    hashed_password = PasswordHelper().hash(PASSWORD)
+
+    users = [
+        {
+            "id": uuid.UUID(int=rng.getrandbits(128)),
+            "email": f"user{n}@bench.example.com",
+            "username": f"user{n}",
+            "hashed_password": hashed_password,
+            "is_active": True,
+            "is_verified": True,
+            "is_superuser": n == 0,
+            "access_level": role.id,
+            "created_at": now,
+        }
+        for n in range(volumes.users)
+    ]
+    user_ids = [user["id"] for user in users]
+
+    tag_names = [
+        f"{WORDS[n % len(WORDS)]}{n // len(WORDS) or ''}" for n in range(volumes.tags)
+    ]
+    tag_weights = [1 / (rank + 1) for rank in range(volumes.tags)]
+    image_ids = list(range(1, volumes.images + 1))
+    # A few images get most of the comments and ratings.
+    image_weights = [1 / (rank + 1) ** 0.8 for rank in range(volumes.images)]
+
+    comments = []
+    comment_counts = dict.fromkeys(image_ids, 0)
+    for n, image_id in enumerate(
+        rng.choices(image_ids, image_weights, k=volumes.comments), start=1
+    ):
+        comment_counts[image_id] += 1
+        comments.append(
+            {
+                "id": n,
+                "owner_id": rng.choice(user_ids),
+                "image_id": image_id,
+                "text": " ".join(rng.choices(WORDS, k=rng.randint(3, 25)))[:200],
+                "created_at": now - timedelta(seconds=volumes.comments - n),
+            }
+        )
+
+    ratings = {}
+    for image_id in rng.choices(image_ids, image_weights, k=volumes.ratings):
+        owner_id = rng.choice(user_ids)
+        ratings[(image_id, owner_id)] = rng.choices(range(1, 6), (1, 1, 2, 4, 3))[0]
+    rating_totals: dict[int, list[int]] = {}
+    for (image_id, _), value in ratings.items():
+        rating_totals.setdefault(image_id, []).append(value)
+
+    image_tags = []
+    tag_usage = [0] * volumes.tags
+    tag_counts = {}
+    for image_id in image_ids:
+        chosen = set(rng.choices(range(volumes.tags), tag_weights, k=volumes.tags_per_image))
+        tag_counts[image_id] = len(chosen)
+        for tag in chosen:
+            tag_usage[tag] += 1
+            image_tags.append({"image_id": image_id, "tag_id": tag + 1})
+
+    images = [
+        {
+            "id": image_id,
+            "owner_id": user_ids[image_id % volumes.users],
+            "title": f"Image {image_id}",
+            "cloudinary_url": f"https://res.cloudinary.com/demo/image/upload/v1/"
+            f"Memento/bench/01-01-2026/{image_id}",
+            "rating": round(sum(values) / len(values), 2)
+            if (values := rating_totals.get(image_id))
+            else 0,
+            "comment_count": comment_counts[image_id],
+            "rating_count": len(rating_totals.get(image_id, ())),
+            "tag_count": tag_counts[image_id],
+            "created_at": now - timedelta(minutes=volumes.images - image_id),
+        }
+        for image_id in image_ids
+    ]
+
+    async with database.async_session() as session:
+        await session.execute(insert(User), users)
+        await session.execute(
+            insert(Tag),
+            [
+                {"id": n + 1, "name": name, "usage_count": tag_usage[n]}
+                for n, name in enumerate(tag_names)
+            ],
+        )
+        await session.execute(insert(Image), images)
+        for chunk in range(0, len(comments), 5000):
+            await session.execute(insert(Comment), comments[chunk : chunk + 5000])
+        await session.execute(insert(ImageTag), image_tags)
+        await session.execute(
+            insert(Rating),
+            [
+                {"owner_id": owner_id, "image_id": image_id, "value": value, "created_at": now}
+                for (image_id, owner_id), value in ratings.items()
+            ],
+        )
+        await session.commit()
+
+    if engine.dialect.name == "postgresql":
+        async with engine.begin() as conn:
+            for table in ("images", "comments", "tags", "ratings", "image_tags"):
+                await conn.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"(SELECT max(id) FROM {table}))"
+                )
+            await conn.exec_driver_sql("ANALYZE")
+
+    popular = sorted(image_ids, key=comment_counts.get, reverse=True)
+    return Dataset(
+        users=[(user["id"], user["email"]) for user in users],
+        images=image_ids,
+        popular_images=popular[: max(1, len(popular) // 50)],
+        tags=tag_names,
+        seconds=time.perf_counter() - started,
+    )
+
+
+async def login(client: httpx.AsyncClient, email: str) -> dict[str, str]:
+    """
+    Log in through the JWT route.
+
+    :param client: httpx.AsyncClient: The client of the application.
+    :param email: str: The email of a seeded user.
+    :return: The Authorization header.
+    """
+    response = await client.post(
+        "/auth/jwt/login", data={"username": email, "password": PASSWORD}
+    )
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
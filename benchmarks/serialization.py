@@ -0,0 +1,198 @@
+"""
+Serialization Benchmark
+
+Measures the time to turn route results into response bytes, per route shape,
+for the standard FastAPI pipeline and for the fast pipeline in
+src.utils.responses.
+
+- before: the response model validates the ORM objects (from_attributes), the
+  result is serialized by pydantic and encoded with the standard JSON encoder.
+- after: the schema fields are copied from the ORM objects without validation
+  and encoded with orjson.
+
+No database or Redis is needed; ORM objects are built in memory.
+
+Usage:
+    python -m benchmarks.serialization [--items 100] [--repeat 200]
+"""
+
+import argparse
+import functools
+import asyncio
+import inspect
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from src.comment.schemas import (
+    CommentPageSchemaResponse,
+    CommentWithAuthorSchemaResponse,
+)
+from src.database.sql.models import Comment, Image
+from src.image.schemas import ImageSchemaResponse
+from src.ranking.schemas import RankingPageSchemaResponse
+from src.tag.schemas import TagSearchSchemaResponse
+from src.utils.responses import FastJSONResponse, dump
+
+
+def make_images(count: int) -> list[Image]:
+    now = datetime(2026, 10, 19, 12, 0, 0)
+    owner = uuid.uuid4()
+    return [
+        Image(
+            id=i,
+            title=f"Image {i}",
+            owner_id=owner,
+            cloudinary_url=f"https://res.cloudinary.com/demo/image/upload/{i}.jpg",
+            edited_cloudinary_url=None,
+            comment_count=i % 17,
+            rating_count=i % 5,
+            tag_count=i % 7,
+            created_at=now - timedelta(minutes=i),
+            updated_at=None,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def make_comments(count: int) -> tuple[list[Comment], dict]:
+    now = datetime(2026, 10, 19, 12, 0, 0)
+    owners = [uuid.uuid4() for _ in range(10)]
+    comments = [
+        Comment(
+            id=i,
+            owner_id=owners[i % 10],
+            image_id=1,
+            text="A comment of moderate length about the picture " * 2,
+            created_at=now + timedelta(seconds=i),
+            updated_at=None,
+        )
+        for i in range(1, count + 1)
+    ]
+    usernames = {owner: f"user{n}" for n, owner in enumerate(owners)}
+    return comments, usernames
+
+
+@functools.cache
+def response_field(model):
+    # FastAPI builds the field once per route, at startup.
+    return create_response_field(name="response", type_=model)
+
+
+async def before(model, content) -> bytes:
+    field = response_field(model)
+    value = await serialize_response(field=field, response_content=content)
+    return JSONResponse(value).body
+
+
+def routes(items: int) -> dict:
+    images = make_images(items)
+    comments, usernames = make_comments(items)
+    ranked = [(i, 4.5 - i / 1000) for i in range(1, items + 1)]
+
+    async def comment_page_before():
+        page = CommentPageSchemaResponse(
+            items=[
+                CommentWithAuthorSchemaResponse(
+                    id=c.id,
+                    owner_id=c.owner_id,
+                    image_id=c.image_id,
+                    text=c.text,
+                    created_at=c.created_at,
+                    updated_at=c.updated_at,
+                    username=usernames.get(c.owner_id),
+                )
+                for c in comments
+            ],
+            next_cursor="abc",
+        )
+        return await before(CommentPageSchemaResponse, page)
+
+    def comment_page_after():
+        page = [
+            dump(CommentWithAuthorSchemaResponse, c, username=usernames.get(c.owner_id))
+            for c in comments
+        ]
+        return FastJSONResponse({"items": page, "next_cursor": "abc"}).body
+
+    async def tag_search_before():
+        return await before(TagSearchSchemaResponse, {"images": images, "next_after": None})
+
+    def tag_search_after():
+        return FastJSONResponse(
+            {
+                "images": [dump(ImageSchemaResponse, image) for image in images],
+                "next_after": None,
+            }
+        ).body
+
+    async def ranking_before():
+        return await before(
+            RankingPageSchemaResponse,
+            RankingPageSchemaResponse(
+                page=1,
+                size=items,
+                total=items,
+                items=[{"image_id": i, "score": s} for i, s in ranked],
+            ),
+        )
+
+    def ranking_after():
+        return FastJSONResponse(
+            {
+                "page": 1,
+                "size": items,
+                "total": items,
+                "items": [{"image_id": i, "score": s} for i, s in ranked],
+            }
+        ).body
+
+    async def image_before():
+        return await before(ImageSchemaResponse, images[0])
+
+    def image_after():
+        return FastJSONResponse(dump(ImageSchemaResponse, images[0])).body
+
+    return {
+        "GET /comment/by-image/{id}": (comment_page_before, comment_page_after),
+        "GET /tag/search": (tag_search_before, tag_search_after),
+        "GET /ranking/top": (ranking_before, ranking_after),
+        "GET /image/{id} (uncached)": (image_before, image_after),
+    }
+
+
+async def measure(func, repeat: int) -> float:
+    is_async = inspect.iscoroutinefunction(func)
+    start = None
+    for i in range(repeat + 1):
+        if i == 1:
+            start = time.perf_counter()
+        if is_async:
+            await func()
+        else:
+            func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    async def run() -> None:
+        print(f"{'route':32} {'before us':>10} {'after us':>10} {'speedup':>8}")
+        for route, (slow, fast) in routes(args.items).items():
+            slow_us = await measure(slow, args.repeat)
+            fast_us = await measure(fast, args.repeat)
+            print(f"{route:32} {slow_us:10.1f} {fast_us:10.1f} {slow_us / fast_us:7.1f}x")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
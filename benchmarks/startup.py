@@ -0,0 +1,112 @@
+"""
+Startup Benchmark
+
+Measures how long a fresh interpreter takes to import the application, and
+fails if it exceeds a budget or if a heavy integration is imported eagerly.
+
+Cloudinary, fastapi-mail, aiohttp, Jinja2 and the asyncpg driver are loaded on
+first use, not at startup; importing `main` must not pull them in. The import
+time is the median of several fresh interpreters, and the slowest modules of
+one run are listed from `python -X importtime` to show where the time goes.
+
+The environment must hold the application settings, as for running the app.
+
+Usage:
+    python -m benchmarks.startup [--runs 5] [--budget 3.0] [--top 15]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that importing the application must not load.
+DEFERRED = ("cloudinary", "fastapi_mail", "aiohttp", "asyncpg", "jinja2")
+
+PROBE = f"""
+import sys, time
+started = time.perf_counter()
+import main
+print(time.perf_counter() - started)
+print(",".join(name for name in {DEFERRED!r} if name in sys.modules))
+"""
+
+
+def _python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=ROOT,
+        env=os.environ,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def measure() -> tuple[float, list[str]]:
+    """
+    Import the application in a fresh interpreter.
+
+    :return: The import time in seconds and the deferred modules it loaded.
+    """
+    output = _python("-c", PROBE).stdout.splitlines()
+    seconds, loaded = float(output[-2]), output[-1]
+    return seconds, [name for name in loaded.split(",") if name]
+
+
+def slowest_modules(top: int) -> list[tuple[str, float, float]]:
+    """
+    List the modules with the highest own import time.
+
+    :param top: int: How many modules to list.
+    :return: A list of (module, own seconds, cumulative seconds).
+    """
+    modules = []
+    for line in _python("-X", "importtime", "-c", "import main").stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        modules.append((name.strip(), int(own) / 1e6, int(cumulative) / 1e6))
+    return sorted(modules, key=lambda module: module[1], reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--budget", type=float, default=3.0, help="maximum median import time in seconds"
+    )
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    timings, eager = [], set()
+    for _ in range(args.runs):
+        seconds, loaded = measure()
+        timings.append(seconds)
+        eager.update(loaded)
+    median = statistics.median(timings)
+
+    print(f"{'module':48} {'own ms':>8} {'total ms':>9}")
+    for name, own, cumulative in slowest_modules(args.top):
+        print(f"{name:48} {own * 1000:8.1f} {cumulative * 1000:9.1f}")
+    print(
+        f"\nimport main: median {median * 1000:.0f} ms over {args.runs} runs "
+        f"(min {min(timings) * 1000:.0f} ms), budget {args.budget * 1000:.0f} ms"
+    )
+
+    failures = []
+    if median > args.budget:
+        failures.append(f"import time {median:.2f} s exceeds the budget of {args.budget} s")
+    if eager:
+        failures.append(f"imported at startup: {', '.join(sorted(eager))}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,13 @@
-import uvicorn
-from fastapi import FastAPI, Depends
+import logging
+from contextlib import asynccontextmanager
 
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession
-from redis.asyncio.client import Redis
+import uvicorn
+from fastapi import FastAPI, Depends, Response
 
 from src.auth.service import current_active_user
 from src.database.sql.models import User
-from src.database.sql.postgres import database
 from src.database.cache.redis_conn import cache_database
+from src.database.cache.local import local_cache
 from src.auth.utils.access import AccessService
 
 from src.image.routes import router as images
@@ -17,9 +16,64 @@ from src.comment.routes import router as comments
 from src.auth.utils.access import access_service
 
 from src.tag.routes import router as tags
+from src.tag.index import tag_index
+from src.tag.tasks import tag_index_rebuild_task, related_tags_task
 from src.rating.routes import router as rating
+from src.ranking.routes import router as ranking
+from src.stream.routes import router as stream
+from src.stream.broker import event_broker
+from src.ranking.tasks import ranking_rebuild_task
+from src.image.tasks import counters_reconcile_task
+from src.utils.responses import FastJSONResponse, ContentNegotiationMiddleware
+from src.monitoring.sql import SQLStatsMiddleware
+from src.monitoring.metrics import MetricsMiddleware, registry
+from src.monitoring.profiler import ProfilerMiddleware, profiler_enabled
+from src.monitoring.routes import router as monitoring
+from src.monitoring.tracing import TracingMiddleware, exporter, tracing_enabled
+from src.monitoring.logs import RequestIdMiddleware, setup_logging
+from src.monitoring.health import health_checker
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Configure logging and start background jobs on startup, and stop them on
+    shutdown.
 
-app = FastAPI()
+    :param app: FastAPI: The application instance.
+"""
+    setup_logging()
+    await local_cache.start()
+    health_checker.start()
+    ranking_rebuild_task.start()
+    counters_reconcile_task.start()
+    await tag_index.start()
+    tag_index_rebuild_task.start()
+    related_tags_task.start()
+    yield
+    await related_tags_task.stop()
+    await tag_index_rebuild_task.stop()
+    await tag_index.close()
+    await counters_reconcile_task.stop()
+    await ranking_rebuild_task.stop()
+    await health_checker.stop()
+    await event_broker.close()
+    await local_cache.close()
+    await cache_database.close()
+    exporter.close()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+if profiler_enabled():
+    app.add_middleware(ProfilerMiddleware)
+app.add_middleware(ContentNegotiationMiddleware)
+app.add_middleware(SQLStatsMiddleware)
+if tracing_enabled():
+    app.add_middleware(TracingMiddleware)
+app.add_middleware(RequestIdMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth)
 
@@ -27,6 +81,9 @@ app.include_router(images, prefix="/api")
 app.include_router(comments, prefix="/api")
 app.include_router(tags, prefix="/api")
 app.include_router(rating, prefix="/api")
+app.include_router(ranking, prefix="/api")
+app.include_router(stream, prefix="/api")
+app.include_router(monitoring, prefix="/api")
 
 
 @app.get("/")
@@ -40,23 +97,52 @@ def read_root():
     return {"message": "Hello World"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Expose the metrics of this worker in the Prometheus text format.
+
+    :return: Response: The metrics exposition.
+"""
+    return Response(registry.expose(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/livez", include_in_schema=False)
+async def livez():
+    """
+    Answer the liveness probe: the worker is up and its event loop responds.
+
+    :return: dict: The status "ok".
+"""
+    return {"status": "ok"}
+
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    """
+    Answer the readiness probe from the last background health check.
+
+    :return: FastJSONResponse: The health report, with status 200 when ready
+        and 503 otherwise.
+"""
+    ready, report = health_checker.readiness()
+    return FastJSONResponse(report, status_code=200 if ready else 503)
+
+
 @app.get("/example/healthchecker")
-async def healthchecker(
-    db: AsyncSession = Depends(database), cache: Redis = Depends(cache_database)
-):
+async def healthchecker():
     """
         Check the health of the database and cache.
 
-        :param db: AsyncSession = Depends(database): The database session.
-        :param cache: Redis = Depends(cache_database): The cache database.
+        Reports the last background health check rather than querying the
+        databases on every call.
 
         :return: dict: A dictionary with a message indicating the status of the databases.
 """
-    print("postgres connection check...")
-    await db.execute(text("SELECT 1"))
-    print("redis connection check...")
-    await cache.set("1", 1)
-    return {"message": "Databases are OK!"}
+    ready, report = health_checker.readiness()
+    if not ready:
+        return FastJSONResponse(report, status_code=503)
+    return {"message": "Databases are OK!", **report}
 
 
 @app.get("/example/user-authenticated")
@@ -68,10 +154,10 @@ async def authenticated_route(user: User = Depends(current_active_user)):
     :param user: User: Get the user object from the database
     :return: A dictionary with the email and images of the user
 """
-    print(user.images)
     return {"email": user.email, "images": user.images}
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="localhost", port=8080)
+    setup_logging()
+    uvicorn.run(app, host="localhost", port=8080, log_config=None)
     #  uvicorn main:app --host localhost --port 8000
@@ -0,0 +1,28 @@
+"""add ratings timestamps
+
+Revision ID: 5f1c2a9d7e41
+Revises: d353c9a9e03a
+Create Date: 2026-10-19 10:12:05.118304
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f1c2a9d7e41'
+down_revision: Union[str, None] = 'd353c9a9e03a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('ratings', sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True))
+    op.add_column('ratings', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('ratings', 'updated_at')
+    op.drop_column('ratings', 'created_at')
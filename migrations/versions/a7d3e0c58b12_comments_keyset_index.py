@@ -0,0 +1,39 @@
+"""comments keyset index
+
+Revision ID: a7d3e0c58b12
+Revises: 5f1c2a9d7e41
+Create Date: 2026-10-19 11:02:47.530981
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e0c58b12'
+down_revision: Union[str, None] = '5f1c2a9d7e41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("UPDATE comments SET created_at = now() WHERE created_at IS NULL")
+    op.create_index(
+        'ix_comments_image_id_created_at_id',
+        'comments',
+        ['image_id', 'created_at', 'id'],
+        unique=False,
+        postgresql_include=['owner_id', 'text', 'updated_at'],
+    )
+    op.drop_constraint('comments_image_id_fkey', 'comments', type_='foreignkey')
+    op.create_foreign_key(
+        'comments_image_id_fkey', 'comments', 'images', ['image_id'], ['id'], ondelete='CASCADE'
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('comments_image_id_fkey', 'comments', type_='foreignkey')
+    op.create_foreign_key('comments_image_id_fkey', 'comments', 'images', ['image_id'], ['id'])
+    op.drop_index('ix_comments_image_id_created_at_id', table_name='comments')
@@ -0,0 +1,38 @@
+"""add image counters
+
+Revision ID: c41e9b7f20d6
+Revises: a7d3e0c58b12
+Create Date: 2026-10-19 11:48:13.204776
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e9b7f20d6'
+down_revision: Union[str, None] = 'a7d3e0c58b12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('images', sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('images', sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('images', sa.Column('tag_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        """
+        UPDATE images SET
+            comment_count = (SELECT count(*) FROM comments WHERE comments.image_id = images.id),
+            rating_count = (SELECT count(*) FROM ratings WHERE ratings.image_id = images.id),
+            tag_count = (SELECT count(*) FROM image_tags WHERE image_tags.image_id = images.id)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('images', 'tag_count')
+    op.drop_column('images', 'rating_count')
+    op.drop_column('images', 'comment_count')
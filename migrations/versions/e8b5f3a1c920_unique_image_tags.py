@@ -0,0 +1,36 @@
+"""unique image tags
+
+Revision ID: e8b5f3a1c920
+Revises: c41e9b7f20d6
+Create Date: 2026-10-19 12:31:40.662105
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b5f3a1c920'
+down_revision: Union[str, None] = 'c41e9b7f20d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        DELETE FROM image_tags a USING image_tags b
+        WHERE a.image_id = b.image_id AND a.tag_id = b.tag_id AND a.id > b.id
+        """
+    )
+    op.create_unique_constraint('uq_image_tags_image_id_tag_id', 'image_tags', ['image_id', 'tag_id'])
+    op.execute(
+        "UPDATE images SET tag_count = "
+        "(SELECT count(*) FROM image_tags WHERE image_tags.image_id = images.id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_image_tags_image_id_tag_id', 'image_tags', type_='unique')
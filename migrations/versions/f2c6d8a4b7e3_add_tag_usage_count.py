@@ -0,0 +1,32 @@
+"""add tag usage count
+
+Revision ID: f2c6d8a4b7e3
+Revises: e8b5f3a1c920
+Create Date: 2026-10-19 14:07:51.903412
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c6d8a4b7e3'
+down_revision: Union[str, None] = 'e8b5f3a1c920'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('tags', sa.Column('usage_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        "UPDATE tags SET usage_count = "
+        "(SELECT count(*) FROM image_tags WHERE image_tags.tag_id = tags.id)"
+    )
+    op.create_index(op.f('ix_tags_usage_count'), 'tags', ['usage_count'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_tags_usage_count'), table_name='tags')
+    op.drop_column('tags', 'usage_count')
@@ -0,0 +1,151 @@
+"""
+Production Server
+
+Runs the application under gunicorn with uvicorn workers, configured from
+Settings:
+
+- `web_concurrency` worker processes, by default one per available CPU;
+- uvloop and httptools in every worker;
+- `server_keepalive` seconds of HTTP keep-alive and a listen backlog of
+  `server_backlog`;
+- on SIGTERM, workers stop accepting connections, finish the requests in
+  flight and run the shutdown of the lifespan, for up to
+  `server_graceful_timeout` seconds;
+- the database pool of every worker is sized so that all workers together
+  open at most `db_max_connections` connections (see
+  src.database.sql.postgres.pool_limits);
+- background jobs over shared data (ranking rebuild, related tags, counter
+  reconciliation) run on one worker per interval, under a Redis lock (see
+  src.utils.periodic).
+
+The application is imported once in the master process and the workers are
+forked from it, so they share the memory of the imported code copy-on-write.
+Garbage collection is paused while the master imports the application, and the
+objects that exist then, and again at every fork, are frozen, so collections
+in the master and the workers do not write to the shared pages. Connections,
+pools and background threads are created in the workers, after the fork.
+
+Usage:
+    python server.py
+
+`python main.py` still starts a single development process.
+
+Classes:
+- Worker: The uvicorn worker with uvloop, httptools and the app's logging.
+- Server: The gunicorn application.
+
+Functions:
+- worker_count: The number of worker processes to run.
+"""
+
+import gc
+import logging
+import os
+
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+
+from src.config import settings
+from src.monitoring.logs import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+def worker_count() -> int:
+    """
+    The number of worker processes: `web_concurrency`, or one per available CPU.
+
+    Every worker needs at least one database connection, so the count is
+    limited to `db_max_connections`.
+
+    :return: The number of workers.
+    """
+    if settings.web_concurrency > 0:
+        workers = settings.web_concurrency
+    else:
+        try:
+            workers = len(os.sched_getaffinity(0))
+        except AttributeError:
+            workers = os.cpu_count() or 1
+    if workers > settings.db_max_connections:
+        logger.warning(
+            "Limiting %d workers to %d, the database connection cap",
+            workers,
+            settings.db_max_connections,
+        )
+        workers = settings.db_max_connections
+    return workers
+
+
+def _route_to_root(*names: str) -> None:
+    for name in names:
+        log = logging.getLogger(name)
+        log.handlers.clear()
+        log.propagate = True
+
+
+class Worker(UvicornWorker):
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # UvicornWorker hands the uvicorn loggers to gunicorn's handlers.
+        _route_to_root("uvicorn.error", "uvicorn.access")
+
+
+def _on_starting(server) -> None:
+    _route_to_root("gunicorn.error", "gunicorn.access")
+
+
+def _pre_fork(server, worker) -> None:
+    gc.freeze()
+
+
+class Server(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        gc.disable()
+        try:
+            from main import app
+        finally:
+            gc.freeze()
+            gc.enable()
+        return app
+
+
+def main() -> None:
+    setup_logging()
+    workers = worker_count()
+    # Forked workers inherit the resolved count and size their pools with it.
+    settings.web_concurrency = workers
+    logger.info(
+        "Starting %d workers on %s:%s",
+        workers,
+        settings.server_host,
+        settings.server_port,
+    )
+    Server(
+        {
+            "bind": f"{settings.server_host}:{settings.server_port}",
+            "workers": workers,
+            "worker_class": f"{Worker.__module__}.{Worker.__qualname__}",
+            "preload_app": True,
+            "keepalive": settings.server_keepalive,
+            "backlog": settings.server_backlog,
+            "graceful_timeout": settings.server_graceful_timeout,
+            "timeout": settings.server_timeout,
+            "on_starting": _on_starting,
+            "pre_fork": _pre_fork,
+        }
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
+from functools import lru_cache
 from pathlib import Path
 
 from fastapi import APIRouter, Request
-from fastapi.templating import Jinja2Templates
 from starlette.responses import JSONResponse
 
 from src.auth.schemas import UserRead, UserCreate, UserUpdate
@@ -9,7 +9,15 @@ from src.auth.service import auth_backend, fastapi_users, google_oauth_client, S
 from src.auth.utils.send_post import send_post_request
 
 router = APIRouter()
-templates = Jinja2Templates(directory=Path(__file__).parent.parent.parent / "templates")
+
+
+@lru_cache(maxsize=None)
+def templates():
+    # Jinja2 is loaded with the first rendered page rather than at startup.
+    from fastapi.templating import Jinja2Templates
+
+    return Jinja2Templates(directory=Path(__file__).parent.parent.parent / "templates")
+
 
 router.include_router(
     fastapi_users.get_auth_router(auth_backend), prefix="/auth/jwt", tags=["auth"]
@@ -49,7 +57,7 @@ async def reset_password_form(request: Request):
     :param request: Request: Get the data from the form
     :return: The reset_password_form
 """
-    return templates.TemplateResponse("reset_password_form.html", {"request": request})
+    return templates().TemplateResponse("reset_password_form.html", {"request": request})
 
 
 @router.get("/auth/verify/{token}", tags=["auth"])
@@ -1,3 +1,4 @@
+import logging
 import os
 import uuid
 from typing import Optional
@@ -10,7 +11,7 @@ from fastapi_users.authentication import (
     JWTStrategy,
 )
 
-from fastapi_users.db import SQLAlchemyUserDatabase
+from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
 from httpx_oauth.clients.google import GoogleOAuth2
 from starlette.responses import JSONResponse
 
@@ -18,6 +19,9 @@ from src.auth.utils.email import send_email_for_reset_pswd, send_email_verificat
 from src.auth.utils.send_post import send_post_request
 from src.config import settings
 from src.database.sql.postgres import User, get_user_db
+from src.monitoring.tracing import span
+
+logger = logging.getLogger(__name__)
 
 # should be remade to get it from .env
 google_oauth_client = GoogleOAuth2(
@@ -62,7 +66,7 @@ class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
 
         :return: JSONResponse: A response indicating the registration status.
         """
-        print(f"User {user.id} has registered.")
+        logger.info("User %s has registered", user.id)
         result = await send_post_request(
             request, str(user.email), "auth/request-verify-token"
         )
@@ -82,7 +86,7 @@ class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
             user.email, user.username, token, request.base_url
         )
 
-        print(f"User {user.id} has forgot their password. Reset token: {token}")
+        logger.info("User %s has requested a password reset", user.id)
 
     async def on_after_request_verify(
         self, user: User, token: str, request: Optional[Request] = None
@@ -97,7 +101,7 @@ class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
         await send_email_verification(
             user.email, user.username, token, request.base_url
         )
-        print(f"Verification requested for user {user.id}. Verification token: {token}")
+        logger.info("Verification requested for user %s", user.id)
 
 
 async def get_user_manager(user_db: SQLAlchemyUserDatabase = Depends(get_user_db)):
@@ -112,6 +116,14 @@ async def get_user_manager(user_db: SQLAlchemyUserDatabase = Depends(get_user_db
     yield UserManager(user_db)
 
 
+class TracedJWTStrategy(JWTStrategy):
+    async def read_token(
+        self, token: Optional[str], user_manager: BaseUserManager
+    ) -> Optional[User]:
+        with span("auth.read_token"):
+            return await super().read_token(token, user_manager)
+
+
 def get_jwt_strategy() -> JWTStrategy:
     """
     The get_jwt_strategy function returns a JWTStrategy object.
@@ -120,7 +132,7 @@ def get_jwt_strategy() -> JWTStrategy:
 
     :return: A JWTStrategy object
     """
-    return JWTStrategy(secret=settings.secret_key, lifetime_seconds=3600)
+    return TracedJWTStrategy(secret=settings.secret_key, lifetime_seconds=3600)
 
 
 auth_backend = AuthenticationBackend(
@@ -1,16 +1,20 @@
 from fastapi import status, HTTPException
 
 from src.database.sql.models import User, Tag, Image, Comment
+from src.monitoring.tracing import span
+
+ADMIN_ROLE = "Admin"
 
 
 class AccessService:
     def __call__(
         self, action: str, user: User, item: Image | Tag | Comment | None = None
     ):
-        if item is None:
-            self._check_general_access(action, user)
-        else:
-            self._check_operation_access(action, user, item)
+        with span("access_service", attributes={"action": action}):
+            if item is None:
+                self._check_general_access(action, user)
+            else:
+                self._check_operation_access(action, user, item)
 
     @staticmethod
     def _check_general_access(action: str, user: User):
@@ -46,5 +50,28 @@ class AccessService:
                 detail=f"You are not allowed to do this operation",
             )
 
+    @staticmethod
+    def check_admin(user: User):
+        """
+        Allow only verified users with the admin role, and superusers.
+
+        :param user: User: The current user.
+        :raises HTTPException 403 if the user is not an admin.
+        :return: None.
+        """
+        with span("access_service", attributes={"action": "admin"}):
+            if not user.is_verified:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=f"Email is not verified. Please varify your email: {user.email}.",
+                )
+            elif user.is_superuser or user.permission.role_name == ADMIN_ROLE:
+                return
+            else:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="You are not allowed to do this operation",
+                )
+
 
 access_service = AccessService()
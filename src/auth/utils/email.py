@@ -1,27 +1,55 @@
+import logging
 import os
+import time
+from functools import lru_cache
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from fastapi_mail import FastMail, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
 from pydantic import EmailStr
 
 from src.config import settings
+from src.monitoring.metrics import email_send_seconds
+from src.monitoring.tracing import SpanKind, span
 
-from fastapi_mail import MessageSchema
+if TYPE_CHECKING:
+    from fastapi_mail import FastMail, MessageSchema
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.mail_username,
-    MAIL_PASSWORD=settings.mail_password,
-    MAIL_FROM=settings.mail_from,
-    MAIL_PORT=settings.mail_port,
-    MAIL_SERVER=settings.mail_server,
-    MAIL_FROM_NAME=os.environ.get("MAIL_FROM_NAME"),
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent.parent.parent.parent / "templates",
-)
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _mail() -> "FastMail":
+    # fastapi_mail and its template environment are only loaded when the
+    # first email is sent, which keeps them out of the application startup.
+    from fastapi_mail import ConnectionConfig, FastMail
+
+    conf = ConnectionConfig(
+        MAIL_USERNAME=settings.mail_username,
+        MAIL_PASSWORD=settings.mail_password,
+        MAIL_FROM=settings.mail_from,
+        MAIL_PORT=settings.mail_port,
+        MAIL_SERVER=settings.mail_server,
+        MAIL_FROM_NAME=os.environ.get("MAIL_FROM_NAME"),
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=True,
+        USE_CREDENTIALS=True,
+        VALIDATE_CERTS=True,
+        TEMPLATE_FOLDER=Path(__file__).parent.parent.parent.parent / "templates",
+    )
+    return FastMail(conf)
+
+
+async def _send(fm: "FastMail", message: "MessageSchema", template_name: str) -> None:
+    started = time.perf_counter()
+    result = "error"
+    try:
+        with span("smtp.send", SpanKind.CLIENT, {"template": template_name}):
+            await fm.send_message(message, template_name=template_name)
+        result = "ok"
+    finally:
+        email_send_seconds.labels(template_name, result).observe(
+            time.perf_counter() - started
+        )
 
 
 async def send_email_for_reset_pswd(
@@ -37,6 +65,9 @@ async def send_email_for_reset_pswd(
 
     :raises ConnectionErrors: If there is an issue with the email sending connection.
     """
+    from fastapi_mail import MessageSchema, MessageType
+    from fastapi_mail.errors import ConnectionErrors
+
     try:
         message = MessageSchema(
             subject="Password change",
@@ -45,11 +76,10 @@ async def send_email_for_reset_pswd(
             subtype=MessageType.html,
         )
 
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="reset_password.html")
+        await _send(_mail(), message, "reset_password.html")
 
     except ConnectionErrors as e:
-        print(e)
+        logger.error("Failed to send a password reset email: %s", e)
 
 
 async def send_email_verification(
@@ -65,6 +95,9 @@ async def send_email_verification(
 
     :raises ConnectionErrors: If there is an issue with the email sending connection.
     """
+    from fastapi_mail import MessageSchema, MessageType
+    from fastapi_mail.errors import ConnectionErrors
+
     try:
         message = MessageSchema(
             subject="Confirm your email ",
@@ -73,7 +106,6 @@ async def send_email_verification(
             subtype=MessageType.html,
         )
 
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="email_verification.html")
+        await _send(_mail(), message, "email_verification.html")
     except ConnectionErrors as e:
-        print(e)
+        logger.error("Failed to send a verification email: %s", e)
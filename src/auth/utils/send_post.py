@@ -1,8 +1,17 @@
-from aiohttp import ClientSession, ContentTypeError
+import logging
+
 from fastapi import Request
 
+from src.monitoring.tracing import SpanKind, current_traceparent, span
+
+logger = logging.getLogger(__name__)
+
 
 async def send_post_request(request: Request, data: str, request_url: str):
+    # aiohttp is only needed after a registration or password reset, so it is
+    # imported here rather than at application startup.
+    from aiohttp import ClientSession, ContentTypeError
+
     try:
         url = f"{request.base_url}{request_url}"
         headers = {
@@ -12,23 +21,31 @@ async def send_post_request(request: Request, data: str, request_url: str):
         data_key = "token" if request_url == "auth/verify" else "email"
         data = {data_key: data}
 
-        async with ClientSession() as session:
-            async with session.post(url, headers=headers, json=data) as response:
-                response_data = await response.json()
-
-                if response.status == 200 and request_url == "auth/verify":
-                    return {"status": "Your email has been verified"}
-                elif "token" in request_url and response.status == 202:
-                    return {
-                        "status": "Email with instructions has been sent to your email box."
-                    }
-                else:
-                    print(f"Помилка: {response.status}")
-                    print(f"Текст відповіді: {response_data}")
-                    return {"error": "Something went wrong"}
+        with span(f"POST /{request_url}", SpanKind.CLIENT, {"url.full": url}):
+            traceparent = current_traceparent()
+            if traceparent is not None:
+                headers["traceparent"] = traceparent
+            async with ClientSession() as session:
+                async with session.post(url, headers=headers, json=data) as response:
+                    response_data = await response.json()
+
+                    if response.status == 200 and request_url == "auth/verify":
+                        return {"status": "Your email has been verified"}
+                    elif "token" in request_url and response.status == 202:
+                        return {
+                            "status": "Email with instructions has been sent to your email box."
+                        }
+                    else:
+                        logger.warning(
+                            "POST /%s failed with status %s: %s",
+                            request_url,
+                            response.status,
+                            response_data,
+                        )
+                        return {"error": "Something went wrong"}
     except ContentTypeError as e:
-        print(f"Помилка при обробці JSON: {e}")
+        logger.warning("POST /%s returned invalid JSON: %s", request_url, e)
         return {"error": "Error processing JSON"}
-    except Exception as e:
-        print(f"Помилка: {e}")
+    except Exception:
+        logger.exception("POST /%s failed", request_url)
         return {"error": "An error occurred"}
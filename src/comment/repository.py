@@ -1,7 +1,13 @@
-from sqlalchemy import select
+import base64
+from datetime import datetime
+
+from redis.asyncio.client import Redis
+from sqlalchemy import select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.sql.models import Comment, User, Image
+from src.image.repository import ImageQuery
+from src.stream.broker import publish_event
 
 
 class CommentQuery:
@@ -11,24 +17,41 @@ class CommentQuery:
     Functions:
         - create: Create a new comment.
         - read: Retrieve a comment by its ID.
+        - read_by_image: Retrieve a page of comments of an image.
         - update: Update a comment's text.
         - delete: Delete a comment.
     """
 
     @staticmethod
-    async def create(body, user: User, db: AsyncSession) -> Comment:
+    async def create(
+        body, user: User, db: AsyncSession, cache: Redis | None = None
+    ) -> Comment:
         """
         Create a new comment.
 
         :param body: The comment data.
         :param user: User: The user creating the comment.
         :param db: AsyncSession: The database session.
+        :param cache: Redis: The Redis connection used to publish the event.
         :return: The created comment.
         """
         comment = Comment(**body.model_dump(), owner_id=user.id)
         db.add(comment)
+        await ImageQuery.adjust_counters(comment.image_id, db, comments=1)
         await db.commit()
         await db.refresh(comment)
+        await ImageQuery.invalidate(comment.image_id)
+        if cache is not None:
+            await publish_event(
+                cache,
+                comment.image_id,
+                "comment.created",
+                id=comment.id,
+                owner_id=comment.owner_id,
+                username=user.username,
+                text=comment.text,
+                created_at=comment.created_at,
+            )
         return comment
 
     @staticmethod
@@ -46,28 +69,117 @@ class CommentQuery:
         return comment
 
     @staticmethod
-    async def update(comment, body, db) -> Comment | None:
+    def encode_cursor(comment: Comment) -> str:
+        """
+        Encode the keyset position of a comment as an opaque cursor.
+
+        :param comment: Comment: The last comment of a page.
+        :return: The cursor string.
+        """
+        raw = f"{comment.created_at.isoformat()}|{comment.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[datetime, int]:
+        """
+        Decode a cursor produced by encode_cursor.
+
+        :param cursor: str: The cursor string.
+        :raises ValueError: If the cursor is malformed.
+        :return: A (created_at, id) tuple.
+        """
+        try:
+            created_at, comment_id = (
+                base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            )
+            return datetime.fromisoformat(created_at), int(comment_id)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError("Invalid cursor") from e
+
+    @staticmethod
+    async def read_by_image(
+        image_id: int, limit: int, cursor: str | None, db: AsyncSession
+    ) -> tuple[list[Comment], dict, str | None]:
+        """
+        Read a page of comments of an image ordered by (created_at, id).
+
+        The page is served by the (image_id, created_at, id) index, and the
+        authors' usernames are loaded with one extra query for the whole page.
+
+        :param image_id: int: The ID of the image.
+        :param limit: int: The maximum number of comments to return.
+        :param cursor: str | None: The cursor returned with the previous page.
+        :param db: AsyncSession: The database session.
+        :raises ValueError: If the cursor is malformed.
+        :return: The comments, a mapping of owner ID to username and the next cursor.
+        """
+        stmt = (
+            select(Comment)
+            .where(Comment.image_id == image_id)
+            .order_by(Comment.created_at, Comment.id)
+            .limit(limit + 1)
+        )
+        if cursor:
+            stmt = stmt.where(
+                tuple_(Comment.created_at, Comment.id)
+                > tuple_(*CommentQuery.decode_cursor(cursor))
+            )
+        comments = list((await db.execute(stmt)).scalars().all())
+
+        next_cursor = None
+        if len(comments) > limit:
+            comments = comments[:limit]
+            next_cursor = CommentQuery.encode_cursor(comments[-1])
+
+        usernames = {}
+        owner_ids = {comment.owner_id for comment in comments}
+        if owner_ids:
+            rows = await db.execute(
+                select(User.id, User.username).where(User.id.in_(owner_ids))
+            )
+            usernames = dict(rows.all())
+        return comments, usernames, next_cursor
+
+    @staticmethod
+    async def update(comment, body, db, cache: Redis | None = None) -> Comment | None:
         """
         Update a comment's text.
 
         :param comment: Comment: The comment object to update.
         :param body: The updated comment text.
         :param db: The database session.
+        :param cache: Redis: The Redis connection used to publish the event.
         :return: The updated comment.
         """
         comment.text = body.text
         await db.commit()
         await db.refresh(comment)
+        if cache is not None:
+            await publish_event(
+                cache,
+                comment.image_id,
+                "comment.updated",
+                id=comment.id,
+                text=comment.text,
+                updated_at=comment.updated_at,
+            )
         return comment
 
     @staticmethod
-    async def delete(comment: Comment, db: AsyncSession) -> None:
+    async def delete(
+        comment: Comment, db: AsyncSession, cache: Redis | None = None
+    ) -> None:
         """
         Delete a comment.
 
         :param comment: Comment: The comment to delete.
         :param db: AsyncSession: The database session.
+        :param cache: Redis: The Redis connection used to publish the event.
         :return: None.
         """
         await db.delete(comment)
+        await ImageQuery.adjust_counters(comment.image_id, db, comments=-1)
         await db.commit()
+        await ImageQuery.invalidate(comment.image_id)
+        if cache is not None:
+            await publish_event(cache, comment.image_id, "comment.deleted", id=comment.id)
@@ -6,23 +6,30 @@ This module contains FastAPI routes related to comments on images.
 Routes:
 - create_comment: Create a new comment for an image.
 - get_comment: Retrieve a specific comment by its ID.
+- get_image_comments: Retrieve a page of comments of an image.
 - update_comment: Update an existing comment.
 - delete_comment: Delete a comment.
 """
 
-from fastapi import APIRouter, Path, Depends, status, HTTPException
+from fastapi import APIRouter, Path, Query, Depends, status, HTTPException, Request
+from redis.asyncio.client import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.database.sql.models import User
 from src.auth.service import current_active_user
 from src.comment.repository import CommentQuery
-from src.image.routes import get_image
+from src.image.routes import get_image_or_404
 from src.comment.schemas import (
     CommentSchemaRequest,
     CommentSchemaResponse,
     CommentUpdateSchemaRequest,
+    CommentPageSchemaResponse,
+    CommentWithAuthorSchemaResponse,
 )
 from src.auth.utils.access import access_service
 from src.database.sql.postgres import database
+from src.database.cache.redis_conn import cache_database
+from src.utils.conditional import conditional_response, make_etag
+from src.utils.responses import FastJSONResponse, dump
 
 router = APIRouter(prefix="/comment", tags=["comments"])
 
@@ -37,6 +44,7 @@ async def create_comment(
     body: CommentSchemaRequest,
     user: User = Depends(current_active_user),
     db: AsyncSession = Depends(database),
+    cache: Redis = Depends(cache_database),
 ):
     """
     Create a new comment for an image.
@@ -44,16 +52,18 @@ async def create_comment(
     :param body: CommentSchemaRequest: The comment data.
     :param user: User: The current user creating the comment.
     :param db: AsyncSession: The database session.
+    :param cache: Redis: The Redis cache.
     :return: The created comment.
     """
-    await get_image(body.image_id, user, db)
+    await get_image_or_404(body.image_id, db)
     access_service("can_add_comment", user)
-    comment = await CommentQuery.create(body, user, db)
+    comment = await CommentQuery.create(body, user, db, cache)
     return comment
 
 
 @router.get("/{comment_id}", response_model=CommentSchemaResponse)
 async def get_comment(
+    request: Request,
     comment_id: int = Path(ge=1),
     user: User = Depends(current_active_user),
     db: AsyncSession = Depends(database),
@@ -61,6 +71,10 @@ async def get_comment(
     """
     Get a specific comment by its ID.
 
+    The response carries an ETag of the comment version; a matching
+    If-None-Match is answered with 304.
+
+    :param request: Request: The incoming request.
     :param comment_id: int: The ID of the comment to retrieve.
     :param user: User: The current user.
     :param db: AsyncSession: The database session.
@@ -71,7 +85,51 @@ async def get_comment(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found!"
         )
-    return comment
+    etag = make_etag("comment", comment.id, comment.created_at, comment.updated_at)
+    return conditional_response(
+        request,
+        etag,
+        lambda: CommentSchemaResponse.model_validate(
+            comment, from_attributes=True
+        ).model_dump_json().encode(),
+    )
+
+
+@router.get("/by-image/{image_id}", response_model=CommentPageSchemaResponse)
+async def get_image_comments(
+    image_id: int = Path(ge=1),
+    cursor: str | None = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=100),
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(database),
+):
+    """
+    Get a page of comments of an image, oldest first.
+
+    :param image_id: int: The ID of the image.
+    :param cursor: str: The next_cursor value from the previous page.
+    :param limit: int: The maximum number of comments to return.
+    :param user: User: The current user.
+    :param db: AsyncSession: The database session.
+    :return: The comments with their authors' usernames and the next cursor.
+    """
+    try:
+        comments, usernames, next_cursor = await CommentQuery.read_by_image(
+            image_id, limit, cursor, db
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor!"
+        )
+    items = [
+        dump(
+            CommentWithAuthorSchemaResponse,
+            comment,
+            username=usernames.get(comment.owner_id),
+        )
+        for comment in comments
+    ]
+    return FastJSONResponse({"items": items, "next_cursor": next_cursor})
 
 
 @router.put("/update/{comment_id}", response_model=CommentSchemaResponse)
@@ -80,6 +138,7 @@ async def update_comment(
     body: CommentUpdateSchemaRequest,
     user: User = Depends(current_active_user),
     db: AsyncSession = Depends(database),
+    cache: Redis = Depends(cache_database),
 ):
     """
    Update an existing comment.
@@ -88,6 +147,7 @@ async def update_comment(
    :param body: CommentUpdateSchemaRequest: The updated comment data.
    :param user: User: The current user.
    :param db: AsyncSession: The database session.
+   :param cache: Redis: The Redis cache.
    :return: The updated comment.
    """
     comment = await CommentQuery.read(comment_id, db)
@@ -96,7 +156,7 @@ async def update_comment(
             status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found!"
         )
     access_service("can_update_comment", user, comment)
-    comment = await CommentQuery.update(comment, body, db)
+    comment = await CommentQuery.update(comment, body, db, cache)
     return comment
 
 
@@ -105,6 +165,7 @@ async def delete_comment(
     comment_id: int = Path(ge=1),
     user: User = Depends(current_active_user),
     db: AsyncSession = Depends(database),
+    cache: Redis = Depends(cache_database),
 ):
     """
     Delete a comment.
@@ -112,6 +173,7 @@ async def delete_comment(
     :param comment_id: int: The ID of the comment to delete.
     :param user: User: The current user.
     :param db: AsyncSession: The database session.
+    :param cache: Redis: The Redis cache.
     :return: HTTP 204 No Content on success or raise HTTPException if not found.
     """
     comment = await CommentQuery.read(comment_id, db)
@@ -120,4 +182,4 @@ async def delete_comment(
             status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found!"
         )
     access_service("can_delete_comment", user, comment)
-    await CommentQuery.delete(comment, db)
+    await CommentQuery.delete(comment, db, cache)
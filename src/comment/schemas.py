@@ -24,3 +24,12 @@ class CommentSchemaResponse(CommentSchemaRequest):
 
     class Config:
         from_attributes: True
+
+
+class CommentWithAuthorSchemaResponse(CommentSchemaResponse):
+    username: str | None
+
+
+class CommentPageSchemaResponse(BaseModel):
+    items: list[CommentWithAuthorSchemaResponse]
+    next_cursor: Optional[str]
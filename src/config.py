@@ -14,6 +14,8 @@ class Settings(BaseSettings):
 
     redis_host: str = Field()
     redis_port: str = Field()
+    redis_nodes: str = Field(default="")
+    redis_vnodes: int = Field(default=160)
 
     secret_key: str = Field()
     algorithm: str = Field()
@@ -29,6 +31,74 @@ class Settings(BaseSettings):
     cloudinary_api_key: int = Field()
     cloudinary_api_secret: str = Field()
 
+    redis_max_connections: int = Field(default=50)
+    redis_pool_timeout: float = Field(default=0.2)
+    redis_socket_timeout: float = Field(default=1.0)
+    redis_connect_timeout: float = Field(default=1.0)
+    redis_retries: int = Field(default=2)
+    redis_retry_backoff_base: float = Field(default=0.02)
+    redis_retry_backoff_cap: float = Field(default=0.2)
+    redis_health_check_interval: int = Field(default=30)
+
+    sql_debug: bool = Field(default=False)
+    sql_n_plus_one_threshold: int = Field(default=3)
+    slow_query_threshold: float = Field(default=0.5)
+    slow_query_explain: bool = Field(default=False)
+    slow_query_buffer_size: int = Field(default=200)
+
+    profiler_sample_rate: float = Field(default=0.0)
+    profiler_secret: str = Field(default="")
+    profiler_interval: float = Field(default=0.005)
+    profiler_buffer_size: int = Field(default=50)
+
+    tracing_export: str = Field(default="")
+    tracing_sample_rate: float = Field(default=0.1)
+    tracing_service_name: str = Field(default="photosharehub")
+    tracing_queue_size: int = Field(default=10000)
+
+    log_level: str = Field(default="INFO")
+    log_levels: str = Field(default="")
+    log_format: str = Field(default="json")
+
+    server_host: str = Field(default="0.0.0.0")
+    server_port: int = Field(default=8000)
+    web_concurrency: int = Field(default=0)
+    server_keepalive: int = Field(default=5)
+    server_backlog: int = Field(default=2048)
+    server_graceful_timeout: int = Field(default=30)
+    server_timeout: int = Field(default=60)
+    db_pool_size: int = Field(default=5)
+    db_max_overflow: int = Field(default=10)
+    db_max_connections: int = Field(default=80)
+
+    health_check_interval: float = Field(default=5.0)
+    health_check_timeout: float = Field(default=2.0)
+
+    ranking_prior_weight: float = Field(default=5.0)
+    ranking_trending_half_life: int = Field(default=86400)
+    ranking_rebuild_interval: int = Field(default=3600)
+
+    image_counters_reconcile_interval: int = Field(default=21600)
+
+    stream_max_pending_events: int = Field(default=100)
+    stream_heartbeat_interval: float = Field(default=15.0)
+
+    tag_id_cache_size: int = Field(default=10000)
+    tag_index_rebuild_interval: int = Field(default=3600)
+    tag_related_interval: int = Field(default=21600)
+    tag_related_top_k: int = Field(default=20)
+    tag_related_max_pairs: int = Field(default=2_000_000)
+    tag_related_max_tags_per_image: int = Field(default=50)
+    tag_top_cache_ttl: int = Field(default=30)
+
+    cache_ttl_jitter: float = Field(default=0.1)
+    cache_tag_ttl: int = Field(default=86400)
+    cache_negative_ttl: int = Field(default=30)
+    cache_invalidation_grace: int = Field(default=60)
+    image_cache_ttl: int = Field(default=300)
+    cache_local_max_bytes: int = Field(default=32 * 1024 * 1024)
+    cache_local_ttl: float = Field(default=30.0)
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,269 @@
+"""
+Caching
+
+This module contains a reusable read-through cache for async repository methods.
+
+Features:
+- key templates filled from the arguments of the decorated function;
+- TTLs with random jitter, so keys filled together do not expire together;
+- tag-based group invalidation: every key is registered in the Redis sets of
+  its tags, and invalidating a tag deletes all of its keys;
+- negative caching: a None result (a 404) is cached with its own short TTL;
+- single-flight: concurrent misses for the same key in one worker wait for one
+  backend load instead of all querying Postgres. The load runs in its own
+  task, so a caller that is cancelled, e.g. by a client disconnect, does not
+  cancel it for the others;
+- no stale write-back: invalidation replaces a key with a tombstone holding a
+  unique token for `cache_invalidation_grace` seconds, instead of deleting it.
+  A load stores its result only if the key still holds what the load saw on
+  its miss (nothing, or the same tombstone), checked with WATCH. A load that
+  started before a write committed therefore cannot put the old value back
+  after the invalidation;
+- an optional in-process first tier (see src.database.cache.local) for hot
+  entries, invalidated on every worker together with Redis.
+
+Redis errors never fail a request: a cache that cannot be read is a miss, and a
+cache that cannot be written is skipped.
+
+Functions:
+- cached: Decorator for async functions returning JSON-serializable values.
+- invalidate_tags: Invalidate every cached key registered under the given tags.
+- invalidate_keys: Invalidate cached keys.
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+from typing import Any, Awaitable, Callable, Iterable
+
+from redis.exceptions import RedisError, WatchError
+
+from src.config import settings
+from src.database.cache.local import local_cache, namespace, MISSING
+from src.database.cache.redis_conn import cache_database
+from src.monitoring.metrics import cache_requests
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "cache:"
+TAG_PREFIX = "cache:tag:"
+NEGATIVE = b"\x00none"
+TOMBSTONE = b"\x00stale:"
+
+_inflight: dict[str, asyncio.Task] = {}
+
+
+def _finished(name: str, task: asyncio.Task) -> None:
+    if _inflight.get(name) is task:
+        del _inflight[name]
+    if not task.cancelled():
+        # Retrieve the exception so a load nobody waits for any more is not logged.
+        task.exception()
+
+
+def _jittered(ttl: int) -> int:
+    jitter = settings.cache_ttl_jitter
+    return max(1, round(ttl * random.uniform(1 - jitter, 1 + jitter)))
+
+
+async def _read(key: str) -> bytes | None:
+    try:
+        return await cache_database.shard(key).get(key)
+    except (RedisError, OSError, asyncio.TimeoutError):
+        logger.warning("Cache read failed for %s", key)
+        return None
+
+
+def _tombstone() -> bytes:
+    return TOMBSTONE + os.urandom(8).hex().encode()
+
+
+async def _store(key: str, value: bytes, ttl: int, seen: bytes | None) -> bool:
+    async with cache_database.shard(key).pipeline(transaction=True) as pipe:
+        await pipe.watch(key)
+        if await pipe.get(key) != seen:
+            return False
+        pipe.multi()
+        pipe.setex(key, ttl, value)
+        try:
+            await pipe.execute()
+        except WatchError:
+            return False
+    return True
+
+
+async def _write(
+    key: str, value: bytes, ttl: int, tags: list[str], seen: bytes | None
+) -> bool:
+    # False only when the key changed since the miss; a Redis error is not a
+    # reason to keep the value out of the local cache.
+    try:
+        if not await _store(key, value, ttl, seen):
+            logger.debug("Skipped the write-back of %s: invalidated meanwhile", key)
+            return False
+        results = []
+        if tags:
+            commands = []
+            for tag in tags:
+                commands.append(("sadd", TAG_PREFIX + tag, key))
+                commands.append(("expire", TAG_PREFIX + tag, settings.cache_tag_ttl))
+            results = await cache_database.pipelined(commands)
+    except (RedisError, OSError, asyncio.TimeoutError) as e:
+        results = [e]
+    if any(isinstance(result, Exception) for result in results):
+        logger.warning("Cache write failed for %s", key)
+    return True
+
+
+def cached(
+    key: str,
+    ttl: int,
+    tags: Iterable[str] = (),
+    negative_ttl: int | None = None,
+    local: bool = False,
+    raw: bool = False,
+) -> Callable:
+    """
+    Cache the result of an async function in Redis.
+
+    Templates are formatted with the bound arguments of the function, e.g.
+    ``@cached("image:{image_id}", ttl=60, tags=["image:{image_id}"])``.
+
+    :param key: str: The key template.
+    :param ttl: int: Seconds to keep a result, before jitter.
+    :param tags: Iterable[str]: Tag templates used for group invalidation.
+    :param negative_ttl: int | None: Seconds to keep a None result; None results
+        are not cached when this is not set.
+    :param local: bool: Also keep results in the in-process cache.
+    :param raw: bool: Return the serialized JSON bytes instead of the decoded
+        value, so a response can be sent without decoding and re-encoding it.
+    :return: The decorator.
+    """
+    tags = list(tags)
+
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        signature = inspect.signature(func)
+
+        async def load(name: str, seen: bytes | None, arguments: dict, args, kwargs) -> Any:
+            value = await func(*args, **kwargs)
+            if value is None:
+                if negative_ttl:
+                    stored = await _write(
+                        KEY_PREFIX + name, NEGATIVE, _jittered(negative_ttl), [], seen
+                    )
+                    if local and stored:
+                        local_cache.set(name, None, len(NEGATIVE))
+                return None
+            data = json.dumps(value, separators=(",", ":"), default=str).encode()
+            stored = await _write(
+                KEY_PREFIX + name,
+                data,
+                _jittered(ttl),
+                [tag.format(**arguments) for tag in tags],
+                seen,
+            )
+            if raw:
+                value = data
+            if local and stored:
+                local_cache.set(name, value, len(data))
+            return value
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            name = key.format(**bound.arguments)
+            namespace = name.split(":", 1)[0]
+
+            if local:
+                value = local_cache.get(name)
+                if value is not MISSING:
+                    cache_requests.labels(namespace, "local_hit").inc()
+                    return value
+            data = await _read(KEY_PREFIX + name)
+            if data is not None and not data.startswith(TOMBSTONE):
+                cache_requests.labels(namespace, "hit").inc()
+                if data == NEGATIVE:
+                    value = None
+                else:
+                    value = data if raw else json.loads(data)
+                if local:
+                    local_cache.set(name, value, len(data))
+                return value
+
+            cache_requests.labels(namespace, "miss").inc()
+            task = _inflight.get(name)
+            if task is None:
+                task = asyncio.create_task(
+                    load(name, data, bound.arguments, args, kwargs)
+                )
+                _inflight[name] = task
+                task.add_done_callback(functools.partial(_finished, name))
+            return await asyncio.shield(task)
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
+
+
+async def _invalidate(keys: list[str], tag_keys: list[str] = ()) -> None:
+    grace = settings.cache_invalidation_grace
+    commands = [("setex", key, grace, _tombstone()) for key in keys]
+    commands += [("delete", key) for key in tag_keys]
+    results = await cache_database.pipelined(commands)
+    failed = [result for result in results if isinstance(result, Exception)]
+    if failed:
+        raise failed[0]
+
+
+async def invalidate_keys(*keys: str) -> None:
+    """
+    Invalidate cached keys.
+
+    :param keys: str: Keys as produced by the key templates, without the prefix.
+    :return: None.
+    """
+    try:
+        await _invalidate([KEY_PREFIX + key for key in keys])
+    except (RedisError, OSError, asyncio.TimeoutError):
+        logger.warning("Cache invalidation failed for %s", keys)
+    await local_cache.invalidate(*keys)
+
+
+async def invalidate_tags(*tags: str) -> None:
+    """
+    Invalidate every cached key registered under the given tags.
+
+    If Redis fails, the local entries of the namespaces of the tags are dropped
+    on this worker instead, so tags must share the namespace of their keys.
+
+    :param tags: str: Formatted tag names.
+    :return: None.
+    """
+    try:
+        members = await cache_database.pipelined(
+            ("smembers", TAG_PREFIX + tag) for tag in tags
+        )
+        keys = [
+            key.decode()
+            for tag_keys in members
+            if not isinstance(tag_keys, Exception)
+            for key in tag_keys
+        ]
+        await _invalidate(keys, [TAG_PREFIX + tag for tag in tags])
+        failed = [result for result in members if isinstance(result, Exception)]
+        if failed:
+            raise failed[0]
+    except (RedisError, OSError, asyncio.TimeoutError):
+        # The keys of a tag are only known to Redis, so drop every local entry
+        # that could carry one of the tags.
+        logger.warning("Cache invalidation failed for tags %s", tags)
+        local_cache.discard_namespaces(*{namespace(tag) for tag in tags})
+        return
+    if keys:
+        await local_cache.invalidate(*[key[len(KEY_PREFIX):] for key in keys])
@@ -0,0 +1,216 @@
+"""
+Local Cache
+
+This module contains the in-process first tier of the cache.
+
+Hot entries are kept in a least-recently-used map bounded by the approximate
+size of their serialized form, so repeated reads skip the Redis round-trip and
+the JSON decoding. Entries also expire after a short TTL, which bounds the
+staleness if an invalidation message is lost.
+
+Invalidations are broadcast on a Redis channel, so every worker evicts its own
+copy of a changed entry. The cache holds entries only while that subscription
+is live: until it is established, and whenever it is lost, the cache is
+cleared and every read is a miss, as invalidations may be missed. The listener
+subscribes in the background and retries with backoff, so an unavailable
+Redis never prevents the application from starting.
+
+Hits, misses and evictions are counted per namespace, the first segment of
+the key.
+
+Classes:
+- LocalCache: The bounded in-process cache with its invalidation listener.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any
+
+from redis.asyncio.client import PubSub
+from redis.exceptions import RedisError
+
+from src.config import settings
+from src.database.cache.redis_conn import cache_database
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+ENTRY_OVERHEAD = 200
+MISSING = object()
+SUBSCRIBE_RETRY_MIN = 0.5
+SUBSCRIBE_RETRY_MAX = 30.0
+
+
+def namespace(key: str) -> str:
+    return key.split(":", 1)[0]
+
+
+class LocalCache:
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self.live = False
+        self.stats: dict[str, dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "misses": 0, "evictions": 0}
+        )
+        self._data: OrderedDict[str, tuple[float, int, Any]] = OrderedDict()
+        self._pubsub: PubSub | None = None
+        self._listener: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Any:
+        """
+        Return a cached value and mark it as recently used.
+
+        :param key: str: The cache key.
+        :return: The value or MISSING.
+        """
+        entry = self._data.get(key) if self.live else None
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.stats[namespace(key)]["misses"] += 1
+            return MISSING
+        self._data.move_to_end(key)
+        self.stats[namespace(key)]["hits"] += 1
+        return entry[2]
+
+    def set(self, key: str, value: Any, size: int) -> None:
+        """
+        Store a value and evict least recently used entries over the memory budget.
+
+        :param key: str: The cache key.
+        :param value: Any: The decoded value. Callers must not mutate it.
+        :param size: int: The size of the serialized value in bytes.
+        :return: None.
+        """
+        size += ENTRY_OVERHEAD
+        if size > self.max_bytes or not self.live:
+            return
+        self._remove(key)
+        self._data[key] = (time.monotonic() + self.ttl, size, value)
+        self.size += size
+        while self.size > self.max_bytes:
+            evicted, (_, evicted_size, _) = self._data.popitem(last=False)
+            self.size -= evicted_size
+            self.stats[namespace(evicted)]["evictions"] += 1
+
+    def _remove(self, key: str) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def discard(self, *keys: str) -> None:
+        """
+        Remove keys from this worker only.
+
+        :param keys: str: The cache keys.
+        :return: None.
+        """
+        for key in keys:
+            self._remove(key)
+
+    def discard_namespaces(self, *namespaces: str) -> None:
+        """
+        Remove every key of the given namespaces from this worker only.
+
+        :param namespaces: str: The namespaces, the first segments of the keys.
+        :return: None.
+        """
+        namespaces = set(namespaces)
+        for key in [key for key in self._data if namespace(key) in namespaces]:
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.size = 0
+
+    async def invalidate(self, *keys: str) -> None:
+        """
+        Remove keys from this worker and tell the other workers to remove them.
+
+        :param keys: str: The cache keys.
+        :return: None.
+        """
+        self.discard(*keys)
+        try:
+            cache = await cache_database()
+            await cache.publish(INVALIDATION_CHANNEL, json.dumps(keys))
+        except (RedisError, OSError, asyncio.TimeoutError):
+            logger.warning("Failed to broadcast invalidation of %s", keys)
+
+    async def start(self) -> None:
+        """
+        Start listening for invalidations from the other workers.
+
+        The subscription is made by the listener task, so this never fails
+        when Redis is unavailable.
+
+        :return: None.
+        """
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _subscribe(self) -> None:
+        cache = await cache_database()
+        self._pubsub = cache.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(INVALIDATION_CHANNEL)
+        # Entries stored before the subscription may have missed invalidations.
+        self.clear()
+        self.live = True
+        logger.info("Local cache subscribed to invalidations")
+
+    async def _unsubscribe(self) -> None:
+        self.live = False
+        self.clear()
+        if self._pubsub is not None:
+            pubsub, self._pubsub = self._pubsub, None
+            try:
+                await pubsub.reset()
+            except (RedisError, OSError):
+                pass
+
+    async def _listen(self) -> None:
+        delay = SUBSCRIBE_RETRY_MIN
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._subscribe()
+                    delay = SUBSCRIBE_RETRY_MIN
+                message = await self._pubsub.get_message(timeout=1.0)
+            except (RedisError, OSError, asyncio.TimeoutError):
+                logger.warning(
+                    "Local cache has no invalidation subscription, clearing and "
+                    "retrying in %.1f s",
+                    delay,
+                )
+                await self._unsubscribe()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, SUBSCRIBE_RETRY_MAX)
+                continue
+            if message is not None and message["type"] == "message":
+                self.discard(*json.loads(message["data"]))
+
+    async def close(self) -> None:
+        """
+        Stop listening for invalidations.
+
+        :return: None.
+        """
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await self._unsubscribe()
+
+
+local_cache = LocalCache(settings.cache_local_max_bytes, settings.cache_local_ttl)
@@ -1,18 +1,255 @@
+"""
+Redis Connector
+
+This module contains the shared Redis clients of the application.
+
+The primary node at `redis_host:redis_port` holds pub/sub channels, rankings
+and other shared structures. Cache entries can be spread over several nodes
+listed in `redis_nodes`: keys are routed with a consistent-hash ring, and
+multi-key operations are pipelined per node. Without `redis_nodes` the primary
+node is the only shard.
+
+Every client uses a bounded blocking connection pool, socket timeouts and a
+retry policy with exponential backoff, all configured from Settings. A stalled
+Redis therefore fails a command within a known time instead of hanging the
+request; callers treat such failures as cache misses.
+
+Commands and pipelines are recorded as spans of the current trace, if any.
+
+Classes:
+- CountingConnectionPool: A blocking connection pool that counts its connections.
+- TracedRedis: A Redis client that records its commands as trace spans.
+- Redis: The lazily created Redis clients with sharding and pipelining helpers
+  and pool metrics.
+"""
+
+import asyncio
+import logging
+from typing import Any, Iterable
+
 import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
+from redis.asyncio.connection import AbstractConnection, BlockingConnectionPool
+from redis.asyncio.retry import Retry
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError, RedisError, TimeoutError
 
 from src.config import settings
+from src.database.cache.sharding import HashRing
+from src.monitoring.tracing import SpanKind, span
+
+logger = logging.getLogger(__name__)
+
+
+class CountingConnectionPool(BlockingConnectionPool):
+    # Counts its own connections, so pool metrics do not read redis internals.
+    def reset(self) -> None:
+        super().reset()
+        self.created = 0
+        self.checked_out: set[AbstractConnection] = set()
+
+    def make_connection(self) -> AbstractConnection:
+        connection = super().make_connection()
+        self.created += 1
+        return connection
+
+    async def get_connection(self, command_name, *keys, **options) -> AbstractConnection:
+        connection = await super().get_connection(command_name, *keys, **options)
+        self.checked_out.add(connection)
+        return connection
+
+    async def release(self, connection: AbstractConnection) -> None:
+        self.checked_out.discard(connection)
+        await super().release(connection)
+
+
+class TracedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        with span(
+            "redis pipeline",
+            SpanKind.CLIENT,
+            {"db.system": "redis", "db.redis.commands": len(self.command_stack)},
+        ):
+            return await super().execute(raise_on_error)
+
+
+class TracedRedis(redis.Redis):
+    async def execute_command(self, *args, **options):
+        with span(f"redis {args[0]}", SpanKind.CLIENT, {"db.system": "redis"}):
+            return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None):
+        return TracedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
 
 
 class Redis:
     def __init__(self):
         self.redis_url = f"redis://{settings.redis_host}:{settings.redis_port}"
+        nodes = [node.strip() for node in settings.redis_nodes.split(",") if node.strip()]
+        self.ring = HashRing(
+            [f"redis://{node}" for node in nodes] or [self.redis_url],
+            settings.redis_vnodes,
+        )
         self.redis = None
-        print("REDIS_CONNECTOR_INITIALIZED")
+        self.clients: dict[str, TracedRedis] = {}
+        self.pools: dict[str, CountingConnectionPool] = {}
+        logger.debug("Redis connector initialized with %d nodes", len(self.ring.nodes))
+
+    def _client(self, url: str) -> TracedRedis:
+        client = self.clients.get(url)
+        if client is not None:
+            return client
+        pool = CountingConnectionPool.from_url(
+            url,
+            max_connections=settings.redis_max_connections,
+            timeout=settings.redis_pool_timeout,
+            socket_timeout=settings.redis_socket_timeout,
+            socket_connect_timeout=settings.redis_connect_timeout,
+            socket_keepalive=True,
+            health_check_interval=settings.redis_health_check_interval,
+        )
+        client = TracedRedis(
+            connection_pool=pool,
+            retry=Retry(
+                ExponentialBackoff(
+                    cap=settings.redis_retry_backoff_cap,
+                    base=settings.redis_retry_backoff_base,
+                ),
+                settings.redis_retries,
+            ),
+            retry_on_error=[ConnectionError, TimeoutError],
+        )
+        self.pools[url] = pool
+        self.clients[url] = client
+        return client
 
     async def __call__(self):
         if self.redis is None:
-            self.redis = await redis.from_url(self.redis_url)
+            self.redis = self._client(self.redis_url)
         return self.redis
 
+    def shard(self, key: str) -> redis.Redis:
+        """
+        Return the client of the node that owns a cache key.
+
+        :param key: str: The cache key.
+        :return: The Redis client.
+        """
+        return self._client(self.ring.node_for(key))
+
+    async def pipelined(
+        self, commands: Iterable[tuple[str, ...]], transaction: bool = False
+    ) -> list[Any]:
+        """
+        Send several commands with one round-trip per node.
+
+        Every command is routed by its first argument, the key. A failed
+        command does not fail the others: its result is the exception. If a
+        whole node fails, every command routed to it gets the error of that
+        node, and the results of the other nodes are kept.
+
+        :param commands: Iterable[tuple]: Commands as (name, key, *args), e.g. ("get", key).
+        :param transaction: bool: Wrap the commands of every node in MULTI/EXEC.
+        :return: The results in the order of the commands.
+        """
+        commands = list(commands)
+        groups = self.ring.group(command[1] for command in commands)
+
+        async def run(node: str, positions: list[int]) -> list[Any]:
+            async with self._client(node).pipeline(transaction=transaction) as pipe:
+                for position in positions:
+                    name, *args = commands[position]
+                    getattr(pipe, name)(*args)
+                return await pipe.execute(raise_on_error=False)
+
+        results: list[Any] = [None] * len(commands)
+        nodes = list(groups.items())
+        replies = await asyncio.gather(
+            *(run(node, p) for node, p in nodes), return_exceptions=True
+        )
+        for (_, positions), values in zip(nodes, replies):
+            if isinstance(values, BaseException):
+                if not isinstance(values, (RedisError, OSError, asyncio.TimeoutError)):
+                    raise values
+                values = [values] * len(positions)
+            for position, value in zip(positions, values):
+                results[position] = value
+        return results
+
+    async def mget(self, keys: list[str]) -> list[bytes | None]:
+        """
+        Read several cache keys with one MGET per node.
+
+        :param keys: list[str]: The keys to read.
+        :return: The values in the order of the keys, None for missing keys.
+        """
+        groups = list(self.ring.group(keys).items())
+        results: list[bytes | None] = [None] * len(keys)
+        values = await asyncio.gather(
+            *(
+                self._client(node).mget([keys[p] for p in positions])
+                for node, positions in groups
+            )
+        )
+        for (_, positions), node_values in zip(groups, values):
+            for position, value in zip(positions, node_values):
+                results[position] = value
+        return results
+
+    async def delete_many(self, keys: list[str]) -> int:
+        """
+        Delete several cache keys with one DEL per node.
+
+        :param keys: list[str]: The keys to delete.
+        :return: The number of deleted keys.
+        """
+        groups = self.ring.group(keys).items()
+        counts = await asyncio.gather(
+            *(
+                self._client(node).delete(*[keys[p] for p in positions])
+                for node, positions in groups
+            )
+        )
+        return sum(counts)
+
+    async def ping(self) -> None:
+        """
+        Ping the primary node and every cache node.
+
+        :return: None. Raises the error of the first node that failed.
+        """
+        urls = dict.fromkeys([self.redis_url, *self.ring.nodes])
+        await asyncio.gather(*(self._client(url).ping() for url in urls))
+
+    def pool_stats(self) -> dict[str, int]:
+        """
+        Report the usage of the connection pools of all nodes.
+
+        :return: A dictionary with "max", "created", "in_use" and "idle" connections.
+        """
+        stats = {"max": 0, "created": 0, "in_use": 0, "idle": 0}
+        for pool in self.pools.values():
+            in_use = len(pool.checked_out)
+            stats["max"] += pool.max_connections
+            stats["created"] += pool.created
+            stats["in_use"] += in_use
+            stats["idle"] += pool.created - in_use
+        return stats
+
+    async def close(self) -> None:
+        """
+        Close the clients and disconnect every pooled connection.
+
+        :return: None.
+        """
+        for url, client in self.clients.items():
+            await client.close()
+            await self.pools[url].disconnect()
+        self.clients.clear()
+        self.pools.clear()
+        self.redis = None
+
 
 cache_database = Redis()
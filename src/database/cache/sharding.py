@@ -0,0 +1,87 @@
+"""
+Sharding
+
+This module contains the consistent-hash ring that spreads cache keys over
+several Redis nodes.
+
+Every node is placed on the ring at many points (virtual nodes), and a key
+belongs to the first point at or after its own hash. Adding or removing a node
+only moves the keys between that node's points and their predecessors, about
+1/N of all keys, and virtual nodes keep the share of every node even.
+
+Classes:
+- HashRing: A consistent-hash ring of node names.
+"""
+
+import bisect
+import hashlib
+from collections import defaultdict
+from typing import Iterable
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 160):
+        self.vnodes = vnodes
+        self.nodes: list[str] = []
+        self._points: list[int] = []
+        self._owners: list[str] = []
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str) -> None:
+        """
+        Place a node on the ring.
+
+        :param node: str: The node name, e.g. "redis://host:6379".
+        :return: None.
+        """
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        for i in range(self.vnodes):
+            point = _hash(f"{node}#{i}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node: str) -> None:
+        """
+        Take a node off the ring. Its keys move to the following nodes.
+
+        :param node: str: The node name.
+        :return: None.
+        """
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        kept = [(p, o) for p, o in zip(self._points, self._owners) if o != node]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+
+    def node_for(self, key: str) -> str:
+        """
+        Find the node that owns a key.
+
+        :param key: str: The cache key.
+        :return: The node name.
+        """
+        if len(self.nodes) == 1:
+            return self.nodes[0]
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+    def group(self, keys: Iterable[str]) -> dict[str, list[int]]:
+        """
+        Group keys by their node.
+
+        :param keys: Iterable[str]: The cache keys.
+        :return: A mapping of node name to the positions of its keys.
+        """
+        groups = defaultdict(list)
+        for position, key in enumerate(keys):
+            groups[self.node_for(key)].append(position)
+        return groups
@@ -5,7 +5,17 @@ from fastapi_users_db_sqlalchemy import (
     SQLAlchemyBaseUserTableUUID,
     SQLAlchemyBaseOAuthAccountTableUUID,
 )
-from sqlalchemy import String, Integer, DateTime, Boolean, func, Uuid, Numeric
+from sqlalchemy import (
+    String,
+    Integer,
+    DateTime,
+    Boolean,
+    func,
+    Uuid,
+    Numeric,
+    Index,
+    UniqueConstraint,
+)
 
 
 from sqlalchemy.orm import DeclarativeBase, relationship, Mapped, mapped_column
@@ -80,9 +90,20 @@ class Permission(Base):
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        Index(
+            "ix_comments_image_id_created_at_id",
+            "image_id",
+            "created_at",
+            "id",
+            postgresql_include=["owner_id", "text", "updated_at"],
+        ),
+    )
     id: Mapped[int] = mapped_column(primary_key=True)
     owner_id: Mapped[uuid.UUID] = mapped_column(Uuid, ForeignKey("user.id"))
-    image_id: Mapped[int] = mapped_column(Integer, ForeignKey("images.id"))
+    image_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("images.id", ondelete="CASCADE")
+    )
     text: Mapped[str] = mapped_column(String(200))
 
     created_at: Mapped[datetime] = mapped_column(
@@ -107,6 +128,15 @@ class Image(Base):
     )
     rating: Mapped[Numeric(3, 2)] = mapped_column(Numeric(3, 2), default=0.00)
     edited_cloudinary_url: Mapped[str] = mapped_column(String(300), nullable=True)
+    comment_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    rating_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    tag_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
     created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
     updated_at: Mapped[datetime] = mapped_column(
         DateTime, default=None, onupdate=func.now(), nullable=True
@@ -117,10 +147,13 @@ class Image(Base):
         secondary="image_tags",
         back_populates="images",
         lazy="joined",
-        cascade="all, delete",
     )
     comments: Mapped[list[Comment]] = relationship(
-        "Comment", back_populates="image", lazy="joined", cascade="all, delete"
+        "Comment",
+        back_populates="image",
+        lazy="select",
+        cascade="all, delete",
+        passive_deletes=True,
     )
 
 
@@ -128,6 +161,9 @@ class Tag(Base):
     __tablename__ = "tags"
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(50), nullable=False, unique=True)
+    usage_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0", index=True
+    )
     images: Mapped[list[Image]] = relationship(
         "Image", secondary="image_tags", back_populates="tags"
     )
@@ -135,6 +171,9 @@ class Tag(Base):
 
 class ImageTag(Base):
     __tablename__ = "image_tags"
+    __table_args__ = (
+        UniqueConstraint("image_id", "tag_id", name="uq_image_tags_image_id_tag_id"),
+    )
     id: Mapped[int] = mapped_column(primary_key=True)
     image_id: Mapped[int] = mapped_column(Integer, ForeignKey("images.id"))
     tag_id: Mapped[int] = mapped_column(Integer, ForeignKey("tags.id"))
@@ -146,4 +185,10 @@ class Rating(Base):
     owner_id: Mapped[uuid.UUID] = mapped_column(Uuid, ForeignKey("user.id"))
     image_id: Mapped[int] = mapped_column(Integer, ForeignKey("images.id"))
     value: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=func.now(), nullable=True
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=None, onupdate=func.now(), nullable=True
+    )
     owner: Mapped[User] = relationship("User", back_populates="ratings")
@@ -1,17 +1,50 @@
 import asyncio
+import logging
+from functools import cached_property
 
 from fastapi import Depends
 from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 
 from src.database.sql.models import Base, User
 from src.database.sql.default_records import permissions
 from src.config import settings
+from src.monitoring.sql import instrument_engine
+
+logger = logging.getLogger(__name__)
+
+
+def pool_limits(workers: int) -> tuple[int, int]:
+    """
+    Size the database pool of one worker process.
+
+    Every worker gets `db_pool_size` connections and `db_max_overflow` more under
+    load, reduced so that all workers together stay within `db_max_connections`.
+    A worker needs at least one connection, so there must not be more workers
+    than `db_max_connections` (server.worker_count ensures it).
+
+    :param workers: int: The number of worker processes.
+    :return: The pool size and the maximum overflow of one worker.
+    """
+    share = max(settings.db_max_connections // max(workers, 1), 1)
+    pool_size = min(settings.db_pool_size, share)
+    max_overflow = max(min(settings.db_max_overflow, share - pool_size), 0)
+    return pool_size, max_overflow
 
 
 class Postgres:
-    def __init__(self):
+    """
+    The database connector.
+
+    The engine, and with it the asyncpg driver, is created on first use rather
+    than at import time, so importing the application stays fast, and the
+    workers of the production server (see server.py) open their own pools
+    after they are forked.
+    """
+
+    @cached_property
+    def engine(self) -> AsyncEngine:
         user = settings.postgres_user
         pwd = settings.postgres_password
         host = settings.postgres_host
@@ -21,9 +54,23 @@ class Postgres:
             f"postgresql+asyncpg://{user}:{pwd}@{host}:{port}/{db}?async_fallback=True"
         )
 
-        self.engine = create_async_engine(url, echo=False)
-        self.async_session = async_sessionmaker(self.engine, expire_on_commit=False)
-        print("POSTGRES_CONNECTOR_INITIALIZED")
+        pool_size, max_overflow = pool_limits(settings.web_concurrency)
+        engine = create_async_engine(
+            url, echo=False, pool_size=pool_size, max_overflow=max_overflow
+        )
+        instrument_engine(engine)
+        logger.debug(
+            "Postgres connector initialized for %s:%s with a pool of %d+%d",
+            host,
+            port,
+            pool_size,
+            max_overflow,
+        )
+        return engine
+
+    @cached_property
+    def async_session(self) -> async_sessionmaker[AsyncSession]:
+        return async_sessionmaker(self.engine, expire_on_commit=False)
 
     async def __call__(self):
         async with self.async_session() as session:
@@ -6,15 +6,22 @@ This module contains database query functions related to images.
 Functions:
 - create: Create a new image in the database.
 - read: Retrieve an image object from the database by its ID.
+- read_many: Retrieve several images by their IDs.
+- read_payload: Retrieve the image as JSON bytes through the Redis cache.
+- invalidate: Drop the cached payload of an image.
 - update: Update an image in the database.
-- delete: Delete an image from the database.
+- delete: Delete an image from the database and release its tags.
+- adjust_counters: Change the denormalized counters of an image.
+- reconcile_counters: Repair counters that drifted from the child tables.
 """
 
-from sqlalchemy import select
+from sqlalchemy import select, update, func, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.sql.models import Image, User
-from src.image.schemas import ImageSchemaUpdateRequest
+from src.config import settings
+from src.database.cache.caching import cached, invalidate_tags
+from src.database.sql.models import Image, User, Comment, Rating, ImageTag, Tag
+from src.image.schemas import ImageSchemaUpdateRequest, ImageSchemaResponse
 
 
 class ImageQuery:
@@ -34,6 +41,7 @@ class ImageQuery:
         image = Image(title=title, owner_id=user.id, cloudinary_url=cloudinary_url)
         session.add(image)
         await session.commit()
+        await ImageQuery.invalidate(image.id)
         return image
 
     @staticmethod
@@ -49,6 +57,61 @@ class ImageQuery:
         image = await session.execute(stmt)
         return image.scalars().unique().one_or_none()
 
+    @staticmethod
+    async def read_many(image_ids: list[int], session: AsyncSession) -> list[Image]:
+        """
+        Retrieve several images by their IDs with a single query.
+
+        :param image_ids: list[int]: The IDs of the images to retrieve.
+        :param session: AsyncSession: A database connection session.
+        :return: The images that exist, ordered by ID.
+        """
+        if not image_ids:
+            return []
+        stmt = select(Image).where(Image.id.in_(image_ids)).order_by(Image.id)
+        images = await session.execute(stmt)
+        return list(images.scalars().unique().all())
+
+    @staticmethod
+    @cached(
+        "image:{image_id}",
+        ttl=settings.image_cache_ttl,
+        tags=["image:{image_id}"],
+        negative_ttl=settings.cache_negative_ttl,
+        local=True,
+        raw=True,
+    )
+    async def read_payload(image_id: int, session: AsyncSession) -> dict | None:
+        """
+        Retrieve the serialized image through the Redis cache.
+
+        Missing images are cached too, so repeated requests for a deleted image
+        do not reach the database. The function builds a JSON-ready dict; as
+        the cache is raw, callers receive it encoded as JSON bytes.
+
+        :param image_id: int: The ID of the image to retrieve.
+        :param session: AsyncSession: A database connection session.
+        :return: The image as a dict, as JSON bytes through the cache, or None
+            if it doesn't exist.
+        """
+        image = await ImageQuery.read(image_id, session)
+        if image is None:
+            return None
+        return ImageSchemaResponse.model_validate(
+            image, from_attributes=True
+        ).model_dump(mode="json")
+
+    @staticmethod
+    async def invalidate(*image_ids: int) -> None:
+        """
+        Drop the cached payloads of images. Call it after the change is committed.
+
+        :param image_ids: int: The IDs of the changed images.
+        :return: None.
+        """
+        if image_ids:
+            await invalidate_tags(*[f"image:{image_id}" for image_id in image_ids])
+
     @staticmethod
     async def update(
             image: Image,
@@ -71,6 +134,7 @@ class ImageQuery:
             image.edited_cloudinary_url = edited_cloudinary_url
         await session.commit()
         await session.refresh(image)
+        await ImageQuery.invalidate(image.id)
         return image
 
     @staticmethod
@@ -78,9 +142,95 @@ class ImageQuery:
         """
         Delete an image from the database.
 
+        The usage counts of its tags are decremented in the same transaction,
+        as TagRepository.create increments them.
+
         :param image: Image: The image object to delete.
         :param session: AsyncSession: The database session.
         :return: None.
         """
+        await session.execute(
+            update(Tag)
+            .where(Tag.id.in_(select(ImageTag.tag_id).where(ImageTag.image_id == image.id)))
+            .values(usage_count=Tag.usage_count - 1)
+            .execution_options(synchronize_session=False)
+        )
         await session.delete(image)
         await session.commit()
+        await ImageQuery.invalidate(image.id)
+
+    @staticmethod
+    async def adjust_counters(
+            image_id: int,
+            session: AsyncSession,
+            comments: int = 0,
+            ratings: int = 0,
+            tags: int = 0,
+    ) -> None:
+        """
+        Change the denormalized counters of an image.
+
+        The update is executed in the caller's transaction and is committed
+        together with the change of the child rows. Counter changes are not
+        edits of the image, so updated_at is left as it is.
+
+        :param image_id: int: The ID of the image.
+        :param session: AsyncSession: The database session.
+        :param comments: int: The change of the comment count.
+        :param ratings: int: The change of the rating count.
+        :param tags: int: The change of the tag count.
+        :return: None.
+        """
+        values = {}
+        if comments:
+            values["comment_count"] = Image.comment_count + comments
+        if ratings:
+            values["rating_count"] = Image.rating_count + ratings
+        if tags:
+            values["tag_count"] = Image.tag_count + tags
+        if values:
+            await session.execute(
+                update(Image)
+                .where(Image.id == image_id)
+                .values(**values, updated_at=Image.updated_at)
+            )
+
+    @staticmethod
+    async def reconcile_counters(session: AsyncSession) -> int:
+        """
+        Recount comments, ratings and tags of all images and repair drifted counters.
+
+        :param session: AsyncSession: The database session.
+        :return: The number of repaired images.
+        """
+        comment_count = (
+            select(func.count())
+            .where(Comment.image_id == Image.id)
+            .scalar_subquery()
+        )
+        rating_count = (
+            select(func.count()).where(Rating.image_id == Image.id).scalar_subquery()
+        )
+        tag_count = (
+            select(func.count()).where(ImageTag.image_id == Image.id).scalar_subquery()
+        )
+        stmt = (
+            update(Image)
+            .where(
+                or_(
+                    Image.comment_count != comment_count,
+                    Image.rating_count != rating_count,
+                    Image.tag_count != tag_count,
+                )
+            )
+            .values(
+                comment_count=comment_count,
+                rating_count=rating_count,
+                tag_count=tag_count,
+                updated_at=Image.updated_at,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.execute(stmt)
+        await session.commit()
+        return result.rowcount
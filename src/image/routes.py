@@ -3,6 +3,9 @@ Image API Routes
 
 This module contains FastAPI routes related to images.
 
+Functions:
+- get_image_or_404: Load an image for other routes or raise 404.
+
 Routes:
 - get_image: Retrieve an image by its ID.
 - create_image: Create a new image.
@@ -12,7 +15,18 @@ Routes:
 - transform_image: Transform an image.
 """
 
-from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Form
+import time
+
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Depends,
+    status,
+    UploadFile,
+    File,
+    Form,
+    Request,
+)
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from redis.asyncio.client import Redis
@@ -21,7 +35,7 @@ from redis.asyncio.client import Redis
 from src.auth.service import current_active_user
 from src.database.sql.postgres import database
 from src.database.cache.redis_conn import cache_database
-from src.database.sql.models import User
+from src.database.sql.models import User, Image
 from src.image.repository import ImageQuery
 from src.image.schemas import (
     ImageSchemaResponse,
@@ -30,13 +44,33 @@ from src.image.schemas import (
 )
 from src.auth.utils.access import access_service
 from src.image.utils.cloudinary_service import UploadImage, ImageEditor
+from src.tag.index import tag_index
+from src.monitoring.metrics import image_upload_bytes, image_upload_seconds
+from src.utils.conditional import conditional_response, make_etag
 
 router = APIRouter(prefix="/image", tags=["images"])
 
 
+async def get_image_or_404(image_id: int, db: AsyncSession) -> Image:
+    """
+    Load an image from the database for routes that change it or its children.
+
+    :param image_id: int: The ID of the image.
+    :param db: AsyncSession: The database session.
+    :return: The image object.
+    """
+    image = await ImageQuery.read(image_id, db)
+    if not image:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Image not found!"
+        )
+    return image
+
+
 @router.get("/{image_id}", response_model=ImageSchemaResponse)
 async def get_image(
     image_id: int,
+    request: Request,
     user: User = Depends(current_active_user),
     db: AsyncSession = Depends(database),
     cache: Redis = Depends(cache_database),
@@ -44,18 +78,22 @@ async def get_image(
     """
     Retrieve an image by its ID.
 
+    The image is served as pre-serialized JSON from the cache, with an ETag of
+    its content; a matching If-None-Match is answered with 304.
+
     :param image_id: int: The ID of the image to retrieve.
+    :param request: Request: The incoming request.
     :param user: User: The current user.
     :param db: AsyncSession: The database session.
     :param cache: Redis: The Redis cache.
     :return: An image object.
     """
-    image = await ImageQuery.read(image_id, db)
-    if not image:
+    image = await ImageQuery.read_payload(image_id, db)
+    if image is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Image not found!"
         )
-    return image
+    return conditional_response(request, make_etag(image), lambda: image)
 
 
 @router.post(
@@ -79,10 +117,14 @@ async def create_image(
     :return: The created image object.
     """
     access_service("can_add_image", user)
+    started = time.perf_counter()
+    image_upload_bytes.inc(image_file.size or 0)
     public_id = UploadImage.generate_name_folder(user)
     r = UploadImage.upload(image_file.file, public_id)
     src_url = UploadImage.get_pic_url(public_id, r)
     image = await ImageQuery.create(title, src_url, user, db)
+    await tag_index.publish(cache, "image.add", image.id)
+    image_upload_seconds.observe(time.perf_counter() - started)
 
     return image
 
@@ -124,7 +166,7 @@ async def update_image(
     :param cache: Redis: The Redis cache.
     :return: The updated image object.
     """
-    image = await get_image(image_id, user, db, cache)
+    image = await get_image_or_404(image_id, db)
     access_service("can_update_image", user, image)
     image = await ImageQuery.update(image, db, image_data=image_data)
     return image
@@ -146,9 +188,10 @@ async def delete_image(
     :param cache: Redis: The Redis cache.
     :return: None.
     """
-    image = await get_image(image_id, user, db, cache)
+    image = await get_image_or_404(image_id, db)
     access_service("can_delete_image", user, image)
     await ImageQuery.delete(image, db)
+    await tag_index.publish(cache, "image.remove", image_id)
 
 
 @router.post(
@@ -175,7 +218,7 @@ async def transform_image(
     :param cache: Redis: The Redis cache.
     :return: The transformed image object.
     """
-    image = await get_image(image_id, user, db, cache)
+    image = await get_image_or_404(image_id, db)
     access_service("can_update_image", user, image)
     original_img_url = image.cloudinary_url
     edited_img_url = await ImageEditor().edit_image(
@@ -56,6 +56,9 @@ class ImageSchemaResponse(ImageSchemaRequest):
     owner_id: uuid.UUID
     cloudinary_url: str
     edited_cloudinary_url: str | None
+    comment_count: int
+    rating_count: int
+    tag_count: int
     created_at: datetime
     updated_at: datetime | None
 
@@ -0,0 +1,40 @@
+"""
+Image Tasks
+
+This module contains the periodic job that repairs the denormalized image and
+tag counters.
+"""
+
+import logging
+
+from src.config import settings
+from src.database.sql.postgres import database
+from src.image.repository import ImageQuery
+from src.tag.repository import TagRepository
+from src.utils.periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+
+async def reconcile_image_counters() -> None:
+    """
+    Repair image and tag usage counters that drifted from the child tables.
+
+    :return: None.
+    """
+    async with database.async_session() as session:
+        repaired = await ImageQuery.reconcile_counters(session)
+        repaired_tags = await TagRepository.reconcile_usage_counts(session)
+    if repaired:
+        logger.warning("Repaired counters of %s images", repaired)
+    if repaired_tags:
+        logger.warning("Repaired usage counts of %s tags", repaired_tags)
+
+
+counters_reconcile_task = PeriodicTask(
+    "image-counters-reconcile",
+    settings.image_counters_reconcile_interval,
+    reconcile_image_counters,
+    run_on_start=False,
+    cluster=True,
+)
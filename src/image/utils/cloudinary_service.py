@@ -1,22 +1,36 @@
+import logging
 import re
+import time
 import uuid
 from datetime import datetime
-
-import cloudinary.uploader
+from functools import lru_cache
+from types import ModuleType
 
 from src.config import settings
 from src.database.sql.models import User
 from src.image.schemas import EditFormData
+from src.monitoring.metrics import cloudinary_request_seconds
+from src.monitoring.tracing import SpanKind, span
 
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _cloudinary() -> ModuleType:
+    # The SDK is imported and configured on first use rather than at startup.
+    import cloudinary
+    import cloudinary.uploader
 
-class UploadImage:
     cloudinary.config(
         cloud_name=settings.cloudinary_name,
         api_key=settings.cloudinary_api_key,
         api_secret=settings.cloudinary_api_secret,
         secure=True,
     )
+    return cloudinary
+
 
+class UploadImage:
     @staticmethod
     def generate_name_folder(user: User, edited: bool = False):
         current_date = datetime.now()
@@ -29,14 +43,24 @@ class UploadImage:
 
     @staticmethod
     def upload(file, public_id: str):
-        r = cloudinary.uploader.upload(file, public_id=public_id, overwrite=True)
+        started = time.perf_counter()
+        try:
+            with span("cloudinary.upload", SpanKind.CLIENT, {"public_id": public_id}):
+                r = _cloudinary().uploader.upload(
+                    file, public_id=public_id, overwrite=True
+                )
+        finally:
+            cloudinary_request_seconds.labels("upload").observe(
+                time.perf_counter() - started
+            )
         return r
 
     @staticmethod
     def get_pic_url(public_id, r):
-        src_url = cloudinary.CloudinaryImage(public_id).build_url(
-            # version=r.get("version")
-        )
+        with span("cloudinary.url", attributes={"public_id": public_id}):
+            src_url = _cloudinary().CloudinaryImage(public_id).build_url(
+                # version=r.get("version")
+            )
         return src_url
 
 
@@ -51,13 +75,13 @@ class ImageEditor(UploadImage):
             raise ValueError("Invalid URL format")
 
         public_id = match.group()
-        print(public_id)
+        logger.debug("Editing image %s", public_id)
 
         if edit_data:
             image_edit_html = await self._edit_image_cloudinary(public_id, edit_data)
             pattern2 = re.search(r'src="([^"]+)"', image_edit_html)
             image_edit = pattern2.group(1)
-            print(pattern2.group(1))
+            logger.debug("Edited image URL %s", image_edit)
             return image_edit
 
         raise ValueError("No transformation specified")
@@ -86,6 +110,7 @@ class ImageEditor(UploadImage):
             transformation.append({"effect": "simulate_colorblind:cone_monochromacy"})
         if edit_data.rotation:
             transformation.append({"angle": edit_data.rotation.angle})
-        return cloudinary.CloudinaryImage(public_id).image(
-            transformation=transformation
-        )
+        with span("cloudinary.transform", attributes={"public_id": public_id}):
+            return _cloudinary().CloudinaryImage(public_id).image(
+                transformation=transformation
+            )
@@ -0,0 +1,211 @@
+"""
+Health
+
+This module answers the liveness and readiness probes of the load balancer or
+orchestrator without touching any dependency on the request path.
+
+A background task of every worker checks the dependencies every
+`health_check_interval` seconds: Postgres with `SELECT 1` and every Redis node
+with `PING`. Each check is cut off after `health_check_timeout` seconds, so a
+stalled dependency is reported as failing instead of hanging the checker. The
+same run records the saturation of the database and Redis connection pools and
+the depth of the in-process queues (stream events, log records, spans).
+
+The probes only read that cached report:
+
+- GET /livez answers 200 while the worker serves requests at all;
+- GET /readyz answers 200 when the last check succeeded for every critical
+  dependency and is recent, and 503 otherwise.
+
+Postgres is critical. Redis is not: the application treats Redis failures as
+cache misses, so a failing Redis makes the worker "degraded" but still ready.
+A report older than three intervals plus the timeout is "stale" and not ready,
+as the checker itself is stuck or the event loop is blocked.
+
+Classes:
+- HealthChecker: The background checker and its cached report.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable
+
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+from src.config import settings
+from src.database.cache.redis_conn import cache_database
+from src.database.sql.postgres import database, pool_limits
+from src.monitoring import logs
+from src.monitoring.tracing import exporter
+from src.stream.broker import event_broker
+from src.utils.periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+
+async def _check_postgres() -> None:
+    async with database.engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+async def _check_redis() -> None:
+    await cache_database.ping()
+
+
+def _saturation(in_use: int, capacity: int) -> float:
+    return round(in_use / capacity, 3) if capacity else 0.0
+
+
+def _pools() -> dict:
+    pools = {}
+    pool = database.engine.pool
+    if isinstance(pool, QueuePool):
+        _, max_overflow = pool_limits(settings.web_concurrency)
+        capacity = pool.size() + max_overflow
+        pools["postgres"] = {
+            "size": pool.size(),
+            "capacity": capacity,
+            "in_use": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "saturation": _saturation(pool.checkedout(), capacity),
+        }
+    redis_stats = cache_database.pool_stats()
+    pools["redis"] = {
+        "capacity": redis_stats["max"],
+        "in_use": redis_stats["in_use"],
+        "idle": redis_stats["idle"],
+        "saturation": _saturation(redis_stats["in_use"], redis_stats["max"]),
+    }
+    return pools
+
+
+def _queues() -> dict:
+    return {
+        **event_broker.stats(),
+        "log_records": logs.queue_depth(),
+        "spans": exporter.queue_depth(),
+    }
+
+
+class HealthChecker:
+    def __init__(self, interval: float, timeout: float):
+        """
+        Create a health checker.
+
+        :param interval: float: Seconds between two checks.
+        :param timeout: float: Seconds after which a single check fails.
+        """
+        self.interval = interval
+        self.timeout = timeout
+        self.checks: dict[str, tuple[Callable[[], Awaitable[None]], bool]] = {}
+        self.max_age = 3 * interval + timeout
+        self._report: dict = {}
+        self._ready = False
+        self._failing: list[str] | None = None
+        self._checked_at: float | None = None
+        self._task = PeriodicTask("health-check", interval, self.check)
+
+    def add_check(
+        self, name: str, check: Callable[[], Awaitable[None]], critical: bool = True
+    ) -> None:
+        """
+        Register a dependency check.
+
+        :param name: str: The name of the dependency in the report.
+        :param check: Callable: An async callable that raises if the dependency fails.
+        :param critical: bool: Whether the worker is not ready while it fails.
+        :return: None.
+        """
+        self.checks[name] = (check, critical)
+
+    async def _run_check(self, check: Callable[[], Awaitable[None]]) -> dict:
+        started = time.perf_counter()
+        error = None
+        try:
+            await asyncio.wait_for(check(), self.timeout)
+        except asyncio.TimeoutError:
+            error = f"timed out after {self.timeout} s"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        result = {
+            "ok": error is None,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        if error is not None:
+            result["error"] = error
+        return result
+
+    async def check(self) -> None:
+        """
+        Check every dependency concurrently and replace the cached report.
+
+        :return: None.
+        """
+        results = await asyncio.gather(
+            *(self._run_check(check) for check, _ in self.checks.values())
+        )
+        dependencies = dict(zip(self.checks, results))
+        ready = all(
+            dependencies[name]["ok"]
+            for name, (_, critical) in self.checks.items()
+            if critical
+        )
+        failing = [name for name, result in dependencies.items() if not result["ok"]]
+        if failing != self._failing:
+            if failing:
+                logger.warning("Health check failed for %s", ", ".join(failing))
+            else:
+                logger.info("Health check passed")
+            self._failing = failing
+        if ready and all(result["ok"] for result in results):
+            status = "ok"
+        else:
+            status = "degraded" if ready else "failing"
+        self._report = {
+            "status": status,
+            "checked_at": datetime.utcnow(),
+            "dependencies": dependencies,
+            "pools": _pools(),
+            "queues": _queues(),
+        }
+        self._ready = ready
+        self._checked_at = time.monotonic()
+
+    def readiness(self) -> tuple[bool, dict]:
+        """
+        Read the cached report. Never waits on a dependency.
+
+        :return: Whether the worker is ready, and the report.
+        """
+        if self._checked_at is None:
+            return False, {"status": "starting"}
+        age = time.monotonic() - self._checked_at
+        report = {**self._report, "age_s": round(age, 3)}
+        if age > self.max_age:
+            report["status"] = "stale"
+            return False, report
+        return self._ready, report
+
+    def start(self) -> None:
+        """
+        Start checking in the background.
+
+        :return: None.
+        """
+        self._task.start()
+
+    async def stop(self) -> None:
+        """
+        Stop checking. The report stays as it was.
+
+        :return: None.
+        """
+        await self._task.stop()
+
+
+health_checker = HealthChecker(settings.health_check_interval, settings.health_check_timeout)
+health_checker.add_check("postgres", _check_postgres)
+health_checker.add_check("redis", _check_redis, critical=False)
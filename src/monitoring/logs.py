@@ -0,0 +1,224 @@
+"""
+Logs
+
+This module configures logging: JSON records, request IDs, per-module levels
+and a non-blocking handler.
+
+Records are put on an in-memory queue by the calling code and written to
+stderr by a background thread, so a slow console or log collector never blocks
+the event loop. Before a record is queued, its message is rendered, its
+exception formatted, and the ID of the current request and trace attached, as
+these are only available in the calling context.
+
+With `log_format` "json" (the default) every record is one JSON object per line
+with the timestamp, level, logger, message, request and trace IDs, exception
+and any `extra` fields; "text" writes a plain line for local development.
+
+`log_level` sets the level of the root logger, and `log_levels` the levels of
+single modules, e.g. "sqlalchemy.engine=INFO,src.monitoring.sql=DEBUG".
+
+The request ID is taken from the `X-Request-ID` header, or generated, and
+returned in the response header of the same name.
+
+A forked worker process starts its own writer thread with an empty queue, as
+threads do not survive fork().
+
+Classes:
+- JSONFormatter: Render a record as a JSON line.
+- ContextQueueHandler: Queue records with the context of the caller.
+- RequestIdMiddleware: ASGI middleware that assigns request IDs.
+
+Functions:
+- setup_logging: Configure the root logger. Call it once at startup.
+- current_request_id: Return the ID of the current request.
+- queue_depth: The number of records waiting to be written.
+"""
+
+import atexit
+import copy
+import logging
+import os
+import queue
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+import orjson
+
+from src.config import settings
+from src.monitoring.tracing import current_span
+
+REQUEST_ID_HEADER = b"x-request-id"
+MAX_REQUEST_ID_LENGTH = 128
+
+_request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+# Attributes of every LogRecord; the other attributes come from `extra`.
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {
+    "message",
+    "asctime",
+    "request_id",
+    "trace_id",
+    "span_id",
+    # Uvicorn's ANSI-coloured copy of the message.
+    "color_message",
+}
+
+_listener: QueueListener | None = None
+
+
+def current_request_id() -> str | None:
+    return _request_id.get()
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in ("request_id", "trace_id", "span_id"):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        return orjson.dumps(entry, default=str).decode()
+
+
+class ContextQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Render a record in the calling context so it can cross to another thread.
+
+        :param record: LogRecord: The record.
+        :return: A copy of the record with its message rendered and the IDs of
+            the current request and trace attached.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        request_id = _request_id.get()
+        if request_id is not None:
+            record.request_id = request_id
+        span = current_span()
+        if span is not None:
+            record.trace_id = span.trace_id
+            record.span_id = span.span_id
+        return record
+
+
+def _parse_levels(levels: str) -> dict[str, str]:
+    result = {}
+    for item in levels.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            result[name.strip()] = level.strip().upper()
+    return result
+
+
+def setup_logging() -> None:
+    """
+    Route all records through a queue to a JSON or text handler on stderr.
+
+    Uvicorn's loggers are routed the same way. Calling it again does nothing.
+
+    :return: None.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    handler = logging.StreamHandler()
+    if settings.log_format == "text":
+        handler.setFormatter(
+            logging.Formatter(
+                "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s",
+                defaults={"request_id": "-"},
+            )
+        )
+    else:
+        handler.setFormatter(JSONFormatter())
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(ContextQueueHandler(records))
+    root.setLevel(settings.log_level.upper())
+
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logger = logging.getLogger(name)
+        logger.handlers.clear()
+        logger.propagate = True
+    for name, level in _parse_levels(settings.log_levels).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(records, handler)
+    _listener.start()
+    atexit.register(_stop_listener)
+    os.register_at_fork(after_in_child=_restart_listener)
+
+
+def queue_depth() -> int:
+    return _listener.queue.qsize() if _listener is not None else 0
+
+
+def _stop_listener() -> None:
+    if _listener is not None:
+        _listener.stop()
+
+
+def _restart_listener() -> None:
+    global _listener
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, ContextQueueHandler):
+            handler.queue = records
+    _listener = QueueListener(records, *_listener.handlers)
+    _listener.start()
+
+
+class RequestIdMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")[:MAX_REQUEST_ID_LENGTH]
+                break
+        if not request_id:
+            request_id = uuid.uuid4().hex
+        token = _request_id.set(request_id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (REQUEST_ID_HEADER, request_id.encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _request_id.reset(token)
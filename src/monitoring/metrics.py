@@ -0,0 +1,362 @@
+"""
+Metrics
+
+This module contains a small in-process metrics registry and the metrics of the
+application, exposed in the Prometheus text format at /metrics.
+
+Recording is cheap on the hot path: a labelled child is looked up once per
+label tuple and keeps its rendered label text, histograms find their bucket
+with a binary search, and nothing is allocated per request beyond the label
+tuple itself. Values that already live elsewhere, such as pool usage, SQL
+totals, local cache statistics and dropped spans, are read by collectors at
+scrape time.
+
+Every worker process keeps its own registry, so a scrape reports the worker
+that served it.
+
+Classes:
+- Counter: A monotonically increasing value.
+- Gauge: A value that goes up and down.
+- Histogram: Observations counted in fixed buckets.
+- Registry: The set of metrics and collectors, rendered as text.
+- MetricsMiddleware: ASGI middleware that records request latency.
+"""
+
+import bisect
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Sample = tuple[str, str, float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _braces(text: str) -> str:
+    return f"{{{text}}}" if text else ""
+
+
+class _CounterChild:
+    __slots__ = ("label_text", "value")
+
+    def __init__(self, label_text: str):
+        self.label_text = label_text
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("label_text", "bounds", "counts", "sum")
+
+    def __init__(self, label_text: str, bounds: tuple[float, ...]):
+        self.label_text = label_text
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple, object] = {}
+        if not self.labelnames:
+            self._default = self.labels()
+
+    @abstractmethod
+    def _child(self, label_text: str):
+        """
+        Create the child that records the values of one label tuple.
+
+        :param label_text: str: The rendered labels of the child.
+        :return: The new child.
+        """
+
+    def labels(self, *values):
+        """
+        Return the child for a tuple of label values, creating it on first use.
+
+        :param values: The label values in the order of the label names.
+        :return: The child to record into.
+        """
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._child(
+                _label_text(self.labelnames, values)
+            )
+        return child
+
+    def samples(self) -> Iterable[Sample]:
+        for child in list(self._children.values()):
+            yield self.name, child.label_text, child.value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _child(self, label_text: str) -> _CounterChild:
+        return _CounterChild(label_text)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _child(self, label_text: str) -> _GaugeChild:
+        return _GaugeChild(label_text)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _child(self, label_text: str) -> _HistogramChild:
+        return _HistogramChild(label_text, self.bounds)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def samples(self) -> Iterable[Sample]:
+        for child in list(self._children.values()):
+            prefix = f"{child.label_text}," if child.label_text else ""
+            cumulative = 0
+            for bound, count in zip(self.bounds, child.counts):
+                cumulative += count
+                yield f"{self.name}_bucket", f'{prefix}le="{bound}"', cumulative
+            cumulative += child.counts[-1]
+            yield f"{self.name}_bucket", f'{prefix}le="+Inf"', cumulative
+            yield f"{self.name}_sum", child.label_text, child.sum
+            yield f"{self.name}_count", child.label_text, cumulative
+
+
+Collector = Callable[[], Iterable[tuple[str, str, str, Iterable[tuple[tuple, float]]]]]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Collector] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, func: Collector) -> Collector:
+        """
+        Register a function called at scrape time.
+
+        It yields (name, type, help, samples), where samples are
+        (label pairs, value) and label pairs are ((name, value), ...).
+
+        :param func: Collector: The collector.
+        :return: The collector, so this can be used as a decorator.
+        """
+        self._collectors.append(func)
+        return func
+
+    def expose(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        :return: The exposition text.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, label_text, value in metric.samples():
+                lines.append(f"{name}{_braces(label_text)} {value}")
+        for collector in self._collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+                    lines.append(f"{name}{_braces(label_text)} {value}")
+        lines.append("")
+        return "\n".join(lines)
+
+
+registry = Registry()
+
+http_request_seconds = registry.histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template, method and status.",
+    ("route", "method", "status"),
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "Requests currently being served."
+)
+image_upload_bytes = registry.counter(
+    "image_upload_bytes_total", "Bytes of uploaded image files."
+)
+image_upload_seconds = registry.histogram(
+    "image_upload_duration_seconds", "Time to handle an image upload end to end."
+)
+cloudinary_request_seconds = registry.histogram(
+    "cloudinary_request_duration_seconds",
+    "Latency of Cloudinary API calls.",
+    ("operation",),
+)
+email_send_seconds = registry.histogram(
+    "email_send_duration_seconds", "Latency of sending an email.", ("template", "result")
+)
+cache_requests = registry.counter(
+    "cache_requests_total",
+    "Lookups of the Redis cache layer by key namespace and result.",
+    ("namespace", "result"),
+)
+
+
+@registry.collector
+def _pools():
+    from src.database.cache.redis_conn import cache_database
+    from src.database.sql.postgres import database
+
+    pool = database.engine.pool
+    yield "db_pool_size", "gauge", "Configured size of the database pool.", [
+        ((), pool.size())
+    ]
+    yield "db_pool_checked_out", "gauge", "Database connections in use.", [
+        ((), pool.checkedout())
+    ]
+    yield "db_pool_overflow", "gauge", "Database connections over the pool size.", [
+        ((), max(pool.overflow(), 0))
+    ]
+    redis_stats = cache_database.pool_stats()
+    yield "redis_pool_connections", "gauge", "Redis connections by state.", [
+        ((("state", state),), redis_stats[state]) for state in ("in_use", "idle")
+    ]
+    yield "redis_pool_max_connections", "gauge", "Redis pool capacity.", [
+        ((), redis_stats["max"])
+    ]
+
+
+@registry.collector
+def _sql():
+    from src.monitoring.sql import route_stats
+
+    items = list(route_stats.items())
+    yield "db_queries_total", "counter", "SQL statements by route.", [
+        ((("route", route),), stats.queries) for route, stats in items
+    ]
+    yield "db_query_seconds_total", "counter", "Time spent in SQL by route.", [
+        ((("route", route),), stats.seconds) for route, stats in items
+    ]
+    yield "db_n_plus_one_total", "counter", "Repeated statement shapes by route.", [
+        ((("route", route),), stats.n_plus_one) for route, stats in items
+    ]
+
+
+@registry.collector
+def _local_cache():
+    from src.database.cache.local import local_cache
+
+    items = list(local_cache.stats.items())
+    for result in ("hits", "misses", "evictions"):
+        yield f"local_cache_{result}_total", "counter", f"Local cache {result}.", [
+            ((("namespace", namespace),), stats[result]) for namespace, stats in items
+        ]
+    yield "local_cache_bytes", "gauge", "Approximate size of the local cache.", [
+        ((), local_cache.size)
+    ]
+
+
+@registry.collector
+def _tracing():
+    from src.monitoring.tracing import exporter
+
+    yield "tracing_spans_dropped_total", "counter", "Spans dropped on a full queue.", [
+        ((), exporter.dropped)
+    ]
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            http_request_seconds.labels(
+                route.path if route is not None else "unmatched",
+                scope["method"],
+                status,
+            ).observe(time.perf_counter() - started)
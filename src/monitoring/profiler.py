@@ -0,0 +1,301 @@
+"""
+Profiler
+
+This module contains an on-demand sampling profiler for single requests.
+
+A request is profiled when:
+- it is picked at random with probability `profiler_sample_rate`, or
+- it carries an `X-Profile` header signed with `profiler_secret`, as issued to
+  superusers by the profiler admin routes.
+
+While at least one request is being profiled, a background thread wakes up
+every `profiler_interval` seconds and records one stack per profiled request:
+- if the request's task is running, the stack of the event loop thread,
+  from the task's coroutine down to the executing frame;
+- otherwise, the chain of coroutines the task is suspended in, ending with an
+  `[await]` frame. These samples show where the request waits, e.g. on the
+  database or Redis.
+
+Samples are therefore taken over wall-clock time, and a request that blocks the
+event loop shows the blocking frame. Stacks are kept as counts of collapsed
+stacks, the input format of flamegraph tools, and the last
+`profiler_buffer_size` profiles are kept in a ring buffer. Every worker process
+keeps its own buffer.
+
+When neither a sample rate nor a secret is configured, the middleware is not
+installed and requests pay nothing. Requests that are not picked pay for one
+random number and a header lookup. The sampler thread only runs while a
+profiled request is in flight.
+
+Classes:
+- Profile: The samples of one request.
+- Sampler: The background thread that samples the profiled requests.
+- ProfilerMiddleware: ASGI middleware that picks requests to profile.
+
+Functions:
+- sign_profile_header: Issue an X-Profile header value for a path.
+- verify_profile_header: Check an X-Profile header value.
+- profiler_enabled: Whether the middleware should be installed.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import itertools
+import logging
+import random
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from types import CodeType, FrameType
+
+from src.config import settings
+from src.monitoring.sql import route_name
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+AWAIT_FRAME = "[await]"
+
+_ids = itertools.count(1)
+
+
+class Profile:
+    __slots__ = (
+        "id",
+        "method",
+        "path",
+        "route",
+        "reason",
+        "started_at",
+        "duration",
+        "samples",
+    )
+
+    def __init__(self, method: str, path: str, reason: str):
+        self.id = next(_ids)
+        self.method = method
+        self.path = path
+        self.route = None
+        self.reason = reason
+        self.started_at = datetime.utcnow()
+        self.duration = 0.0
+        self.samples: Counter[tuple[str, ...]] = Counter()
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "reason": self.reason,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 2),
+            "samples": sum(self.samples.values()),
+        }
+
+    def collapsed(self) -> str:
+        """
+        Render the samples as collapsed stacks, one "frame;frame;... count" per line.
+
+        :return: The text, ready for flamegraph.pl or speedscope.
+        """
+        return "".join(
+            f"{';'.join(stack)} {count}\n" for stack, count in self.samples.items()
+        )
+
+
+_STDLIB = sysconfig.get_paths()["stdlib"] + "/"
+
+_labels: dict[CodeType, str] = {}
+
+
+def _short_path(filename: str) -> str:
+    if "/site-packages/" in filename:
+        return filename.rsplit("/site-packages/", 1)[1]
+    if filename.startswith(_STDLIB):
+        return filename[len(_STDLIB) :]
+    if "/src/" in filename:
+        return "src/" + filename.rsplit("/src/", 1)[1]
+    return filename
+
+
+def _label(code: CodeType) -> str:
+    label = _labels.get(code)
+    if label is None:
+        path = _short_path(code.co_filename)
+        label = _labels[code] = f"{code.co_qualname} ({path}:{code.co_firstlineno})"
+    return label
+
+
+def _await_chain(coro) -> list[FrameType]:
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return frames
+
+
+def _thread_stack(frame: FrameType, root: FrameType | None) -> list[FrameType]:
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        if frame is root:
+            break
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+class Sampler:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._targets: dict[
+            asyncio.Task, tuple[asyncio.AbstractEventLoop, int, Profile]
+        ] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def add(self, task: asyncio.Task, profile: Profile) -> None:
+        """
+        Start sampling a task. Call it from the task's event loop.
+
+        :param task: asyncio.Task: The task serving the request.
+        :param profile: Profile: Where to record the samples.
+        :return: None.
+        """
+        with self._lock:
+            self._targets[task] = (task.get_loop(), threading.get_ident(), profile)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="request-profiler", daemon=True
+                )
+                self._thread.start()
+
+    def remove(self, task: asyncio.Task) -> None:
+        with self._lock:
+            self._targets.pop(task, None)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._targets:
+                    self._thread = None
+                    return
+                targets = list(self._targets.items())
+            try:
+                self._sample(targets)
+            except Exception:
+                logger.exception("Profiler sample failed")
+
+    @staticmethod
+    def _sample(targets) -> None:
+        frames = sys._current_frames()
+        for task, (loop, thread_id, profile) in targets:
+            coro = task.get_coro()
+            # With an explicit loop, current_task may be called from any thread.
+            if asyncio.current_task(loop) is task and thread_id in frames:
+                stack = [
+                    _label(frame.f_code)
+                    for frame in _thread_stack(frames[thread_id], coro.cr_frame)
+                ]
+            else:
+                stack = [_label(frame.f_code) for frame in _await_chain(coro)]
+                stack.append(AWAIT_FRAME)
+            if stack:
+                profile.samples[tuple(stack)] += 1
+
+
+sampler = Sampler(settings.profiler_interval)
+profiles: deque[Profile] = deque(maxlen=settings.profiler_buffer_size)
+
+
+def _signature(expires: int, path: str) -> str:
+    message = f"{expires}:{path}".encode()
+    key = settings.profiler_secret.encode()
+    return hmac.new(key, message, hashlib.sha256).hexdigest()
+
+
+def sign_profile_header(path: str, ttl: int = 300) -> str:
+    """
+    Issue an X-Profile header value that profiles requests to one path.
+
+    :param path: str: The request path, without the query string.
+    :param ttl: int: How long the value is valid, in seconds.
+    :return: The header value, "<expires>.<signature>".
+    """
+    expires = int(time.time()) + ttl
+    return f"{expires}.{_signature(expires, path)}"
+
+
+def verify_profile_header(value: str, path: str) -> bool:
+    """
+    Check an X-Profile header value against the request path.
+
+    :param value: str: The header value.
+    :param path: str: The request path.
+    :return: True if the value was signed for this path and has not expired.
+    """
+    if not settings.profiler_secret:
+        return False
+    expires, _, signature = value.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(int(expires), path))
+
+
+def profiler_enabled() -> bool:
+    return settings.profiler_sample_rate > 0 or bool(settings.profiler_secret)
+
+
+class ProfilerMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    def _reason(self, scope) -> str | None:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                if verify_profile_header(value.decode("latin-1"), scope["path"]):
+                    return "signed"
+                logger.warning("Rejected X-Profile header for %s", scope["path"])
+                break
+        if random.random() < settings.profiler_sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        reason = self._reason(scope)
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope["method"], scope["path"], reason)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-profile-id", str(profile.id).encode()),
+                ]
+            await send(message)
+
+        task = asyncio.current_task()
+        sampler.add(task, profile)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.remove(task)
+            profile.duration = time.perf_counter() - started
+            profile.route = route_name(scope)
+            profiles.append(profile)
@@ -0,0 +1,110 @@
+"""
+Monitoring Routes
+
+This module defines the admin routes of the request profiler and the slow
+query log. They are open to superusers only.
+
+Routes:
+- POST /admin/profiler/header: Issue a signed X-Profile header for a path.
+- GET /admin/profiler/profiles: List the recent profiles of this worker.
+- GET /admin/profiler/profiles/{profile_id}: Get a profile as collapsed stacks.
+- GET /admin/slow-queries: List the slow queries seen by this worker.
+"""
+
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+
+from src.auth.service import current_active_user
+from src.config import settings
+from src.database.sql.models import User
+from src.monitoring.profiler import profiles, sign_profile_header
+from src.monitoring.slow_queries import slow_query_log
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+async def superuser(user: User = Depends(current_active_user)) -> User:
+    """
+    Allow only superusers.
+
+    :param user: User: The current user.
+    :return: The user.
+    """
+    if not user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not allowed to do this operation",
+        )
+    return user
+
+
+@router.post("/profiler/header")
+async def issue_profile_header(
+    path: str = Query(min_length=1),
+    ttl: int = Query(default=300, ge=1, le=3600),
+    user: User = Depends(superuser),
+):
+    """
+    Issue an X-Profile header that profiles requests to one path.
+
+    Send the header with a request to that path; the response carries an
+    X-Profile-Id header with the ID of the recorded profile.
+
+    :param path: str: The request path, e.g. /api/image/transform/1.
+    :param ttl: int: How long the header is valid, in seconds.
+    :param user: User: The current superuser.
+    :return: The header name and value and its expiry time.
+    """
+    if not settings.profiler_secret:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Profiler secret is not configured",
+        )
+    return {
+        "header": "X-Profile",
+        "value": sign_profile_header(path, ttl),
+        "expires_at": datetime.utcnow() + timedelta(seconds=ttl),
+    }
+
+
+@router.get("/profiler/profiles")
+async def list_profiles(user: User = Depends(superuser)):
+    """
+    List the recent profiles of the worker that serves this request, newest first.
+
+    :param user: User: The current superuser.
+    :return: A list of profile summaries.
+    """
+    return [profile.summary() for profile in reversed(profiles)]
+
+
+@router.get("/profiler/profiles/{profile_id}")
+async def get_profile(profile_id: int, user: User = Depends(superuser)):
+    """
+    Get a profile as collapsed stacks, ready for flamegraph.pl or speedscope.
+
+    :param profile_id: int: The ID of the profile.
+    :param user: User: The current superuser.
+    :return: The collapsed stacks as plain text.
+    """
+    for profile in profiles:
+        if profile.id == profile_id:
+            return Response(profile.collapsed(), media_type="text/plain")
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found!")
+
+
+@router.get("/slow-queries")
+async def list_slow_queries(user: User = Depends(superuser)):
+    """
+    List the slow queries seen by the worker that serves this request, slowest first.
+
+    Each entry has the statement shape, the types of its parameters, the
+    repository method that issued it, its timings and, if EXPLAIN capture is
+    enabled, its query plan.
+
+    :param user: User: The current superuser.
+    :return: A list of slow query entries.
+    """
+    entries = [entry.summary() for entry in slow_query_log.entries.values()]
+    return sorted(entries, key=lambda entry: entry["max_ms"], reverse=True)
@@ -0,0 +1,253 @@
+"""
+Slow Query Log
+
+This module records the SQL statements that take longer than
+`slow_query_threshold` seconds (see src.monitoring.sql).
+
+Slow statements are grouped by fingerprint, a hash of the statement shape, so
+the same query for different IDs is one entry. The first occurrence of a
+fingerprint is logged with the shape, the types of its parameters, the duration
+and the repository method that issued it (e.g. `ImageQuery.read`); later
+occurrences only update the counters of the entry. Parameter values are never
+logged or stored.
+
+SQLAlchemy runs a statement in a greenlet whose parent is suspended in the
+coroutines that awaited it, so the caller is found by walking the frames of the
+parent greenlet. This only happens for slow statements.
+
+When `slow_query_explain` is set, an occurrence of a fingerprint without a plan
+also schedules an EXPLAIN of the statement, without ANALYZE, so the statement is
+not run again. It runs as a separate task on its own connection, after the
+request has moved on, and the plan is stored with the entry. At most
+MAX_PENDING_EXPLAINS run at a time; the others wait for the next occurrence.
+
+Every worker process keeps its own entries, at most `slow_query_buffer_size`;
+the least recently seen entry is dropped first. Superusers can list them with
+GET /admin/slow-queries.
+
+Classes:
+- SlowQuery: The occurrences of one statement shape.
+- SlowQueryLog: The entries of this worker and the EXPLAIN tasks.
+
+Functions:
+- parameters_shape: Describe the parameters of a statement without their values.
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import logging
+import sys
+from collections import OrderedDict
+from datetime import datetime
+from types import FrameType
+
+import greenlet
+from sqlalchemy import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# EXPLAIN without ANALYZE plans a statement without running it.
+EXPLAIN_PREFIXES = {
+    "postgresql": "EXPLAIN ",
+    "sqlite": "EXPLAIN QUERY PLAN ",
+}
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+MAX_PENDING_EXPLAINS = 2
+# Modules skipped when a statement was not issued by a repository.
+INFRASTRUCTURE = ("src/monitoring/", "src/database/", "src/utils/")
+
+
+class SlowQuery:
+    __slots__ = (
+        "fingerprint",
+        "statement",
+        "parameters",
+        "caller",
+        "count",
+        "seconds",
+        "slowest",
+        "first_seen",
+        "last_seen",
+        "plan",
+    )
+
+    def __init__(self, fingerprint: str, statement: str, parameters: str, caller: str):
+        self.fingerprint = fingerprint
+        self.statement = statement
+        self.parameters = parameters
+        self.caller = caller
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest = 0.0
+        self.first_seen = datetime.utcnow()
+        self.last_seen = self.first_seen
+        self.plan: str | None = None
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.slowest = max(self.slowest, seconds)
+        self.last_seen = datetime.utcnow()
+
+    def summary(self) -> dict:
+        return {
+            "fingerprint": self.fingerprint,
+            "statement": self.statement,
+            "parameters": self.parameters,
+            "caller": self.caller,
+            "count": self.count,
+            "mean_ms": round(self.seconds / self.count * 1000, 2),
+            "max_ms": round(self.slowest * 1000, 2),
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "plan": self.plan,
+        }
+
+
+def parameters_shape(parameters, executemany: bool = False) -> str:
+    """
+    Describe the parameters of a statement by their types, e.g. "(int, str)".
+
+    :param parameters: The parameters passed to the DBAPI cursor.
+    :param executemany: bool: Whether `parameters` is a list of parameter sets.
+    :return: The description.
+    """
+    if executemany:
+        if not parameters:
+            return "0 x ()"
+        return f"{len(parameters)} x {parameters_shape(parameters[0])}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {_type_name(v)}" for k, v in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(_type_name(v) for v in parameters) + ")"
+    return "()"
+
+
+def _type_name(value) -> str:
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def _fingerprint(shape: str) -> str:
+    normalized = " ".join(shape.split())
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def _caller_frames() -> FrameType | None:
+    parent = greenlet.getcurrent().parent
+    if parent is not None and parent.gr_frame is not None:
+        return parent.gr_frame
+    return sys._getframe()
+
+
+def _caller() -> str:
+    fallback = None
+    frame = _caller_frames()
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if "/src/" in filename:
+            path = "src/" + filename.rsplit("/src/", 1)[1]
+            location = f"{frame.f_code.co_qualname} ({path}:{frame.f_lineno})"
+            if path.endswith("/repository.py"):
+                return location
+            if fallback is None and not path.startswith(INFRASTRUCTURE):
+                fallback = location
+        frame = frame.f_back
+    return fallback or "unknown"
+
+
+class SlowQueryLog:
+    def __init__(self, size: int):
+        self.size = size
+        self.entries: OrderedDict[str, SlowQuery] = OrderedDict()
+        self._explains: dict[str, asyncio.Task] = {}
+
+    def record(
+        self,
+        conn: Connection,
+        statement: str,
+        shape: str,
+        parameters,
+        executemany: bool,
+        seconds: float,
+    ) -> None:
+        """
+        Record a slow statement. Call it from the after_cursor_execute event.
+
+        :param conn: Connection: The connection that ran the statement.
+        :param statement: str: The SQL text.
+        :param shape: str: The statement shape.
+        :param parameters: The parameters passed to the DBAPI cursor.
+        :param executemany: bool: Whether the statement ran with many parameter sets.
+        :param seconds: float: How long the statement took.
+        :return: None.
+        """
+        if statement.startswith(tuple(EXPLAIN_PREFIXES.values())):
+            return
+        fingerprint = _fingerprint(shape)
+        entry = self.entries.get(fingerprint)
+        if entry is not None:
+            self.entries.move_to_end(fingerprint)
+        else:
+            entry = SlowQuery(
+                fingerprint, shape, parameters_shape(parameters, executemany), _caller()
+            )
+            self.entries[fingerprint] = entry
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+            logger.warning(
+                "Slow query %s took %.1f ms in %s: %s with parameters %s",
+                fingerprint,
+                seconds * 1000,
+                entry.caller,
+                shape,
+                entry.parameters,
+            )
+        entry.add(seconds)
+        if settings.slow_query_explain and entry.plan is None:
+            if executemany:
+                parameters = parameters[0] if parameters else ()
+            self._schedule_explain(conn, entry, statement, parameters)
+
+    def _schedule_explain(
+        self, conn: Connection, entry: SlowQuery, statement: str, parameters
+    ) -> None:
+        prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+        if prefix is None or not statement.lstrip().upper().startswith(EXPLAINABLE):
+            return
+        if (
+            entry.fingerprint in self._explains
+            or len(self._explains) >= MAX_PENDING_EXPLAINS
+        ):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        # An empty context keeps the EXPLAIN out of the request's stats and trace.
+        task = loop.create_task(
+            self._explain(AsyncEngine(conn.engine), entry, prefix + statement, parameters),
+            context=contextvars.Context(),
+        )
+        self._explains[entry.fingerprint] = task
+        task.add_done_callback(lambda _: self._explains.pop(entry.fingerprint, None))
+
+    @staticmethod
+    async def _explain(
+        engine: AsyncEngine, entry: SlowQuery, statement: str, parameters
+    ) -> None:
+        try:
+            async with engine.connect() as connection:
+                result = await connection.exec_driver_sql(statement, parameters)
+                entry.plan = "\n".join(str(row[-1]) for row in result)
+        except Exception as e:
+            entry.plan = f"EXPLAIN failed: {e}"
+            logger.info("EXPLAIN of slow query %s failed: %s", entry.fingerprint, e)
+
+
+slow_query_log = SlowQueryLog(settings.slow_query_buffer_size)
@@ -0,0 +1,208 @@
+"""
+SQL Instrumentation
+
+This module counts and times the SQL statements of every request.
+
+Engine events record each statement into the QueryStats of the current request,
+kept in a context variable. SQLAlchemy runs the asyncpg driver in greenlets
+that share the context of the calling task, so statements land on the request
+that issued them.
+
+Every statement is also recorded as a span of the current trace, if any (see
+src.monitoring.tracing), and statements slower than `slow_query_threshold`
+seconds go to the slow query log (see src.monitoring.slow_queries).
+
+At the end of a request the middleware:
+- adds `X-DB-Queries`, `X-DB-Time-Ms` and a `Server-Timing` entry to the response;
+- adds the numbers to per-route totals, which are exported as metrics;
+- in debug mode, logs statement shapes repeated within the request as N+1
+  candidates and reports their number in `X-DB-N-Plus-One`.
+
+A statement shape is the SQL text with expanded IN lists collapsed, so the same
+query for different IDs has the same shape.
+
+Classes:
+- QueryStats: The statements of one request.
+- RouteStats: Totals of all requests of one route.
+- SQLStatsMiddleware: ASGI middleware that collects and reports QueryStats.
+
+Functions:
+- instrument_engine: Attach the statement listeners to an engine.
+- current_stats: Return the QueryStats of the current request.
+"""
+
+import logging
+import re
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.config import settings
+from src.monitoring.slow_queries import slow_query_log
+from src.monitoring.tracing import SpanKind, current_span, record_span
+
+logger = logging.getLogger(__name__)
+
+# A placeholder with the bind cast asyncpg renders, e.g. "$1::INTEGER" or
+# "$2::TIMESTAMP WITHOUT TIME ZONE".
+_PLACEHOLDER = (
+    r"\$\d+"
+    r"(?:::(?:\w+ WITH(?:OUT)? TIME ZONE|\w+(?:\(\d+(?:,\s*\d+)?\))?)(?:\[\])*)?"
+)
+_PLACEHOLDER_LIST = re.compile(rf"{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*")
+
+_stats: ContextVar["QueryStats | None"] = ContextVar("sql_stats", default=None)
+
+
+def statement_shape(statement: str) -> str:
+    return _PLACEHOLDER_LIST.sub("$?", statement)
+
+
+class QueryStats:
+    __slots__ = ("count", "seconds", "slowest", "slowest_statement", "shapes")
+
+    def __init__(self, track_shapes: bool):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest = 0.0
+        self.slowest_statement = None
+        self.shapes: Counter | None = Counter() if track_shapes else None
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        if seconds > self.slowest:
+            self.slowest = seconds
+            self.slowest_statement = statement
+        if self.shapes is not None:
+            self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """
+        Return the statement shapes executed at least `threshold` times.
+
+        :param threshold: int: The minimum number of executions.
+        :return: A list of (shape, count), most repeated first.
+        """
+        if self.shapes is None:
+            return []
+        return [(s, n) for s, n in self.shapes.most_common() if n >= threshold]
+
+
+class RouteStats:
+    __slots__ = (
+        "requests",
+        "queries",
+        "seconds",
+        "slowest",
+        "slowest_statement",
+        "n_plus_one",
+    )
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.seconds = 0.0
+        self.slowest = 0.0
+        self.slowest_statement = None
+        self.n_plus_one = 0
+
+    def add(self, stats: QueryStats, n_plus_one: int) -> None:
+        self.requests += 1
+        self.queries += stats.count
+        self.seconds += stats.seconds
+        self.n_plus_one += n_plus_one
+        if stats.slowest > self.slowest:
+            self.slowest = stats.slowest
+            self.slowest_statement = stats.slowest_statement
+
+
+route_stats: dict[str, RouteStats] = defaultdict(RouteStats)
+
+
+def current_stats() -> QueryStats | None:
+    return _stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - context._query_started
+    stats = _stats.get()
+    if stats is not None:
+        stats.record(statement, seconds)
+    if 0 < settings.slow_query_threshold <= seconds:
+        slow_query_log.record(
+            conn, statement, statement_shape(statement), parameters, executemany, seconds
+        )
+    if current_span() is not None:
+        record_span(
+            statement.split(None, 1)[0].upper(),
+            seconds,
+            SpanKind.CLIENT,
+            {"db.system": conn.dialect.name, "db.statement": statement_shape(statement)},
+        )
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Attach the statement listeners to an engine.
+
+    :param engine: AsyncEngine: The engine to instrument.
+    :return: None.
+    """
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def route_name(scope: dict) -> str:
+    route = scope.get("route")
+    return route.path if route is not None else "unmatched"
+
+
+class SQLStatsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(track_shapes=settings.sql_debug)
+        token = _stats.set(stats)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                milliseconds = stats.seconds * 1000
+                headers = [
+                    (b"x-db-queries", str(stats.count).encode()),
+                    (b"x-db-time-ms", f"{milliseconds:.1f}".encode()),
+                    (b"server-timing", f"db;dur={milliseconds:.1f}".encode()),
+                ]
+                if settings.sql_debug:
+                    repeated = stats.repeated(settings.sql_n_plus_one_threshold)
+                    headers.append((b"x-db-n-plus-one", str(len(repeated)).encode()))
+                message["headers"] = [*message.get("headers", []), *headers]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _stats.reset(token)
+            repeated = stats.repeated(settings.sql_n_plus_one_threshold)
+            name = route_name(scope)
+            route_stats[name].add(stats, len(repeated))
+            for shape, count in repeated:
+                logger.warning(
+                    "Possible N+1 in %s %s: %d executions of %s",
+                    scope["method"],
+                    name,
+                    count,
+                    shape,
+                )
@@ -0,0 +1,446 @@
+"""
+Tracing
+
+This module contains a small tracer that records nested spans with timings
+and exports them in the OpenTelemetry (OTLP/JSON) format.
+
+A trace starts at an incoming request, at a run of a background job, or at a
+message carrying the context of a trace started elsewhere. The current span
+lives in a context variable, so spans opened further down (SQL statements,
+Redis commands, Cloudinary calls, SMTP sends) become its children, and tasks
+started from a request inherit its trace.
+
+Trace context crosses process boundaries in the W3C `traceparent` format:
+incoming requests continue the trace of their `traceparent` header, internal
+HTTP calls send one, and tag index events published to the other workers
+carry one.
+
+Sampling is decided once per trace, at its root: a new trace is recorded with
+probability `tracing_sample_rate`, and a continued trace follows the sampled
+flag of its parent. Spans of unsampled traces cost a context variable lookup.
+
+Finished spans are queued and written by a background thread as one OTLP/JSON
+ExportTraceServiceRequest per line, to stdout or to the file named by
+`tracing_export`. The queue holds at most `tracing_queue_size` spans: when the
+writer falls behind or has died, further spans are dropped and counted in
+`SpanExporter.dropped` rather than held in memory. A forked worker process
+starts its own thread. Tracing is disabled when `tracing_export` is empty.
+
+Classes:
+- SpanKind: The OpenTelemetry span kinds.
+- Span: A timed operation within a trace.
+- SpanExporter: The background writer of finished spans.
+- TracingMiddleware: ASGI middleware that starts a trace per request.
+
+Functions:
+- span: Open a child span of the current span.
+- record_span: Record a finished child span of the current span.
+- current_span: Return the current span of a sampled trace.
+- start_trace: Start a new trace or continue one from a traceparent.
+- continue_trace: Continue a trace from a traceparent, if there is one.
+- current_traceparent: Return the traceparent of the current span.
+- tracing_enabled: Whether spans are exported.
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 512
+MAX_ATTRIBUTE_LENGTH = 2048
+
+
+class SpanKind(IntEnum):
+    INTERNAL = 1
+    SERVER = 2
+    CLIENT = 3
+
+
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+
+def tracing_enabled() -> bool:
+    return bool(settings.tracing_export)
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "name",
+        "kind",
+        "start",
+        "end",
+        "attributes",
+        "status",
+        "_token",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: str | None,
+        kind: SpanKind = SpanKind.INTERNAL,
+        attributes: dict | None = None,
+    ):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = 0
+        self.end = 0
+        self.attributes = attributes if attributes is not None else {}
+        self.status = None
+        self._token = None
+
+    def __enter__(self) -> "Span":
+        self.start = time.time_ns()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.end = time.time_ns()
+        _current.reset(self._token)
+        if exc is not None and self.status is None:
+            self.status = (STATUS_ERROR, f"{exc_type.__name__}: {exc}")
+        exporter.export(self)
+        return False
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": int(self.kind),
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.status is not None:
+            span["status"] = {"code": self.status[0], "message": self.status[1]}
+        return span
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)[:MAX_ATTRIBUTE_LENGTH]}
+
+
+def span(
+    name: str, kind: SpanKind = SpanKind.INTERNAL, attributes: dict | None = None
+) -> Span | _NoopSpan:
+    """
+    Open a child span of the current span.
+
+    Use it as a context manager. Outside of a sampled trace it does nothing.
+
+    :param name: str: The name of the operation.
+    :param kind: SpanKind: The kind of the span, CLIENT for calls to other services.
+    :param attributes: dict | None: Attributes of the span.
+    :return: The span.
+    """
+    parent = _current.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(name, parent.trace_id, parent.span_id, kind, attributes)
+
+
+def record_span(
+    name: str,
+    seconds: float,
+    kind: SpanKind = SpanKind.INTERNAL,
+    attributes: dict | None = None,
+) -> None:
+    """
+    Record a child span of the current span that has just finished.
+
+    :param name: str: The name of the operation.
+    :param seconds: float: How long it took.
+    :param kind: SpanKind: The kind of the span.
+    :param attributes: dict | None: Attributes of the span.
+    :return: None.
+    """
+    parent = _current.get()
+    if parent is None:
+        return
+    finished = Span(name, parent.trace_id, parent.span_id, kind, attributes)
+    finished.end = time.time_ns()
+    finished.start = finished.end - int(seconds * 1e9)
+    exporter.export(finished)
+
+
+def _parse_traceparent(traceparent: str) -> tuple[str, str, bool] | None:
+    parts = traceparent.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    version, trace_id, parent_id, flags = parts[:4]
+    try:
+        sampled = bool(int(flags, 16) & 1)
+        int(trace_id, 16)
+        int(parent_id, 16)
+    except ValueError:
+        return None
+    if version == "ff" or trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, sampled
+
+
+def start_trace(
+    name: str,
+    traceparent: str | None = None,
+    kind: SpanKind = SpanKind.INTERNAL,
+    attributes: dict | None = None,
+) -> Span | _NoopSpan:
+    """
+    Start the root span of a trace, or continue the trace of a traceparent.
+
+    :param name: str: The name of the operation.
+    :param traceparent: str | None: A W3C traceparent from the caller.
+    :param kind: SpanKind: The kind of the span.
+    :param attributes: dict | None: Attributes of the span.
+    :return: The span, or a no-op span if the trace is not sampled.
+    """
+    if not tracing_enabled():
+        return NOOP_SPAN
+    parent = _parse_traceparent(traceparent) if traceparent else None
+    if parent is not None:
+        trace_id, parent_id, sampled = parent
+    else:
+        trace_id = f"{random.getrandbits(128):032x}"
+        parent_id = None
+        sampled = random.random() < settings.tracing_sample_rate
+    if not sampled:
+        return NOOP_SPAN
+    return Span(name, trace_id, parent_id, kind, attributes)
+
+
+def continue_trace(
+    name: str, traceparent: str | None, attributes: dict | None = None
+) -> Span | _NoopSpan:
+    """
+    Continue a trace from a traceparent; do nothing without one.
+
+    :param name: str: The name of the operation.
+    :param traceparent: str | None: The traceparent carried by a message.
+    :param attributes: dict | None: Attributes of the span.
+    :return: The span, or a no-op span.
+    """
+    if traceparent is None:
+        return NOOP_SPAN
+    return start_trace(name, traceparent, SpanKind.INTERNAL, attributes)
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+def current_traceparent() -> str | None:
+    current = _current.get()
+    return current.traceparent if current is not None else None
+
+
+class SpanExporter:
+    def __init__(self, target: str, service_name: str, max_queued: int):
+        self.target = target
+        self.max_queued = max_queued
+        self.dropped = 0
+        self.resource = {
+            "attributes": [
+                {"key": "service.name", "value": {"stringValue": service_name}}
+            ]
+        }
+        self._queue: queue.Queue = queue.Queue(max_queued)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self) -> None:
+        self._queue = queue.Queue(self.max_queued)
+        self.dropped = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def export(self, finished: Span) -> None:
+        """
+        Queue a finished span for writing, or drop it if the queue is full.
+
+        :param finished: Span: The span.
+        :return: None.
+        """
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="span-exporter", daemon=True
+                    )
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(finished)
+        except queue.Full:
+            self.dropped += 1
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _payload(self, spans: list[Span]) -> str:
+        return json.dumps(
+            {
+                "resourceSpans": [
+                    {
+                        "resource": self.resource,
+                        "scopeSpans": [
+                            {
+                                "scope": {"name": __name__},
+                                "spans": [s.to_otlp() for s in spans],
+                            }
+                        ],
+                    }
+                ]
+            },
+            separators=(",", ":"),
+        )
+
+    def _run(self) -> None:
+        try:
+            output = sys.stdout if self.target == "stdout" else open(self.target, "a")
+        except OSError:
+            logger.exception("Failed to open the span export target %s", self.target)
+            return
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while len(batch) < BATCH_SIZE:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                spans = [s for s in batch if s is not None]
+                if spans:
+                    try:
+                        output.write(self._payload(spans) + "\n")
+                        output.flush()
+                    except Exception:
+                        logger.exception("Failed to export %d spans", len(spans))
+                if len(spans) < len(batch):
+                    return
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Write the queued spans and stop the writer thread.
+
+        :param timeout: float: How long to wait for the writer, in seconds.
+        :return: None.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("Span exporter did not drain; %d spans lost", self.queue_depth())
+            return
+        thread.join(max(deadline - time.monotonic(), 0))
+
+
+exporter = SpanExporter(
+    settings.tracing_export, settings.tracing_service_name, settings.tracing_queue_size
+)
+
+
+class TracingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        root = start_trace(
+            f"{scope['method']} {scope['path']}",
+            traceparent,
+            SpanKind.SERVER,
+            {"http.request.method": scope["method"], "url.path": scope["path"]},
+        )
+        if root is NOOP_SPAN:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                root.set("http.response.status_code", message["status"])
+                if message["status"] >= 500:
+                    root.status = (STATUS_ERROR, f"HTTP {message['status']}")
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-trace-id", root.trace_id.encode()),
+                ]
+            await send(message)
+
+        with root:
+            try:
+                await self.app(scope, receive, send_with_trace)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    root.name = f"{scope['method']} {route.path}"
+                    root.set("http.route", route.path)
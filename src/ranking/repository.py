@@ -0,0 +1,279 @@
+"""
+Ranking Repository
+
+This module keeps image rankings in Redis sorted sets.
+
+Two rankings are maintained:
+- top: Bayesian average of the ratings, so a single 5-star vote cannot beat an
+  image with hundreds of good votes.
+- trending: sum of rating weights with exponential time decay. Scores use
+  forward decay relative to a landmark timestamp, so a new vote is a single
+  ZINCRBY and older entries never have to be rescored.
+
+Functions:
+- update_image: Recompute the top score of an image after its ratings changed.
+- vote_time: The time a rating was last cast, as a Unix timestamp.
+- register_vote: Add a vote, or the change of a vote, to the trending ranking.
+- withdraw_vote: Remove a deleted vote from the trending ranking.
+- read_top: Read a page of the top ranking.
+- read_trending: Read a page of the trending ranking.
+- rebuild: Rebuild both rankings from Postgres.
+"""
+
+import logging
+import time
+from datetime import timezone
+
+from redis.asyncio.client import Pipeline, Redis
+from redis.exceptions import RedisError
+from sqlalchemy import select, func, extract
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database.sql.models import Rating
+
+logger = logging.getLogger(__name__)
+
+TOP_KEY = "ranking:top"
+TRENDING_KEY = "ranking:trending"
+STATS_KEY = "ranking:stats"
+DEFAULT_MEAN = 3.0
+REBUILD_CHUNK = 1000
+TRENDING_WINDOW = 10
+# Scores left over by float rounding after the last vote of an image is removed.
+EMPTY_SCORE = 1e-9
+
+
+class RankingQuery:
+    @staticmethod
+    def bayesian_score(count: int, average: float, global_mean: float) -> float:
+        """
+        Calculate the Bayesian average of an image rating.
+
+        :param count: int: The number of votes for the image.
+        :param average: float: The raw average of the votes.
+        :param global_mean: float: The average vote over all images.
+        :return: The smoothed score.
+        """
+        prior = settings.ranking_prior_weight
+        return (prior * global_mean + count * average) / (prior + count)
+
+    @staticmethod
+    def vote_weight(value: int, voted_at: float, landmark: float) -> float:
+        """
+        Calculate the trending weight of a vote with forward decay.
+
+        :param value: int: The rating value from 1 to 5.
+        :param voted_at: float: Unix timestamp of the vote.
+        :param landmark: float: Unix timestamp the ranking is relative to.
+        :return: The weight to add to the trending score.
+        """
+        half_life = settings.ranking_trending_half_life
+        return value / 5 * 2 ** ((voted_at - landmark) / half_life)
+
+    @staticmethod
+    async def _stats(cache: Redis) -> tuple[float, float]:
+        mean, landmark = await cache.hmget(STATS_KEY, "mean", "landmark")
+        if landmark is None:
+            landmark = time.time()
+            await cache.hsetnx(STATS_KEY, "landmark", landmark)
+        mean = float(mean) if mean is not None else DEFAULT_MEAN
+        return mean, float(landmark)
+
+    @staticmethod
+    async def update_image(
+        image_id: int, count: int, average: float, cache: Redis
+    ) -> None:
+        """
+        Recompute the top score of an image after its ratings changed.
+
+        :param image_id: int: The ID of the image.
+        :param count: int: The number of votes for the image.
+        :param average: float: The raw average of the votes.
+        :param cache: Redis: The Redis connection.
+        :return: None.
+        """
+        try:
+            if not count:
+                await cache.zrem(TOP_KEY, image_id)
+                return
+            mean, _ = await RankingQuery._stats(cache)
+            score = RankingQuery.bayesian_score(count, average, mean)
+            await cache.zadd(TOP_KEY, {image_id: score})
+        except RedisError:
+            logger.warning("Failed to update top ranking for image %s", image_id)
+
+    @staticmethod
+    def vote_time(rating: Rating) -> float:
+        """
+        The time a rating was last cast, as used by the rebuild.
+
+        :param rating: Rating: The rating, with its timestamps loaded.
+        :return: Unix timestamp of the last update, or of the creation.
+        """
+        moment = rating.updated_at or rating.created_at
+        if moment is None:
+            return time.time()
+        return moment.replace(tzinfo=timezone.utc).timestamp()
+
+    @staticmethod
+    async def register_vote(
+        image_id: int,
+        value: int,
+        voted_at: float,
+        cache: Redis,
+        previous: tuple[int, float] | None = None,
+    ) -> None:
+        """
+        Add a vote to the trending ranking.
+
+        When a user changes their vote, only the difference between the new
+        weight and the weight of the previous vote is added, so the score stays
+        equal to the one the rebuild computes from the ratings table.
+
+        :param image_id: int: The ID of the rated image.
+        :param value: int: The rating value from 1 to 5.
+        :param voted_at: float: Unix timestamp of the vote, see vote_time.
+        :param cache: Redis: The Redis connection.
+        :param previous: tuple[int, float] | None: The value and time of the vote it replaces.
+        :return: None.
+        """
+        try:
+            _, landmark = await RankingQuery._stats(cache)
+            weight = RankingQuery.vote_weight(value, voted_at, landmark)
+            if previous is not None:
+                weight -= RankingQuery.vote_weight(*previous, landmark)
+            if weight:
+                await RankingQuery._increment(image_id, weight, cache)
+        except RedisError:
+            logger.warning("Failed to update trending ranking for image %s", image_id)
+
+    @staticmethod
+    async def withdraw_vote(
+        image_id: int, value: int, voted_at: float, cache: Redis
+    ) -> None:
+        """
+        Remove a deleted vote from the trending ranking.
+
+        :param image_id: int: The ID of the rated image.
+        :param value: int: The value of the deleted rating.
+        :param voted_at: float: Unix timestamp of the deleted vote, see vote_time.
+        :param cache: Redis: The Redis connection.
+        :return: None.
+        """
+        try:
+            _, landmark = await RankingQuery._stats(cache)
+            weight = RankingQuery.vote_weight(value, voted_at, landmark)
+            await RankingQuery._increment(image_id, -weight, cache)
+        except RedisError:
+            logger.warning("Failed to update trending ranking for image %s", image_id)
+
+    @staticmethod
+    async def _increment(image_id: int, weight: float, cache: Redis) -> None:
+        score = await cache.zincrby(TRENDING_KEY, weight, image_id)
+        if score < EMPTY_SCORE:
+            await cache.zrem(TRENDING_KEY, image_id)
+
+    @staticmethod
+    async def _read_page(
+        key: str, page: int, size: int, cache: Redis
+    ) -> tuple[int, list[tuple[int, float]]]:
+        start = (page - 1) * size
+        async with cache.pipeline(transaction=False) as pipe:
+            pipe.zcard(key)
+            pipe.zrevrange(key, start, start + size - 1, withscores=True)
+            total, items = await pipe.execute()
+        return total, [(int(member), score) for member, score in items]
+
+    @staticmethod
+    async def read_top(
+        page: int, size: int, cache: Redis
+    ) -> tuple[int, list[tuple[int, float]]]:
+        """
+        Read a page of the top ranking.
+
+        :param page: int: The page number starting from 1.
+        :param size: int: The number of items per page.
+        :param cache: Redis: The Redis connection.
+        :return: The total number of ranked images and a list of (image_id, score).
+        """
+        return await RankingQuery._read_page(TOP_KEY, page, size, cache)
+
+    @staticmethod
+    async def read_trending(
+        page: int, size: int, cache: Redis
+    ) -> tuple[int, list[tuple[int, float]]]:
+        """
+        Read a page of the trending ranking.
+
+        Scores are converted from the landmark-relative form to the current time.
+
+        :param page: int: The page number starting from 1.
+        :param size: int: The number of items per page.
+        :param cache: Redis: The Redis connection.
+        :return: The total number of ranked images and a list of (image_id, score).
+        """
+        total, items = await RankingQuery._read_page(TRENDING_KEY, page, size, cache)
+        _, landmark = await RankingQuery._stats(cache)
+        decay = 2 ** ((landmark - time.time()) / settings.ranking_trending_half_life)
+        return total, [(image_id, score * decay) for image_id, score in items]
+
+    @staticmethod
+    def _replace(pipe: Pipeline, key: str, scores: dict[int, float]) -> None:
+        tmp_key = f"{key}:rebuild"
+        pipe.delete(tmp_key)
+        items = list(scores.items())
+        for i in range(0, len(items), REBUILD_CHUNK):
+            pipe.zadd(tmp_key, dict(items[i : i + REBUILD_CHUNK]))
+        if items:
+            pipe.rename(tmp_key, key)
+        else:
+            pipe.delete(key)
+
+    @staticmethod
+    async def rebuild(session: AsyncSession, cache: Redis) -> None:
+        """
+        Rebuild both rankings from the ratings table.
+
+        The trending landmark is moved to the current time, which keeps the
+        forward-decayed scores in a safe floating point range. Both rankings
+        and the new landmark and mean are swapped in within one MULTI, so a
+        vote never sees the new scores with the old landmark.
+
+        :param session: AsyncSession: The database session.
+        :param cache: Redis: The Redis connection.
+        :return: None.
+        """
+        global_mean = await session.scalar(select(func.avg(Rating.value)))
+        global_mean = float(global_mean) if global_mean is not None else DEFAULT_MEAN
+
+        rows = await session.execute(
+            select(Rating.image_id, func.count(), func.avg(Rating.value)).group_by(
+                Rating.image_id
+            )
+        )
+        top = {
+            image_id: RankingQuery.bayesian_score(count, float(average), global_mean)
+            for image_id, count, average in rows
+        }
+
+        landmark = time.time()
+        half_life = settings.ranking_trending_half_life
+        voted_at = extract("epoch", func.coalesce(Rating.updated_at, Rating.created_at))
+        rows = await session.execute(
+            select(
+                Rating.image_id,
+                func.sum(
+                    Rating.value / 5.0 * func.power(2, (voted_at - landmark) / half_life)
+                ),
+            )
+            .where(voted_at > landmark - TRENDING_WINDOW * half_life)
+            .group_by(Rating.image_id)
+        )
+        trending = {image_id: float(score) for image_id, score in rows}
+
+        async with cache.pipeline(transaction=True) as pipe:
+            RankingQuery._replace(pipe, TOP_KEY, top)
+            RankingQuery._replace(pipe, TRENDING_KEY, trending)
+            pipe.hset(STATS_KEY, mapping={"mean": global_mean, "landmark": landmark})
+            await pipe.execute()
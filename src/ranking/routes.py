@@ -0,0 +1,90 @@
+"""
+Ranking Routes
+
+This module defines the API routes for image rankings.
+
+Routes:
+- GET /ranking/top: A page of images ordered by their Bayesian rating.
+- GET /ranking/trending: A page of images ordered by recent rating activity.
+
+Both routes read directly from Redis sorted sets and never touch Postgres.
+They answer 503 when Redis is unavailable.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from redis.asyncio.client import Redis
+from redis.exceptions import RedisError
+
+from src.database.cache.redis_conn import cache_database
+from src.ranking.repository import RankingQuery
+from src.ranking.schemas import RankingPageSchemaResponse
+from src.utils.responses import FastJSONResponse
+
+router = APIRouter(prefix="/ranking", tags=["ranking"])
+
+
+def _unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Rankings are temporarily unavailable",
+    )
+
+
+def _page(
+    page: int, size: int, total: int, items: list[tuple[int, float]]
+) -> FastJSONResponse:
+    return FastJSONResponse(
+        {
+            "page": page,
+            "size": size,
+            "total": total,
+            "items": [{"image_id": i, "score": s} for i, s in items],
+        }
+    )
+
+
+@router.get("/top", response_model=RankingPageSchemaResponse, name="Top rated images")
+async def get_top_images(
+        page: int = Query(default=1, ge=1),
+        size: int = Query(default=20, ge=1, le=100),
+        cache: Redis = Depends(cache_database),
+):
+    """
+    Get a page of the top rated images.
+
+    :param page: int: The page number starting from 1.
+    :param size: int: The number of images per page.
+    :param cache: Redis: The Redis cache.
+    :raises HTTPException 503 if Redis is unavailable.
+
+    :return: RankingPageSchemaResponse: Image IDs with their Bayesian scores.
+    """
+    try:
+        total, items = await RankingQuery.read_top(page, size, cache)
+    except RedisError:
+        raise _unavailable()
+    return _page(page, size, total, items)
+
+
+@router.get(
+    "/trending", response_model=RankingPageSchemaResponse, name="Trending images"
+)
+async def get_trending_images(
+        page: int = Query(default=1, ge=1),
+        size: int = Query(default=20, ge=1, le=100),
+        cache: Redis = Depends(cache_database),
+):
+    """
+    Get a page of the trending images.
+
+    :param page: int: The page number starting from 1.
+    :param size: int: The number of images per page.
+    :param cache: Redis: The Redis cache.
+    :raises HTTPException 503 if Redis is unavailable.
+
+    :return: RankingPageSchemaResponse: Image IDs with their decayed activity scores.
+    """
+    try:
+        total, items = await RankingQuery.read_trending(page, size, cache)
+    except RedisError:
+        raise _unavailable()
+    return _page(page, size, total, items)
@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+
+
+class RankedImageSchema(BaseModel):
+    image_id: int
+    score: float
+
+
+class RankingPageSchemaResponse(BaseModel):
+    page: int
+    size: int
+    total: int
+    items: list[RankedImageSchema]
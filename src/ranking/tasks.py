@@ -0,0 +1,30 @@
+"""
+Ranking Tasks
+
+This module contains the periodic job that rebuilds image rankings from Postgres.
+"""
+
+from src.config import settings
+from src.database.cache.redis_conn import cache_database
+from src.database.sql.postgres import database
+from src.ranking.repository import RankingQuery
+from src.utils.periodic import PeriodicTask
+
+
+async def rebuild_rankings() -> None:
+    """
+    Rebuild the top and trending rankings with a fresh database session.
+
+    :return: None.
+    """
+    cache = await cache_database()
+    async with database.async_session() as session:
+        await RankingQuery.rebuild(session, cache)
+
+
+ranking_rebuild_task = PeriodicTask(
+    "ranking-rebuild",
+    settings.ranking_rebuild_interval,
+    rebuild_rankings,
+    cluster=True,
+)
@@ -4,36 +4,55 @@ Rating Repository
 This module contains database query functions related to ratings.
 
 Functions:
-- _update_average_rating: Update the average rating of an image based on all available ratings.
+- _update_average_rating: Update the average rating of an image and its ranking scores.
 - read: Retrieve a rating object from the database by its ID.
 - create: Create a new rating for an image or update the user's previous rating.
 - update: Update a rating in the database.
 - delete: Delete a rating from the database.
+- summary: Aggregate the ratings of many images with a single grouped query.
 """
-from sqlalchemy import select
+from redis.asyncio.client import Redis
+from sqlalchemy import select, func, case
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.sql.models import User, Rating, Image
 from src.image.repository import ImageQuery
+from src.ranking.repository import RankingQuery
+from src.stream.broker import publish_event
 
 
 class RatingQuery:
     @classmethod
-    async def _update_average_rating(cls, image: Image, db: AsyncSession):
+    async def _update_average_rating(
+        cls, image: Image, db: AsyncSession, cache: Redis | None = None
+    ):
         """
         Update the average rating of an image based on all available ratings.
+        The average is computed by the database. When a cache connection is
+        given, the image ranking scores are refreshed and a "rating.updated"
+        event is published.
 
         :param cls: The class of the object being updated.
         :param image: Image: The image object to update.
         :param db: AsyncSession: The database session.
+        :param cache: Redis: The Redis connection used for rankings and events.
         :return: Nothing.
     """
-        ratings = await db.execute(select(Rating).filter(Rating.image_id == image.id))
-        ratings = ratings.scalars().all()
-        total_rating = sum(rating.value for rating in ratings)
-        average_rating = total_rating / len(ratings) if ratings else 0
+        result = await db.execute(
+            select(func.count(), func.avg(Rating.value)).where(
+                Rating.image_id == image.id
+            )
+        )
+        count, average_rating = result.one()
+        average_rating = float(average_rating) if count else 0
         image.rating = average_rating
         await db.commit()
+        await ImageQuery.invalidate(image.id)
+        if cache is not None:
+            await RankingQuery.update_image(image.id, count, average_rating, cache)
+            await publish_event(
+                cache, image.id, "rating.updated", average=average_rating, count=count
+            )
 
     @staticmethod
     async def read(rating_id: int, db: AsyncSession) -> Rating | None:
@@ -50,7 +69,9 @@ class RatingQuery:
         return rating
 
     @staticmethod
-    async def create(body, user: User, image: Image, db: AsyncSession) -> Rating:
+    async def create(
+        body, user: User, image: Image, db: AsyncSession, cache: Redis | None = None
+    ) -> Rating:
         """
         Create a new rating for an image. If the user has already rated the image,
         update their previous rating.
@@ -59,6 +80,7 @@ class RatingQuery:
         :param user: User: Retrieve the user object from the database.
         :param image: Image: Retrieve the image ID from the database.
         :param db: AsyncSession: Create a database session.
+        :param cache: Redis: The Redis connection used for rankings.
         :return: The rating object that was created.
     """
         rating = await db.scalar(
@@ -66,18 +88,25 @@ class RatingQuery:
                 (Rating.owner_id == user.id) & (Rating.image_id == image.id)
             )
         )
+        previous = None
         if rating:
+            previous = (rating.value, RankingQuery.vote_time(rating))
             rating.value = body.value
         else:
             rating = Rating(**body.model_dump(), owner_id=user.id)
+            await ImageQuery.adjust_counters(image.id, db, ratings=1)
         db.add(rating)
         await db.commit()
         await db.refresh(rating)
-        await RatingQuery._update_average_rating(image, db)
+        await RatingQuery._update_average_rating(image, db, cache)
+        if cache is not None:
+            await RankingQuery.register_vote(
+                image.id, rating.value, RankingQuery.vote_time(rating), cache, previous
+            )
         return rating
 
     @staticmethod
-    async def update(rating_id: int, body, user, db) -> Rating | None:
+    async def update(rating_id: int, body, user, db, cache: Redis | None = None) -> Rating | None:
         """
     The update function updates a rating in the database.
         It takes three arguments:
@@ -90,6 +119,7 @@ class RatingQuery:
     :param body: Get the new value of the rating. Schema: RatingUpdateSchemaRequest
     :param user: Check if the user is the owner of the rating
     :param db: Access the database
+    :param cache: Redis: The Redis connection used for rankings.
     :return: The updated rating or None if it doesn't exist.
     """
         rating = await db.scalar(
@@ -99,21 +129,27 @@ class RatingQuery:
         )
         if not rating:
             return None
+        previous = (rating.value, RankingQuery.vote_time(rating))
         rating.value = body.value
         await db.commit()
         await db.refresh(rating)
         image = await db.get(Image, rating.image_id)
-        await RatingQuery._update_average_rating(image, db)
+        await RatingQuery._update_average_rating(image, db, cache)
+        if cache is not None:
+            await RankingQuery.register_vote(
+                image.id, rating.value, RankingQuery.vote_time(rating), cache, previous
+            )
         return rating
 
     @staticmethod
-    async def delete(rating_id: int, user, db: AsyncSession):
+    async def delete(rating_id: int, user, db: AsyncSession, cache: Redis | None = None):
         """
         Delete a rating from the database.
 
         :param rating_id: int: Specify the ID of the rating to be deleted.
         :param user: Check if the user is the owner of the rating.
         :param db: AsyncSession: Pass in the database session.
+        :param cache: Redis: The Redis connection used for rankings.
         :return: The deleted rating or None if it doesn't exist.
     """
         rating = await db.scalar(
@@ -123,8 +159,59 @@ class RatingQuery:
         )
         if not rating:
             return None
+        voted_at = RankingQuery.vote_time(rating)
         await db.delete(rating)
+        await ImageQuery.adjust_counters(rating.image_id, db, ratings=-1)
         await db.commit()
         image = await ImageQuery.read(rating.image_id, db)
-        await RatingQuery._update_average_rating(image, db)
+        await RatingQuery._update_average_rating(image, db, cache)
+        if cache is not None:
+            await RankingQuery.withdraw_vote(image.id, rating.value, voted_at, cache)
         return rating
+
+    @staticmethod
+    async def summary(image_ids: list[int], user: User, db: AsyncSession) -> list[dict]:
+        """
+        Aggregate the ratings of many images with a single grouped query.
+
+        Rows are grouped by image and value, which gives the 1-5 histogram
+        directly; the average, the count and the caller's own vote are derived
+        from the histogram rows.
+
+        :param image_ids: list[int]: The IDs of the images to summarize.
+        :param user: User: The current user, used to find their own votes.
+        :param db: AsyncSession: The database session.
+        :return: A list of summaries in the order of image_ids.
+        """
+        stmt = (
+            select(
+                Rating.image_id,
+                Rating.value,
+                func.count(),
+                func.max(case((Rating.owner_id == user.id, 1), else_=0)),
+            )
+            .where(Rating.image_id.in_(image_ids))
+            .group_by(Rating.image_id, Rating.value)
+        )
+        rows = await db.execute(stmt)
+        summaries = {
+            image_id: {
+                "image_id": image_id,
+                "average": 0.0,
+                "count": 0,
+                "histogram": dict.fromkeys(range(1, 6), 0),
+                "my_vote": None,
+            }
+            for image_id in image_ids
+        }
+        for image_id, value, count, is_mine in rows:
+            summary = summaries[image_id]
+            summary["histogram"][value] = count
+            summary["count"] += count
+            summary["average"] += value * count
+            if is_mine:
+                summary["my_vote"] = value
+        for summary in summaries.values():
+            if summary["count"]:
+                summary["average"] = round(summary["average"] / summary["count"], 2)
+        return list(summaries.values())
@@ -4,6 +4,7 @@ Rating Routes
 This module defines the API routes for managing ratings.
 
 Routes:
+- GET /rating/summary: Get rating summaries for many images at once.
 - GET /rating/{rating_id}: Delete a rating by its ID.
 - POST /rating/create: Create a new rating.
 - PUT /rating/update/{rating_id}: Update an existing rating.
@@ -11,25 +12,56 @@ Routes:
 
 Each route expects specific parameters and returns HTTP status codes.
 """
-from fastapi import APIRouter, Depends, status, HTTPException, Path
+from fastapi import APIRouter, Depends, status, HTTPException, Path, Query, Request
+from redis.asyncio.client import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.auth.service import current_active_user
+from src.database.cache.redis_conn import cache_database
 from src.database.sql.models import User
 from src.database.sql.postgres import database
-from src.image.routes import get_image
+from src.image.routes import get_image_or_404
 from src.rating.repository import RatingQuery
+from src.utils.conditional import conditional_response, make_etag
 from src.rating.schemas import (
     RatingSchemaResponse,
     RatingSchemaRequest,
     RatingUpdateSchemaRequest,
+    RatingSummarySchemaResponse,
 )
 
 router = APIRouter(prefix="/rating", tags=["ratings"])
 
+MAX_SUMMARY_IMAGES = 100
+
+
+@router.get(
+    "/summary",
+    response_model=list[RatingSummarySchemaResponse],
+    name="Get rating summaries",
+)
+async def get_rating_summary(
+        image_ids: list[int] = Query(min_length=1, max_length=MAX_SUMMARY_IMAGES),
+        user: User = Depends(current_active_user),
+        db: AsyncSession = Depends(database),
+):
+    """
+    Get the average, count, 1-5 histogram and the caller's own vote for many
+    images in one request.
+
+    :param image_ids: list[int]: The IDs of the images, repeated as query parameters.
+    :param user: User: The current user obtained from authentication.
+    :param db: AsyncSession: The database session.
+
+    :return: list[RatingSummarySchemaResponse]: One summary per requested image.
+    """
+    image_ids = list(dict.fromkeys(image_ids))
+    return await RatingQuery.summary(image_ids, user, db)
+
 
 @router.get("/{rating_id}", response_model=RatingSchemaResponse, name="Get one rating")
 async def get_rating(
+        request: Request,
         rating_id: int = Path(ge=1),
         user: User = Depends(current_active_user),
         db: AsyncSession = Depends(database),
@@ -37,6 +69,10 @@ async def get_rating(
     """
     Get a rating by its ID.
 
+    The response carries an ETag of the rating version; a matching
+    If-None-Match is answered with 304.
+
+    :param request: Request: The incoming request.
     :param rating_id: int: The ID of the rating to retrieve.
     :param user: User: The current user obtained from authentication.
     :param db: AsyncSession: The database session.
@@ -48,7 +84,16 @@ async def get_rating(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Rating not found!"
         )
-    return rating
+    etag = make_etag(
+        "rating", rating.id, rating.value, rating.created_at, rating.updated_at
+    )
+    return conditional_response(
+        request,
+        etag,
+        lambda: RatingSchemaResponse.model_validate(
+            rating, from_attributes=True
+        ).model_dump_json().encode(),
+    )
 
 
 @router.post(
@@ -61,6 +106,7 @@ async def create_rating(
         body: RatingSchemaRequest,
         user: User = Depends(current_active_user),
         db: AsyncSession = Depends(database),
+        cache: Redis = Depends(cache_database),
 ):
     """
     Create a new rating for an image. If the user has already rated the image,
@@ -69,11 +115,12 @@ async def create_rating(
     :param body: RatingSchemaRequest: The rating data to create.
     :param user: User: The current user obtained from authentication.
     :param db: AsyncSession: The database session.
+    :param cache: Redis: The Redis cache.
 
     :return: RatingSchemaResponse: The created or updated rating object.
     """
-    image = await get_image(body.image_id, user, db)
-    rating = await RatingQuery.create(body, user, image, db)
+    image = await get_image_or_404(body.image_id, db)
+    rating = await RatingQuery.create(body, user, image, db, cache)
     return rating
 
 
@@ -85,6 +132,7 @@ async def update_rating(
         body: RatingUpdateSchemaRequest,
         user: User = Depends(current_active_user),
         db: AsyncSession = Depends(database),
+        cache: Redis = Depends(cache_database),
 ):
     """
     Update a rating by its ID.
@@ -93,6 +141,7 @@ async def update_rating(
     :param body: RatingUpdateSchemaRequest: The updated rating data.
     :param user: User: Get the current user from authentication
     :param db: AsyncSession: The database session.
+    :param cache: Redis: The Redis cache.
 
     :return: RatingSchemaResponse: The updated rating object.
     """
@@ -102,7 +151,7 @@ async def update_rating(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Rating not found!"
         )
-    changed_rating = await RatingQuery.update(rating_id, body, user, db)
+    changed_rating = await RatingQuery.update(rating_id, body, user, db, cache)
     if not changed_rating:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="This is not your rating!"
@@ -117,6 +166,7 @@ async def delete_rating(
         rating_id: int,
         user: User = Depends(current_active_user),
         db: AsyncSession = Depends(database),
+        cache: Redis = Depends(cache_database),
 ):
     """
         Delete a rating by its ID.
@@ -124,6 +174,7 @@ async def delete_rating(
         :param rating_id: int: The ID of the rating to delete.
         :param user: User: The current user obtained from authentication.
         :param db: AsyncSession: The database session.
+        :param cache: Redis: The Redis cache.
 
         :return: None
         """
@@ -132,7 +183,7 @@ async def delete_rating(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Rating not found!"
         )
-    deleted_rating = await RatingQuery.delete(rating_id, user, db)
+    deleted_rating = await RatingQuery.delete(rating_id, user, db, cache)
     if not deleted_rating:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="This is not your rating!"
@@ -20,3 +20,11 @@ class RatingSchemaResponse(RatingSchemaRequest):
 
     class Config:
         from_attributes: True
+
+
+class RatingSummarySchemaResponse(BaseModel):
+    image_id: int
+    average: float
+    count: int
+    histogram: dict[int, int]
+    my_vote: int | None
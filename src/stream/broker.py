@@ -0,0 +1,247 @@
+"""
+Event Broker
+
+This module delivers comment and rating activity of images to connected clients.
+
+Writers publish compact JSON events to a Redis channel per image. Every worker
+runs one EventBroker that subscribes to the channels of images that have local
+listeners and fans each message out to them. A slow client never blocks the
+broker: its queue is bounded, rating events replace older pending rating
+events, and when the queue is full the oldest events are dropped and the client
+is told how many it missed.
+
+Only the listener task of the broker talks to Redis. It subscribes to and
+unsubscribes from channels as local listeners come and go, so connecting a
+client never fails when Redis is unavailable: the listener retries with
+exponential backoff and the client receives heartbeats until it succeeds.
+
+Functions:
+- publish_event: Publish an event about an image.
+
+Classes:
+- Subscription: The pending events of one connected client.
+- EventBroker: The per-worker Redis subscriber.
+"""
+
+import asyncio
+import json
+import logging
+from collections import deque
+
+from redis.asyncio.client import Redis, PubSub
+from redis.exceptions import RedisError
+
+from src.config import settings
+from src.database.cache.redis_conn import cache_database
+
+logger = logging.getLogger(__name__)
+
+COALESCED_EVENTS = {"rating.updated"}
+SUBSCRIBE_RETRY_MIN = 0.5
+SUBSCRIBE_RETRY_MAX = 30.0
+# How long the listener waits for a message before it picks up new listeners.
+POLL_INTERVAL = 0.2
+
+
+def image_channel(image_id: int) -> str:
+    return f"image:{image_id}:events"
+
+
+async def publish_event(cache: Redis, image_id: int, event_type: str, **data) -> None:
+    """
+    Publish an event about an image. Errors are logged and never reach the writer.
+
+    :param cache: Redis: The Redis connection.
+    :param image_id: int: The ID of the image the event belongs to.
+    :param event_type: str: The event type, e.g. "comment.created".
+    :param data: The event payload.
+    :return: None.
+    """
+    payload = json.dumps(
+        {"type": event_type, "image_id": image_id, **data},
+        separators=(",", ":"),
+        default=str,
+    )
+    try:
+        await cache.publish(image_channel(image_id), payload)
+    except RedisError:
+        logger.warning("Failed to publish %s for image %s", event_type, image_id)
+
+
+class Subscription:
+    def __init__(self, image_id: int, max_pending: int):
+        self.image_id = image_id
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending: deque[tuple[str, bytes]] = deque()
+        self._ready = asyncio.Event()
+
+    def put(self, event_type: str, frame: bytes) -> None:
+        """
+        Queue an SSE frame without ever blocking the broker.
+
+        :param event_type: str: The event type, used for coalescing.
+        :param frame: bytes: The encoded SSE frame.
+        :return: None.
+        """
+        if event_type in COALESCED_EVENTS:
+            for i, (pending_type, _) in enumerate(self._pending):
+                if pending_type == event_type:
+                    self._pending[i] = (event_type, frame)
+                    return
+        if len(self._pending) >= self.max_pending:
+            self._pending.popleft()
+            self.dropped += 1
+        self._pending.append((event_type, frame))
+        self._ready.set()
+
+    async def get(self) -> list[bytes]:
+        """
+        Wait for pending frames and take all of them.
+
+        :return: A list of SSE frames, starting with an overflow notice if events were dropped.
+        """
+        await self._ready.wait()
+        self._ready.clear()
+        frames = []
+        if self.dropped:
+            frames.append(
+                f'event: overflow\ndata: {{"dropped":{self.dropped}}}\n\n'.encode()
+            )
+            self.dropped = 0
+        frames.extend(frame for _, frame in self._pending)
+        self._pending.clear()
+        return frames
+
+
+class EventBroker:
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self._subscriptions: dict[int, set[Subscription]] = {}
+        # The images whose channels the Redis connection is subscribed to.
+        self._channels: set[int] = set()
+        self._pubsub: PubSub | None = None
+        self._listener: asyncio.Task | None = None
+
+    async def subscribe(self, image_id: int) -> Subscription:
+        """
+        Register a local listener for the events of an image.
+
+        The Redis subscription is made by the listener task, so this never
+        fails when Redis is unavailable.
+
+        :param image_id: int: The ID of the image.
+        :return: The new subscription.
+        """
+        subscription = Subscription(image_id, self.max_pending)
+        subscriptions = self._subscriptions.get(image_id)
+        if subscriptions is None:
+            subscriptions = self._subscriptions[image_id] = set()
+        subscriptions.add(subscription)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Remove a local listener. The listener task drops the Redis subscription
+        of the image once it has no local listeners left.
+
+        :param subscription: Subscription: The subscription to remove.
+        :return: None.
+        """
+        subscriptions = self._subscriptions.get(subscription.image_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.image_id]
+
+    async def _sync_channels(self) -> None:
+        if self._pubsub is None:
+            cache = await cache_database()
+            self._pubsub = cache.pubsub(ignore_subscribe_messages=True)
+        added = self._subscriptions.keys() - self._channels
+        if added:
+            await self._pubsub.subscribe(*(image_channel(image_id) for image_id in added))
+            self._channels |= added
+        removed = self._channels - self._subscriptions.keys()
+        if removed:
+            await self._pubsub.unsubscribe(*(image_channel(image_id) for image_id in removed))
+            self._channels -= removed
+
+    async def _reset(self) -> None:
+        self._channels.clear()
+        if self._pubsub is not None:
+            pubsub, self._pubsub = self._pubsub, None
+            try:
+                await pubsub.reset()
+            except (RedisError, OSError):
+                pass
+
+    def _dispatch(self, channel: bytes, data: bytes) -> None:
+        image_id = int(channel.split(b":")[1])
+        subscriptions = self._subscriptions.get(image_id)
+        if not subscriptions:
+            return
+        event_type = json.loads(data)["type"]
+        frame = b"event: %s\ndata: %s\n\n" % (event_type.encode(), data)
+        for subscription in subscriptions:
+            subscription.put(event_type, frame)
+
+    async def _listen(self) -> None:
+        delay = SUBSCRIBE_RETRY_MIN
+        # A listener may arrive while the connection is being released.
+        while self._subscriptions:
+            while self._subscriptions:
+                try:
+                    await self._sync_channels()
+                    message = await self._pubsub.get_message(timeout=POLL_INTERVAL)
+                except (RedisError, OSError, asyncio.TimeoutError):
+                    logger.warning(
+                        "Event broker has no Redis subscription, retrying in %.1f s", delay
+                    )
+                    await self._reset()
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, SUBSCRIBE_RETRY_MAX)
+                    continue
+                delay = SUBSCRIBE_RETRY_MIN
+                if message is not None and message["type"] == "message":
+                    try:
+                        self._dispatch(message["channel"], message["data"])
+                    except Exception:
+                        logger.exception(
+                            "Event broker skipped a malformed event on %s", message["channel"]
+                        )
+            await self._reset()
+
+    def stats(self) -> dict[str, int]:
+        """
+        Report the local listeners and the events waiting to be sent to them.
+
+        :return: A dictionary with "subscriptions" and "pending_events".
+        """
+        subscriptions = [s for group in self._subscriptions.values() for s in group]
+        return {
+            "subscriptions": len(subscriptions),
+            "pending_events": sum(len(s._pending) for s in subscriptions),
+        }
+
+    async def close(self) -> None:
+        """
+        Stop the listener and release the Redis connection.
+
+        :return: None.
+        """
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await self._reset()
+        self._subscriptions.clear()
+
+
+event_broker = EventBroker(settings.stream_max_pending_events)
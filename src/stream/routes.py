@@ -0,0 +1,62 @@
+"""
+Stream Routes
+
+This module defines the Server-Sent Events endpoint for image activity.
+
+Routes:
+- GET /stream/image/{image_id}: Stream new comments and rating changes of an image.
+"""
+
+import asyncio
+
+from fastapi import APIRouter, Depends, Path, Request
+from fastapi.responses import StreamingResponse
+
+from src.auth.service import current_active_user
+from src.config import settings
+from src.database.sql.models import User
+from src.stream.broker import event_broker
+
+router = APIRouter(prefix="/stream", tags=["stream"])
+
+
+@router.get("/image/{image_id}")
+async def stream_image_events(
+    request: Request,
+    image_id: int = Path(ge=1),
+    user: User = Depends(current_active_user),
+):
+    """
+    Stream activity of an image as Server-Sent Events.
+
+    Events are "comment.created", "comment.updated", "comment.deleted" and
+    "rating.updated". An "overflow" event tells the client that it was too slow
+    and some events were dropped, so it should reload the image state.
+
+    :param request: Request: The incoming request.
+    :param image_id: int: The ID of the image.
+    :param user: User: The current user.
+    :return: A text/event-stream response.
+    """
+    subscription = await event_broker.subscribe(image_id)
+
+    async def events():
+        try:
+            yield b"retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    frames = await asyncio.wait_for(
+                        subscription.get(), timeout=settings.stream_heartbeat_interval
+                    )
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                yield b"".join(frames)
+        finally:
+            await event_broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,487 @@
+"""
+Tag Index
+
+This module keeps an in-process inverted index of tag ID to the set of image IDs
+carrying that tag, so multi-tag AND/OR/NOT queries are answered without Postgres.
+
+Image ID sets are stored as roaring-style bitmaps: IDs are split into a 16-bit
+high part and a 16-bit low part, and every high part with members maps to a
+container of low parts. A container of up to ARRAY_MAX members is a sorted
+`array('H')`, two bytes per member; a fuller one is a Python int used as a
+65536-bit set, at most 8 KB. Most tags are rare, so most containers are small
+arrays, and a tag costs about as much as its images. Intersections, unions and
+differences run container by container, as native big-int operations between
+bitsets.
+
+The index is built from `image_tags` in chunks and then kept current by change
+events. Writers apply an event locally and publish it on Redis so the other
+workers apply it too; events are idempotent. Rename and merge events also evict
+the old names from the tag name-to-id cache of every worker. A periodic rebuild
+heals any events lost by pub/sub. The listener subscribes in the background
+and retries with backoff, so an unavailable Redis never prevents the
+application from starting; events missed meanwhile are healed the same way.
+Events carry the trace context of the writer, so their application on the
+other workers joins its trace.
+
+Classes:
+- Bitmap: A compressed set of non-negative integers.
+- TagIndex: The inverted index with its Redis event listener.
+"""
+
+import asyncio
+import bisect
+import json
+import logging
+from array import array
+from typing import Iterator
+
+from redis.asyncio.client import Redis, PubSub
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.cache.redis_conn import cache_database
+from src.database.sql.models import Tag, Image, ImageTag
+from src.monitoring.tracing import continue_trace, current_traceparent
+from src.tag.repository import TagRepository
+
+logger = logging.getLogger(__name__)
+
+EVENTS_CHANNEL = "tag_index:events"
+BUILD_CHUNK = 10000
+SUBSCRIBE_RETRY_MIN = 0.5
+SUBSCRIBE_RETRY_MAX = 30.0
+# Containers with more members are bitsets, the others sorted arrays.
+ARRAY_MAX = 4096
+BITSET_BYTES = 8192
+
+Container = array | int
+
+
+def _to_bitset(container: Container) -> int:
+    if isinstance(container, int):
+        return container
+    bits = bytearray(BITSET_BYTES)
+    for value in container:
+        bits[value >> 3] |= 1 << (value & 7)
+    return int.from_bytes(bits, "little")
+
+
+def _to_array(bitset: int) -> array:
+    digits = format(bitset, "b")[::-1]
+    values = array("H")
+    position = digits.find("1")
+    while position >= 0:
+        values.append(position)
+        position = digits.find("1", position + 1)
+    return values
+
+
+def _size(container: Container) -> int:
+    return container.bit_count() if isinstance(container, int) else len(container)
+
+
+def _compact(container: Container) -> Container:
+    if isinstance(container, int):
+        if container.bit_count() <= ARRAY_MAX:
+            return _to_array(container)
+    elif len(container) > ARRAY_MAX:
+        return _to_bitset(container)
+    return container
+
+
+def _filter(values: array, other: Container, keep: bool) -> array:
+    if isinstance(other, int):
+        bits = other.to_bytes(BITSET_BYTES, "little")
+        return array(
+            "H", (v for v in values if bool(bits[v >> 3] >> (v & 7) & 1) is keep)
+        )
+    members = set(other)
+    return array("H", (v for v in values if (v in members) is keep))
+
+
+def _and(a: Container, b: Container) -> Container:
+    if isinstance(a, int) and isinstance(b, int):
+        return _compact(a & b)
+    if isinstance(a, int) or (not isinstance(b, int) and len(a) > len(b)):
+        a, b = b, a
+    return _filter(a, b, True)
+
+
+def _or(a: Container, b: Container) -> Container:
+    if isinstance(a, int) or isinstance(b, int):
+        return _to_bitset(a) | _to_bitset(b)
+    return _compact(array("H", sorted(set(a).union(b))))
+
+
+def _sub(a: Container, b: Container) -> Container:
+    if isinstance(a, int):
+        return _compact(a & ~_to_bitset(b))
+    return _filter(a, b, False)
+
+
+class Bitmap:
+    __slots__ = ("_chunks",)
+
+    def __init__(self, chunks: dict[int, Container] | None = None):
+        self._chunks = chunks if chunks is not None else {}
+
+    def add(self, value: int) -> None:
+        high, low = value >> 16, value & 0xFFFF
+        container = self._chunks.get(high)
+        if container is None:
+            self._chunks[high] = array("H", (low,))
+        elif isinstance(container, int):
+            self._chunks[high] = container | (1 << low)
+        else:
+            i = bisect.bisect_left(container, low)
+            if i == len(container) or container[i] != low:
+                container.insert(i, low)
+                if len(container) > ARRAY_MAX:
+                    self._chunks[high] = _to_bitset(container)
+
+    def discard(self, value: int) -> None:
+        high, low = value >> 16, value & 0xFFFF
+        container = self._chunks.get(high)
+        if container is None:
+            return
+        if isinstance(container, int):
+            container = _compact(container & ~(1 << low))
+        else:
+            i = bisect.bisect_left(container, low)
+            if i < len(container) and container[i] == low:
+                del container[i]
+        if _size(container):
+            self._chunks[high] = container
+        else:
+            del self._chunks[high]
+
+    def __contains__(self, value: int) -> bool:
+        container = self._chunks.get(value >> 16)
+        if container is None:
+            return False
+        low = value & 0xFFFF
+        if isinstance(container, int):
+            return bool(container >> low & 1)
+        i = bisect.bisect_left(container, low)
+        return i < len(container) and container[i] == low
+
+    def __len__(self) -> int:
+        return sum(_size(container) for container in self._chunks.values())
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        small, large = sorted((self._chunks, other._chunks), key=len)
+        chunks = {}
+        for high, container in small.items():
+            if high in large:
+                container = _and(container, large[high])
+                if _size(container):
+                    chunks[high] = container
+        return Bitmap(chunks)
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        # Arrays are mutable, so the result never shares them with an operand.
+        chunks = {
+            high: container if isinstance(container, int) else container[:]
+            for high, container in self._chunks.items()
+        }
+        for high, container in other._chunks.items():
+            if high in chunks:
+                chunks[high] = _or(chunks[high], container)
+            else:
+                chunks[high] = container if isinstance(container, int) else container[:]
+        return Bitmap(chunks)
+
+    def __sub__(self, other: "Bitmap") -> "Bitmap":
+        chunks = {}
+        for high, container in self._chunks.items():
+            if high in other._chunks:
+                container = _sub(container, other._chunks[high])
+            elif not isinstance(container, int):
+                container = container[:]
+            if _size(container):
+                chunks[high] = container
+        return Bitmap(chunks)
+
+    def iter_from(self, after: int = -1) -> Iterator[int]:
+        """
+        Iterate the values greater than `after` in ascending order.
+
+        :param after: int: The exclusive lower bound.
+        :return: An iterator of values.
+        """
+        after_high = after >> 16 if after >= 0 else -1
+        for high in sorted(self._chunks):
+            if high < after_high:
+                continue
+            container = self._chunks[high]
+            base = high << 16
+            if not isinstance(container, int):
+                start = 0
+                if high == after_high:
+                    start = bisect.bisect_right(container, after & 0xFFFF)
+                for i in range(start, len(container)):
+                    yield base | container[i]
+                continue
+            if high == after_high:
+                container &= ~((2 << (after & 0xFFFF)) - 1)
+            while container:
+                lowest = container & -container
+                yield base | (lowest.bit_length() - 1)
+                container ^= lowest
+
+
+class TagIndex:
+    def __init__(self):
+        self.ready = False
+        self._bitmaps: dict[int, Bitmap] = {}
+        self._tag_ids: dict[str, int] = {}
+        self._images = Bitmap()
+        self._building = False
+        self._replay: list[dict] = []
+        self._pubsub: PubSub | None = None
+        self._listener: asyncio.Task | None = None
+
+    async def build(self, session: AsyncSession) -> None:
+        """
+        Build the index from Postgres and swap it in.
+
+        Rows are streamed with a server-side cursor in chunks. Events applied
+        while the build runs are replayed on the new index after the swap.
+
+        :param session: AsyncSession: The database session.
+        :return: None.
+        """
+        self._building = True
+        try:
+            tag_ids = {}
+            result = await session.stream(
+                select(Tag.id, Tag.name).execution_options(yield_per=BUILD_CHUNK)
+            )
+            async for rows in result.partitions():
+                tag_ids.update((name, tag_id) for tag_id, name in rows)
+
+            images = Bitmap()
+            result = await session.stream(
+                select(Image.id).execution_options(yield_per=BUILD_CHUNK)
+            )
+            async for rows in result.partitions():
+                for (image_id,) in rows:
+                    images.add(image_id)
+
+            bitmaps: dict[int, Bitmap] = {}
+            result = await session.stream(
+                select(ImageTag.tag_id, ImageTag.image_id).execution_options(
+                    yield_per=BUILD_CHUNK
+                )
+            )
+            async for rows in result.partitions():
+                for tag_id, image_id in rows:
+                    bitmap = bitmaps.get(tag_id)
+                    if bitmap is None:
+                        bitmap = bitmaps[tag_id] = Bitmap()
+                    bitmap.add(image_id)
+        except BaseException:
+            self._building = False
+            self._replay.clear()
+            raise
+
+        self._tag_ids, self._images, self._bitmaps = tag_ids, images, bitmaps
+        self._building = False
+        replay, self._replay = self._replay, []
+        for event in replay:
+            self.apply(event)
+        self.ready = True
+
+    def apply(self, event: dict) -> None:
+        """
+        Apply a change event. Applying the same event twice has no effect.
+
+        :param event: dict: The event with an "op" of "tag", "untag",
+            "image.add", "image.remove", "rename" or "merge".
+        :return: None.
+        """
+        if self._building:
+            self._replay.append(event)
+        op = event["op"]
+        image_id = event.get("image_id")
+        if op == "tag":
+            self._images.add(image_id)
+            for name, tag_id in event["tags"].items():
+                self._tag_ids[name] = tag_id
+                bitmap = self._bitmaps.get(tag_id)
+                if bitmap is None:
+                    bitmap = self._bitmaps[tag_id] = Bitmap()
+                bitmap.add(image_id)
+        elif op == "untag":
+            for tag_id in event["tag_ids"]:
+                bitmap = self._bitmaps.get(tag_id)
+                if bitmap is not None:
+                    bitmap.discard(image_id)
+        elif op == "image.add":
+            self._images.add(image_id)
+        elif op == "image.remove":
+            self._images.discard(image_id)
+            for bitmap in self._bitmaps.values():
+                bitmap.discard(image_id)
+        elif op == "rename":
+            self._tag_ids.pop(event["name"], None)
+            self._tag_ids[event["new_name"]] = event["tag_id"]
+            TagRepository.tag_ids.pop(event["name"])
+        elif op == "merge":
+            target = self._bitmaps.get(event["target_id"], Bitmap())
+            for tag_id in event["tag_ids"]:
+                target = target | self._bitmaps.pop(tag_id, Bitmap())
+            self._bitmaps[event["target_id"]] = target
+            self._tag_ids[event["target"]] = event["target_id"]
+            for name in event["names"]:
+                if name != event["target"]:
+                    self._tag_ids.pop(name, None)
+                    TagRepository.tag_ids.pop(name)
+
+    async def publish(
+        self, cache: Redis, op: str, image_id: int | None = None, **data
+    ) -> None:
+        """
+        Apply a change event locally and publish it to the other workers.
+
+        :param cache: Redis: The Redis connection.
+        :param op: str: The event operation.
+        :param image_id: int | None: The ID of the changed image, if any.
+        :param data: The event payload.
+        :return: None.
+        """
+        event = {"op": op, "image_id": image_id, **data}
+        self.apply(event)
+        traceparent = current_traceparent()
+        if traceparent is not None:
+            event["traceparent"] = traceparent
+        try:
+            await cache.publish(EVENTS_CHANNEL, json.dumps(event, separators=(",", ":")))
+        except RedisError:
+            logger.warning("Failed to publish tag index event for image %s", image_id)
+
+    def _union(self, names: list[str]) -> Bitmap:
+        result = Bitmap()
+        for name in names:
+            tag_id = self._tag_ids.get(name)
+            if tag_id is not None and tag_id in self._bitmaps:
+                result = result | self._bitmaps[tag_id]
+        return result
+
+    def search(
+        self,
+        all_tags: list[str],
+        any_tags: list[str],
+        no_tags: list[str],
+        after: int,
+        limit: int,
+    ) -> tuple[list[int], int | None]:
+        """
+        Find images matching a tag query, ordered by image ID.
+
+        :param all_tags: list[str]: Images must carry every one of these tags.
+        :param any_tags: list[str]: Images must carry at least one of these tags.
+        :param no_tags: list[str]: Images must carry none of these tags.
+        :param after: int: Return only images with an ID greater than this.
+        :param limit: int: The maximum number of image IDs to return.
+        :return: The page of image IDs and the cursor of the next page.
+        """
+        if all_tags:
+            bitmaps = []
+            for name in all_tags:
+                tag_id = self._tag_ids.get(name)
+                if tag_id is None or tag_id not in self._bitmaps:
+                    return [], None
+                bitmaps.append(self._bitmaps[tag_id])
+            bitmaps.sort(key=len)
+            result = bitmaps[0]
+            for bitmap in bitmaps[1:]:
+                result = result & bitmap
+            if any_tags:
+                result = result & self._union(any_tags)
+        elif any_tags:
+            result = self._union(any_tags)
+        else:
+            result = self._images
+        if no_tags:
+            result = result - self._union(no_tags)
+
+        page = []
+        for image_id in result.iter_from(after):
+            if len(page) == limit:
+                return page, page[-1]
+            page.append(image_id)
+        return page, None
+
+    async def start(self) -> None:
+        """
+        Start listening for change events from the other workers.
+
+        The subscription is made by the listener task, so this never fails
+        when Redis is unavailable.
+
+        :return: None.
+        """
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _subscribe(self) -> None:
+        cache = await cache_database()
+        self._pubsub = cache.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(EVENTS_CHANNEL)
+        logger.info("Tag index subscribed to change events")
+
+    async def _unsubscribe(self) -> None:
+        if self._pubsub is not None:
+            pubsub, self._pubsub = self._pubsub, None
+            try:
+                await pubsub.reset()
+            except (RedisError, OSError):
+                pass
+
+    async def _listen(self) -> None:
+        delay = SUBSCRIBE_RETRY_MIN
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._subscribe()
+                    delay = SUBSCRIBE_RETRY_MIN
+                message = await self._pubsub.get_message(timeout=1.0)
+            except (RedisError, OSError, asyncio.TimeoutError):
+                logger.warning(
+                    "Tag index has no event subscription, retrying in %.1f s", delay
+                )
+                await self._unsubscribe()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, SUBSCRIBE_RETRY_MAX)
+                continue
+            if message is not None and message["type"] == "message":
+                try:
+                    event = json.loads(message["data"])
+                    with continue_trace(
+                        "tag_index.apply",
+                        event.pop("traceparent", None),
+                        {"op": event.get("op")},
+                    ):
+                        self.apply(event)
+                except Exception:
+                    logger.exception("Tag index skipped event %r", message["data"])
+
+    async def close(self) -> None:
+        """
+        Stop listening for change events.
+
+        :return: None.
+        """
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await self._unsubscribe()
+
+
+tag_index = TagIndex()
@@ -0,0 +1,163 @@
+"""
+Related Tags
+
+This module precomputes tag co-occurrence and serves related tags.
+
+The job streams `image_tags` ordered by image, counts every pair of tags that
+appear on the same image and keeps the top-K neighbours of each tag in a Redis
+sorted set. Neighbours are scored by cosine similarity, count(a, b) /
+sqrt(count(a) * count(b)), so tags that are simply popular everywhere do not
+crowd out tags that are actually related.
+
+Memory stays within a fixed budget: pairs are packed into single ints, each
+image contributes at most `tag_related_max_tags_per_image` tags, and when the
+pair table grows past `tag_related_max_pairs` the rarest pairs are pruned
+(lossy counting), so counts of frequent pairs stay accurate.
+
+Classes:
+- RelatedTagsQuery: Compute and read related tags.
+"""
+
+import heapq
+import logging
+import math
+from collections import defaultdict
+from itertools import combinations
+
+from redis.asyncio.client import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database.sql.models import ImageTag, Tag
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK = 10000
+REDIS_CHUNK = 500
+
+
+def related_key(tag_id: int) -> str:
+    return f"tag:related:{tag_id}"
+
+
+class RelatedTagsQuery:
+    @staticmethod
+    def _prune(pairs: dict[int, int], floor: int) -> int:
+        while len(pairs) > settings.tag_related_max_pairs:
+            floor += 1
+            for pair in [pair for pair, count in pairs.items() if count <= floor]:
+                del pairs[pair]
+        return floor
+
+    @staticmethod
+    async def count_pairs(session: AsyncSession) -> tuple[dict[int, int], dict[int, int]]:
+        """
+        Stream image_tags and count tag frequencies and tag pair co-occurrences.
+
+        :param session: AsyncSession: The database session.
+        :return: Tag frequencies and pair counts keyed by (low_id << 32 | high_id).
+        """
+        frequencies: dict[int, int] = defaultdict(int)
+        pairs: dict[int, int] = defaultdict(int)
+        floor = 0
+        max_tags = settings.tag_related_max_tags_per_image
+
+        def flush(tags: list[int]) -> None:
+            for tag_id in tags:
+                frequencies[tag_id] += 1
+            for low, high in combinations(sorted(tags[:max_tags]), 2):
+                pairs[low << 32 | high] += 1
+
+        result = await session.stream(
+            select(ImageTag.image_id, ImageTag.tag_id)
+            .order_by(ImageTag.image_id)
+            .execution_options(yield_per=STREAM_CHUNK)
+        )
+        current_image, tags = None, []
+        async for rows in result.partitions():
+            for image_id, tag_id in rows:
+                if image_id != current_image:
+                    flush(tags)
+                    current_image, tags = image_id, []
+                tags.append(tag_id)
+            if len(pairs) > settings.tag_related_max_pairs:
+                floor = RelatedTagsQuery._prune(pairs, floor)
+        flush(tags)
+        if floor:
+            logger.info("Tag co-occurrence pruned pairs seen %s times or less", floor)
+        return frequencies, pairs
+
+    @staticmethod
+    def top_neighbours(
+        frequencies: dict[int, int], pairs: dict[int, int]
+    ) -> dict[int, list[tuple[float, int]]]:
+        """
+        Select the top-K neighbours of every tag by cosine similarity.
+
+        :param frequencies: dict[int, int]: The number of images per tag.
+        :param pairs: dict[int, int]: The pair counts from count_pairs.
+        :return: A mapping of tag ID to a list of (score, neighbour ID).
+        """
+        top_k = settings.tag_related_top_k
+        heaps: dict[int, list[tuple[float, int]]] = defaultdict(list)
+        for pair, count in pairs.items():
+            low, high = pair >> 32, pair & 0xFFFFFFFF
+            score = count / math.sqrt(frequencies[low] * frequencies[high])
+            for tag_id, neighbour in ((low, high), (high, low)):
+                heap = heaps[tag_id]
+                if len(heap) < top_k:
+                    heapq.heappush(heap, (score, neighbour))
+                elif score > heap[0][0]:
+                    heapq.heapreplace(heap, (score, neighbour))
+        return heaps
+
+    @staticmethod
+    async def compute(session: AsyncSession, cache: Redis) -> int:
+        """
+        Recompute related tags and store them in Redis.
+
+        :param session: AsyncSession: The database session.
+        :param cache: Redis: The Redis connection.
+        :return: The number of tags with related tags.
+        """
+        frequencies, pairs = await RelatedTagsQuery.count_pairs(session)
+        neighbours = RelatedTagsQuery.top_neighbours(frequencies, pairs)
+        del pairs
+
+        stale = [tag_id for tag_id in frequencies if tag_id not in neighbours]
+        items = list(neighbours.items())
+        for i in range(0, len(items), REDIS_CHUNK):
+            async with cache.pipeline(transaction=False) as pipe:
+                for tag_id, heap in items[i : i + REDIS_CHUNK]:
+                    pipe.delete(related_key(tag_id))
+                    pipe.zadd(related_key(tag_id), {n: score for score, n in heap})
+                await pipe.execute()
+        for i in range(0, len(stale), REDIS_CHUNK):
+            await cache.delete(*[related_key(t) for t in stale[i : i + REDIS_CHUNK]])
+        return len(neighbours)
+
+    @staticmethod
+    async def read(
+        tag_id: int, limit: int, session: AsyncSession, cache: Redis
+    ) -> list[tuple[str, float]]:
+        """
+        Read the related tags of a tag.
+
+        :param tag_id: int: The ID of the tag.
+        :param limit: int: The maximum number of related tags.
+        :param session: AsyncSession: The database session used to resolve names.
+        :param cache: Redis: The Redis connection.
+        :return: A list of (name, score) ordered by score.
+        """
+        items = await cache.zrevrange(related_key(tag_id), 0, limit - 1, withscores=True)
+        if not items:
+            return []
+        ids = [int(member) for member, _ in items]
+        rows = await session.execute(select(Tag.id, Tag.name).where(Tag.id.in_(ids)))
+        names = dict(rows.all())
+        return [
+            (names[int(member)], score)
+            for member, score in items
+            if int(member) in names
+        ]
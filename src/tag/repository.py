@@ -9,66 +9,209 @@ Class:
 
 Methods:
 
-- create(image: Image, tag_schema: TagSchemaRequest, session: AsyncSession) -> Image:
-    Creates a new image with the specified tags.
+- read_id(name: str, session: AsyncSession) -> int | None:
+    Returns the ID of a tag by its name.
 
-- delete(image: Image, tag_schema: TagSchemaRequest, session: AsyncSession) -> Image:
+- get_tag_ids(names: list[str], session: AsyncSession) -> dict[str, int]:
+    Resolves tag names to IDs through a bounded name-to-id cache, creating missing tags.
+
+- create(image: Image, tag_schema: TagSchemaRequest, session: AsyncSession) -> dict[str, int]:
+    Attaches tags to an image with bulk upserts.
+
+- delete(image: Image, tag_schema: TagSchemaRequest, session: AsyncSession) -> list[int]:
     Removes tags from an image.
 
 - search_images_by_tags(tag_names: list[str], session: AsyncSession) -> list[Image]:
     Searches for images by tag names.
+
+- top(limit: int, session: AsyncSession) -> list[dict]:
+    Returns the most used tags from a short-lived cached snapshot.
+
+- rename(name: str, new_name: str, session: AsyncSession) -> int | None:
+    Renames a tag.
+
+- merge(names: list[str], target: str, session: AsyncSession) -> tuple[list[int], int]:
+    Moves all images of several tags to a target tag and deletes the merged tags.
+
+- reconcile_usage_counts(session: AsyncSession) -> int:
+    Repairs usage counts that drifted from image_tags.
 """
 
+from sqlalchemy import delete, update, func, exists
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from src.config import settings
+from src.database.cache.caching import cached
 from src.database.sql.models import Tag, Image, ImageTag
+from src.image.repository import ImageQuery
 from src.tag.schemas import TagSchemaRequest
+from src.utils.lru import LRUCache
+
+
+TOP_TAGS_KEY = "tag:top"
+TOP_TAGS_SNAPSHOT = 100
 
 
 class TagRepository:
+    tag_ids = LRUCache(settings.tag_id_cache_size)
+
+    @staticmethod
+    async def _adjust_usage(tag_ids, delta: int, session: AsyncSession) -> None:
+        if tag_ids:
+            await session.execute(
+                update(Tag)
+                .where(Tag.id.in_(tag_ids))
+                .values(usage_count=Tag.usage_count + delta)
+                .execution_options(synchronize_session=False)
+            )
+
+    @staticmethod
+    async def read_id(name: str, session: AsyncSession) -> int | None:
+        """
+        Return the ID of a tag by its name without creating it.
+
+        :param name: str: The tag name.
+        :param session: AsyncSession: The database session.
+        :return: The tag ID or None if the tag doesn't exist.
+        """
+        tag_id = TagRepository.tag_ids.get(name)
+        if tag_id is None:
+            tag_id = await session.scalar(select(Tag.id).where(Tag.name == name))
+            if tag_id is not None:
+                TagRepository.tag_ids.set(name, tag_id)
+        return tag_id
+
+    @staticmethod
+    async def get_tag_ids(names: list[str], session: AsyncSession) -> dict[str, int]:
+        """
+        Resolve tag names to IDs, creating the missing tags.
+
+        Names found in the in-process cache skip the database completely. The
+        rest are inserted with ON CONFLICT DO NOTHING, so concurrent requests
+        adding the same new tag do not fail on the unique constraint; the
+        names that already existed are read back with a single SELECT. Names
+        are inserted in sorted order, so two requests adding the same tags in
+        a different order wait for each other instead of deadlocking.
+
+        :param names: list[str]: Unique tag names.
+        :param session: AsyncSession: The database session.
+        :return: A mapping of tag name to tag ID.
+        """
+        tag_ids = {}
+        missing = []
+        for name in names:
+            tag_id = TagRepository.tag_ids.get(name)
+            if tag_id is None:
+                missing.append(name)
+            else:
+                tag_ids[name] = tag_id
+        if not missing:
+            return tag_ids
+
+        missing.sort()
+        stmt = (
+            insert(Tag)
+            .values([{"name": name} for name in missing])
+            .on_conflict_do_nothing(index_elements=[Tag.name])
+            .returning(Tag.id, Tag.name)
+        )
+        rows = await session.execute(stmt)
+        found = {name: tag_id for tag_id, name in rows}
+        existing = [name for name in missing if name not in found]
+        if existing:
+            rows = await session.execute(
+                select(Tag.id, Tag.name).where(Tag.name.in_(existing))
+            )
+            found.update({name: tag_id for tag_id, name in rows})
+        tag_ids.update(found)
+        return tag_ids
+
+    @staticmethod
+    async def _attach(
+            image_id: int, tag_ids: dict[str, int], session: AsyncSession
+    ) -> set[int]:
+        stmt = (
+            insert(ImageTag)
+            .values(
+                [
+                    {"image_id": image_id, "tag_id": tag_id}
+                    for tag_id in sorted(set(tag_ids.values()))
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=[ImageTag.image_id, ImageTag.tag_id])
+            .returning(ImageTag.tag_id)
+        )
+        return set((await session.execute(stmt)).scalars().all())
+
     @staticmethod
     async def create(
             image: Image, tag_schema: TagSchemaRequest, session: AsyncSession
-    ) -> Image:
+    ) -> dict[str, int]:
         """
-        Create a new image with specified tags.
+        Attach tags to an image, creating the tags that do not exist yet.
 
-        :param image: Image: The image object to create.
-        :param tag_schema: TagSchemaRequest: The tag schema to create new tags.
+        Tags are attached with one bulk INSERT into image_tags, in tag ID
+        order like every other request; pairs that already exist are skipped
+        by ON CONFLICT DO NOTHING. If the insert fails on a foreign key
+        because a cached tag ID is stale, the names are resolved again from
+        the database and the insert is retried once.
+
+        :param image: Image: The image to tag.
+        :param tag_schema: TagSchemaRequest: The tag schema with tag names.
         :param session: AsyncSession: The database session.
-        :return: An image object.
-        """
-        for tag in tag_schema.names:
-            stmt = select(Tag).where(Tag.name == tag)
-            tag_to_append = await session.execute(stmt)
-            tag_to_append = tag_to_append.scalars().unique().one_or_none()
-            if tag_to_append:
-                image.tags.append(tag_to_append)
-            else:
-                image.tags.append(Tag(name=tag))
-        session.add(image)
+        :return: A mapping of name to ID of the newly attached tags.
+        """
+        names = list(dict.fromkeys(tag_schema.names))
+        if not names:
+            return {}
+        tag_ids = await TagRepository.get_tag_ids(names, session)
+        try:
+            attached = await TagRepository._attach(image.id, tag_ids, session)
+        except IntegrityError:
+            # A cached name still points at a tag that another worker merged
+            # away: resolve the names from the database and try once more.
+            await session.rollback()
+            await session.refresh(image)
+            for name in names:
+                TagRepository.tag_ids.pop(name)
+            tag_ids = await TagRepository.get_tag_ids(names, session)
+            attached = await TagRepository._attach(image.id, tag_ids, session)
+        await ImageQuery.adjust_counters(image.id, session, tags=len(attached))
+        await TagRepository._adjust_usage(attached, 1, session)
         await session.commit()
-        await session.refresh(image)
-        return image
+        await ImageQuery.invalidate(image.id)
+        TagRepository.tag_ids.update(tag_ids.items())
+        return {name: tag_id for name, tag_id in tag_ids.items() if tag_id in attached}
 
     @staticmethod
     async def delete(
             image: Image, tag_schema: TagSchemaRequest, session: AsyncSession
-    ) -> Image:
+    ) -> list[int]:
         """
-        Remove tags from an image.
+        Remove tags from an image with a single DELETE.
 
-        :param image: Image: The image object to modify.
+        :param image: Image: The image to modify.
         :param tag_schema: TagSchemaRequest: The tag schema with names to delete.
         :param session: AsyncSession: The database session.
-        :return: The modified image object.
+        :return: The IDs of the detached tags.
         """
-        for tag in image.tags:
-            if tag.name in tag_schema.names:
-                image.tags.remove(tag)
-        session.add(image)
+        stmt = (
+            delete(ImageTag)
+            .where(
+                ImageTag.image_id == image.id,
+                ImageTag.tag_id.in_(select(Tag.id).where(Tag.name.in_(tag_schema.names))),
+            )
+            .returning(ImageTag.tag_id)
+        )
+        detached = (await session.execute(stmt)).scalars().all()
+        await ImageQuery.adjust_counters(image.id, session, tags=-len(detached))
+        await TagRepository._adjust_usage(detached, -1, session)
         await session.commit()
-        return image
+        await ImageQuery.invalidate(image.id)
+        return list(detached)
 
     @staticmethod
     async def search_images_by_tags(tag_names: list[str], session: AsyncSession) -> list[Image]:
@@ -90,3 +233,153 @@ class TagRepository:
         )
         images = await session.execute(stmt)
         return images.scalars().all()
+
+    @staticmethod
+    @cached(TOP_TAGS_KEY, ttl=settings.tag_top_cache_ttl, local=True)
+    async def _top_snapshot(session: AsyncSession) -> list[dict]:
+        rows = await session.execute(
+            select(Tag.name, Tag.usage_count)
+            .where(Tag.usage_count > 0)
+            .order_by(Tag.usage_count.desc(), Tag.name)
+            .limit(TOP_TAGS_SNAPSHOT)
+        )
+        return [{"name": name, "usage_count": count} for name, count in rows]
+
+    @staticmethod
+    async def top(limit: int, session: AsyncSession) -> list[dict]:
+        """
+        Return the most used tags.
+
+        The top tags are read from a snapshot kept for a few seconds in Redis
+        and in the memory of every worker, so the tag cloud shown on every
+        page usually costs no round-trip at all.
+
+        :param limit: int: The number of tags to return, up to 100.
+        :param session: AsyncSession: The database session.
+        :return: A list of dictionaries with "name" and "usage_count".
+        """
+        return (await TagRepository._top_snapshot(session))[:limit]
+
+    @staticmethod
+    async def rename(name: str, new_name: str, session: AsyncSession) -> int | None:
+        """
+        Rename a tag with a single UPDATE.
+
+        :param name: str: The current tag name.
+        :param new_name: str: The new tag name, which must not exist yet.
+        :param session: AsyncSession: The database session.
+        :raises IntegrityError: If a tag with the new name already exists.
+        :return: The ID of the renamed tag or None if it doesn't exist.
+        """
+        try:
+            tag_id = await session.scalar(
+                update(Tag)
+                .where(Tag.name == name)
+                .values(name=new_name)
+                .returning(Tag.id)
+            )
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            raise
+        TagRepository.tag_ids.pop(name)
+        return tag_id
+
+    @staticmethod
+    async def merge(
+            names: list[str], target: str, session: AsyncSession
+    ) -> tuple[list[int], int]:
+        """
+        Move all images of several tags to a target tag and delete the merged tags.
+
+        The merge is a handful of set-based statements in one transaction:
+        links that would duplicate an existing link of the same image are
+        deleted, the remaining links are re-pointed with one UPDATE, and the
+        counters of the target tag and of the affected images are recounted.
+
+        :param names: list[str]: The names of the tags to merge.
+        :param target: str: The name of the tag to merge into; created if missing.
+        :param session: AsyncSession: The database session.
+        :return: The IDs of the merged tags and the ID of the target tag.
+        """
+        target_id = (await TagRepository.get_tag_ids([target], session))[target]
+        rows = await session.execute(
+            select(Tag.id).where(Tag.name.in_(names), Tag.id != target_id)
+        )
+        source_ids = list(rows.scalars().all())
+        if not source_ids:
+            await session.commit()
+            return [], target_id
+
+        other = aliased(ImageTag)
+        duplicates = await session.execute(
+            delete(ImageTag)
+            .where(
+                ImageTag.tag_id.in_(source_ids),
+                exists().where(
+                    other.image_id == ImageTag.image_id,
+                    (other.tag_id == target_id)
+                    | (other.tag_id.in_(source_ids) & (other.id < ImageTag.id)),
+                ),
+            )
+            .returning(ImageTag.image_id)
+        )
+        affected_images = set(duplicates.scalars().all())
+        await session.execute(
+            update(ImageTag)
+            .where(ImageTag.tag_id.in_(source_ids))
+            .values(tag_id=target_id)
+            .execution_options(synchronize_session=False)
+        )
+        await session.execute(
+            update(Tag)
+            .where(Tag.id == target_id)
+            .values(
+                usage_count=select(func.count())
+                .where(ImageTag.tag_id == target_id)
+                .scalar_subquery()
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if affected_images:
+            await session.execute(
+                update(Image)
+                .where(Image.id.in_(affected_images))
+                .values(
+                    tag_count=select(func.count())
+                    .where(ImageTag.image_id == Image.id)
+                    .scalar_subquery(),
+                    updated_at=Image.updated_at,
+                )
+                .execution_options(synchronize_session=False)
+            )
+        await session.execute(
+            delete(Tag)
+            .where(Tag.id.in_(source_ids))
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        await ImageQuery.invalidate(*affected_images)
+        for name in names:
+            TagRepository.tag_ids.pop(name)
+        return source_ids, target_id
+
+    @staticmethod
+    async def reconcile_usage_counts(session: AsyncSession) -> int:
+        """
+        Recount the images of every tag and repair drifted usage counts.
+
+        :param session: AsyncSession: The database session.
+        :return: The number of repaired tags.
+        """
+        usage_count = (
+            select(func.count()).where(ImageTag.tag_id == Tag.id).scalar_subquery()
+        )
+        result = await session.execute(
+            update(Tag)
+            .where(Tag.usage_count != usage_count)
+            .values(usage_count=usage_count)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        return result.rowcount
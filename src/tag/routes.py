@@ -6,19 +6,39 @@ Routes:
 
 - POST /tag/create: Create a new tag.
 - DELETE /tag/delete: Delete tags from an image.
-- GET /tag/search: Search for images by tag name.
+- GET /tag/search: Search for images by a combination of tags.
+- GET /tag/{name}/related: Get tags that often appear together with a tag.
+- GET /tag/top: Get the most used tags.
+- POST /tag/rename: Rename a tag.
+- POST /tag/merge: Merge several tags into one.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.exc import IntegrityError
+from redis.asyncio.client import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.database.sql.postgres import database
+from src.database.cache.redis_conn import cache_database
 from src.database.sql.models import User
 from src.auth.service import current_active_user
 from src.image.repository import ImageQuery
-from src.tag.schemas import TagSchemaRequest
+from src.tag.index import tag_index
+from src.tag.related import RelatedTagsQuery
+from src.tag.schemas import (
+    TagSchemaRequest,
+    TagSearchSchemaResponse,
+    RelatedTagSchemaResponse,
+    TagUsageSchemaResponse,
+    TagRenameSchemaRequest,
+    TagMergeSchemaRequest,
+)
+from src.database.cache.caching import invalidate_keys
+from src.tag.repository import TOP_TAGS_KEY
 from src.tag.repository import TagRepository
-from src.image.routes import get_image
+from src.image.routes import get_image_or_404
 from src.auth.utils.access import access_service
+from src.image.schemas import ImageSchemaResponse
+from src.utils.responses import FastJSONResponse, dump
 
 router = APIRouter(prefix="/tag", tags=["tags"])
 
@@ -28,6 +48,7 @@ async def create_tag(
         tag_data: TagSchemaRequest,
         user: User = Depends(current_active_user),
         session: AsyncSession = Depends(database),
+        cache: Redis = Depends(cache_database),
 ):
     """
     Create a new tag and associate it with an image.
@@ -35,11 +56,14 @@ async def create_tag(
     :param tag_data: TagSchemaRequest: The tag schema with tag names and image_id.
     :param user: User: The current authenticated user.
     :param session: AsyncSession: The database session.
+    :param cache: Redis: The Redis cache.
     :return: A dictionary with a "detail" message.
     """
-    image = await get_image(tag_data.image_id, user, session)
+    image = await get_image_or_404(tag_data.image_id, session)
     access_service("can_add_tag", user, image)
-    await TagRepository.create(image, tag_data, session)
+    attached = await TagRepository.create(image, tag_data, session)
+    if attached:
+        await tag_index.publish(cache, "tag", image.id, tags=attached)
     return {"detail": "tags added"}
 
 
@@ -48,6 +72,7 @@ async def delete_tags(
         tag_data: TagSchemaRequest,
         user: User = Depends(current_active_user),
         session: AsyncSession = Depends(database),
+        cache: Redis = Depends(cache_database),
 ):
     """
     Delete tags from an image.
@@ -55,29 +80,172 @@ async def delete_tags(
     :param tag_data: TagSchemaRequest: The tag schema with tag names and image_id.
     :param user: User: The current authenticated user.
     :param session: AsyncSession: The database session.
+    :param cache: Redis: The Redis cache.
     :return: No content response.
     """
-    image = await get_image(tag_data.image_id, user, session)
+    image = await get_image_or_404(tag_data.image_id, session)
     access_service("can_delete_tag", user, image)
-    await TagRepository.delete(image, tag_data, session)
+    detached = await TagRepository.delete(image, tag_data, session)
+    if detached:
+        await tag_index.publish(cache, "untag", image.id, tag_ids=detached)
+
+
+@router.get("/search", response_model=TagSearchSchemaResponse)
+async def search_images_by_tags(
+        all_tags: list[str] = Query(default=[], alias="all"),
+        any_tags: list[str] = Query(default=[], alias="any"),
+        no_tags: list[str] = Query(default=[], alias="not"),
+        after: int = Query(default=0, ge=0),
+        limit: int = Query(default=20, ge=1, le=100),
+        user: User = Depends(current_active_user),
+        session: AsyncSession = Depends(database),
+):
+    """
+    Search for images by a combination of tags.
 
+    The tag combination is evaluated by the in-process tag index, and only the
+    resulting page of images is loaded from the database.
 
-@router.get("/search")
-async def search_images_by_tags(tag_name: str, session: AsyncSession = Depends(database)):
+    :param all_tags: list[str]: Images must have all of these tags.
+    :param any_tags: list[str]: Images must have at least one of these tags.
+    :param no_tags: list[str]: Images must have none of these tags.
+    :param after: int: Return images with an ID greater than this cursor.
+    :param limit: int: The maximum number of images to return.
+    :param user: User: The current authenticated user.
+    :param session: AsyncSession: The database session.
+    :raises HTTPException 503 if the tag index is still being built.
+    :return: A page of images and the cursor of the next page.
+    """
+    if not tag_index.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Tag index is not ready yet",
+        )
+    image_ids, next_after = tag_index.search(all_tags, any_tags, no_tags, after, limit)
+    images = await ImageQuery.read_many(image_ids, session)
+    return FastJSONResponse(
+        {
+            "images": [dump(ImageSchemaResponse, image) for image in images],
+            "next_after": next_after,
+        }
+    )
+
+
+@router.get("/{name}/related", response_model=list[RelatedTagSchemaResponse])
+async def get_related_tags(
+        name: str,
+        limit: int = Query(default=10, ge=1, le=50),
+        user: User = Depends(current_active_user),
+        session: AsyncSession = Depends(database),
+        cache: Redis = Depends(cache_database),
+):
     """
-    Search for images by tag name.
+    Get tags that often appear on the same images as a tag.
 
-    :param tag_name: str: The tag name to search for.
+    Related tags are precomputed by a periodic job, so new tags have no
+    related tags until its next run.
 
+    :param name: str: The tag name.
+    :param limit: int: The maximum number of related tags.
+    :param user: User: The current authenticated user.
     :param session: AsyncSession: The database session.
+    :param cache: Redis: The Redis cache.
+    :raises HTTPException 403 if the user is not an admin.
     :raises HTTPException 404 if the tag is not found.
-    :return: A list of images matching the tag.
+    :return: Related tags ordered by similarity.
+    """
+    tag_id = await TagRepository.read_id(name, session)
+    if tag_id is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found")
+    related = await RelatedTagsQuery.read(tag_id, limit, session, cache)
+    return [{"name": related_name, "score": score} for related_name, score in related]
+
+
+@router.get("/top", response_model=list[TagUsageSchemaResponse])
+async def get_top_tags(
+        limit: int = Query(default=30, ge=1, le=100),
+        session: AsyncSession = Depends(database),
+        cache: Redis = Depends(cache_database),
+):
+    """
+    Get the most used tags for the tag cloud.
+
+    The result may be a few seconds old.
 
+    :param limit: int: The number of tags to return.
+    :param session: AsyncSession: The database session.
+    :param cache: Redis: The Redis cache.
+    :return: Tags with their usage counts, most used first.
     """
+    return await TagRepository.top(limit, session)
+
 
-    tags = await TagRepository.search_tags(tag_name, session)
-    if not tags:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Tag not found')
-    image_ids = [tag.image_id for tag in tags]
-    images = await ImageQuery.search_images_by_tags(image_ids, session)
-    return images
+@router.post("/rename")
+async def rename_tag(
+        tag_data: TagRenameSchemaRequest,
+        user: User = Depends(current_active_user),
+        session: AsyncSession = Depends(database),
+        cache: Redis = Depends(cache_database),
+):
+    """
+    Rename a tag on all images at once. Only admins may rename tags.
+
+    :param tag_data: TagRenameSchemaRequest: The current and the new tag name.
+    :param user: User: The current authenticated user.
+    :param session: AsyncSession: The database session.
+    :param cache: Redis: The Redis cache.
+    :raises HTTPException 403 if the user is not an admin.
+    :raises HTTPException 404 if the tag is not found.
+    :raises HTTPException 409 if a tag with the new name already exists.
+    :return: A dictionary with a "detail" message.
+    """
+    access_service.check_admin(user)
+    try:
+        tag_id = await TagRepository.rename(tag_data.name, tag_data.new_name, session)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Tag with this name already exists, merge the tags instead",
+        )
+    if tag_id is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found")
+    await tag_index.publish(
+        cache, "rename", tag_id=tag_id, name=tag_data.name, new_name=tag_data.new_name
+    )
+    await invalidate_keys(TOP_TAGS_KEY)
+    return {"detail": "tag renamed"}
+
+
+@router.post("/merge")
+async def merge_tags(
+        tag_data: TagMergeSchemaRequest,
+        user: User = Depends(current_active_user),
+        session: AsyncSession = Depends(database),
+        cache: Redis = Depends(cache_database),
+):
+    """
+    Merge several tags into a target tag and delete the merged tags. Only
+    admins may merge tags.
+
+    :param tag_data: TagMergeSchemaRequest: The names to merge and the target name.
+    :param user: User: The current authenticated user.
+    :param session: AsyncSession: The database session.
+    :param cache: Redis: The Redis cache.
+    :raises HTTPException 403 if the user is not an admin.
+    :return: A dictionary with a "detail" message.
+    """
+    access_service.check_admin(user)
+    source_ids, target_id = await TagRepository.merge(
+        tag_data.names, tag_data.target, session
+    )
+    if source_ids:
+        await tag_index.publish(
+            cache,
+            "merge",
+            tag_ids=source_ids,
+            names=tag_data.names,
+            target_id=target_id,
+            target=tag_data.target,
+        )
+        await invalidate_keys(TOP_TAGS_KEY)
+    return {"detail": f"{len(source_ids)} tags merged"}
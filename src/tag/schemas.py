@@ -1,5 +1,7 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+from src.image.schemas import ImageSchemaResponse
 
 
 class TagSchemaRequest(BaseModel):
@@ -16,3 +18,28 @@ class TagSchemaResponse(TagSchemaRequest):
 
     class Config:
         from_attributes: True
+
+
+class TagSearchSchemaResponse(BaseModel):
+    images: List[ImageSchemaResponse]
+    next_after: Optional[int]
+
+
+class RelatedTagSchemaResponse(BaseModel):
+    name: str
+    score: float
+
+
+class TagUsageSchemaResponse(BaseModel):
+    name: str
+    usage_count: int
+
+
+class TagRenameSchemaRequest(BaseModel):
+    name: str
+    new_name: str = Field(max_length=50)
+
+
+class TagMergeSchemaRequest(BaseModel):
+    names: List[str]
+    target: str = Field(max_length=50)
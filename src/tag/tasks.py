@@ -0,0 +1,47 @@
+"""
+Tag Tasks
+
+This module contains the periodic jobs that rebuild the in-process tag index
+and recompute related tags.
+"""
+
+from src.config import settings
+from src.database.cache.redis_conn import cache_database
+from src.database.sql.postgres import database
+from src.tag.index import tag_index
+from src.tag.related import RelatedTagsQuery
+from src.utils.periodic import PeriodicTask
+
+
+async def rebuild_tag_index() -> None:
+    """
+    Rebuild the tag index from Postgres with a fresh database session.
+
+    :return: None.
+    """
+    async with database.async_session() as session:
+        await tag_index.build(session)
+
+
+tag_index_rebuild_task = PeriodicTask(
+    "tag-index-rebuild", settings.tag_index_rebuild_interval, rebuild_tag_index
+)
+
+
+async def compute_related_tags() -> None:
+    """
+    Recompute tag co-occurrence with a fresh database session.
+
+    :return: None.
+    """
+    cache = await cache_database()
+    async with database.async_session() as session:
+        await RelatedTagsQuery.compute(session, cache)
+
+
+related_tags_task = PeriodicTask(
+    "related-tags",
+    settings.tag_related_interval,
+    compute_related_tags,
+    cluster=True,
+)
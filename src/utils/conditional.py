@@ -0,0 +1,96 @@
+"""
+Conditional Responses
+
+This module contains helpers for ETag validators and conditional GET.
+
+A route computes an ETag from the version of the underlying row, or from the
+cached response bytes, and passes a callable that renders the body. When the
+client's If-None-Match matches, a bodyless 304 is returned and the body is
+never serialized.
+
+Responses depend on the authenticated user, so they are marked private and
+vary on the Authorization header. no-cache makes clients revalidate every time,
+which is cheap because unchanged data is answered with 304.
+
+The body is encoded like every other response, as JSON or as MessagePack when
+the client asks for it (see src.utils.responses). Each representation has its
+own ETag: the ETag of a MessagePack response is derived from the route's ETag
+and the media type, so a client never revalidates one encoding with the
+validator of the other.
+
+Functions:
+- make_etag: Build a weak ETag from version parts or response bytes.
+- etag_matches: Check an If-None-Match header against an ETag.
+- conditional_response: Answer a GET with 304 or with the rendered body.
+"""
+
+import hashlib
+from typing import Any, Callable
+
+import orjson
+from fastapi import Request, Response, status
+
+from src.utils.responses import MSGPACK_MEDIA_TYPE, FastJSONResponse, accepts_msgpack
+
+CACHE_HEADERS = {"Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+
+def make_etag(*parts) -> str:
+    """
+    Build a weak ETag.
+
+    :param parts: Values that change whenever the representation changes, or the
+        response bytes themselves.
+    :return: The quoted ETag.
+    """
+    digest = hashlib.blake2b(digest_size=12)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\x1f")
+    return f'W/"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Check an If-None-Match header with the weak comparison of RFC 9110.
+
+    :param if_none_match: str | None: The header value.
+    :param etag: str: The current ETag.
+    :return: True if the client's copy is current.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def conditional_response(
+    request: Request, etag: str, render: Callable[[], bytes | Any]
+) -> Response:
+    """
+    Answer a GET with 304 Not Modified or with the rendered body in the
+    negotiated encoding.
+
+    :param request: Request: The incoming request.
+    :param etag: str: The current ETag of the JSON representation.
+    :param render: Callable[[], bytes | Any]: Produces the body as encoded JSON
+        bytes or as JSON-compatible data; called only when needed.
+    :return: The response.
+    """
+    msgpack = accepts_msgpack()
+    if msgpack:
+        etag = make_etag(etag, MSGPACK_MEDIA_TYPE)
+    headers = {"ETag": etag, **CACHE_HEADERS}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    content = render()
+    if isinstance(content, bytes):
+        if not msgpack:
+            return Response(content, media_type="application/json", headers=headers)
+        content = orjson.loads(content)
+    return FastJSONResponse(content, headers=headers)
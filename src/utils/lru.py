@@ -0,0 +1,74 @@
+"""
+LRU Cache
+
+This module contains a small bounded mapping that evicts the least recently
+used entries. It is meant for in-process lookups that are safe to forget.
+
+Classes:
+- LRUCache: A bounded least-recently-used mapping.
+"""
+
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable
+
+
+class LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the value of a key and mark it as recently used.
+
+        :param key: Hashable: The key to look up.
+        :param default: Any: The value returned when the key is missing.
+        :return: The cached value or default.
+        """
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return default
+        return self._data[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value and evict the least recently used entry if the cache is full.
+
+        :param key: Hashable: The key to store.
+        :param value: Any: The value to store.
+        :return: None.
+        """
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Remove a key and return its value.
+
+        :param key: Hashable: The key to remove.
+        :param default: Any: The value returned when the key is missing.
+        :return: The removed value or default.
+        """
+        return self._data.pop(key, default)
+
+    def update(self, items: Iterable[tuple[Hashable, Any]]) -> None:
+        """
+        Store several values.
+
+        :param items: Iterable: (key, value) pairs.
+        :return: None.
+        """
+        for key, value in items:
+            self.set(key, value)
+
+    def clear(self) -> None:
+        self._data.clear()
@@ -0,0 +1,107 @@
+"""
+Periodic Tasks
+
+This module contains a small helper for running background jobs on an interval
+inside the application event loop. Every run of a job starts a new trace.
+
+Every worker process runs its own copy of each task. A cluster-scoped job,
+which works on shared data (Postgres tables, Redis rankings), must run only
+once per interval across all workers and servers. Before every run, such a
+task takes a Redis lock with `SET NX EX`; the workers that do not get it skip
+the run. The lock is never released: it expires after 90% of the interval, so
+the next run of the cluster can start on any worker. When Redis is unavailable
+the run is skipped as well.
+
+Classes:
+- PeriodicTask: Run an async callable every `interval` seconds until stopped.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+from typing import Awaitable, Callable
+
+from redis.exceptions import RedisError
+
+from src.database.cache.redis_conn import cache_database
+from src.monitoring.tracing import start_trace
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    def __init__(
+        self,
+        name: str,
+        interval: float,
+        job: Callable[[], Awaitable[None]],
+        run_on_start: bool = True,
+        cluster: bool = False,
+    ):
+        """
+        Create a periodic task.
+
+        :param name: str: The name used in log records.
+        :param interval: float: Seconds to wait between two runs.
+        :param job: Callable: An async callable without arguments.
+        :param run_on_start: bool: Run the job immediately when started.
+        :param cluster: bool: Run the job on one worker of the cluster per interval.
+        """
+        self.name = name
+        self.interval = interval
+        self.job = job
+        self.run_on_start = run_on_start
+        self.cluster = cluster
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """
+        Schedule the task in the running event loop.
+
+        :return: None.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self) -> None:
+        """
+        Cancel the task and wait until it has finished.
+
+        :return: None.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        if not self.run_on_start:
+            await asyncio.sleep(self.interval)
+        while True:
+            try:
+                if not self.cluster or await self._acquire():
+                    with start_trace(f"job {self.name}"):
+                        await self.job()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Periodic task %s failed", self.name)
+            await asyncio.sleep(self.interval)
+
+    async def _acquire(self) -> bool:
+        owner = f"{socket.gethostname()}:{os.getpid()}"
+        expires = max(int(self.interval * 0.9), 1)
+        try:
+            cache = await cache_database()
+            acquired = await cache.set(f"lock:job:{self.name}", owner, nx=True, ex=expires)
+        except RedisError:
+            logger.warning("Skipped %s: the job lock is unavailable", self.name)
+            return False
+        if not acquired:
+            logger.debug("Skipped %s: another worker runs it", self.name)
+        return bool(acquired)
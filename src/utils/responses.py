@@ -0,0 +1,115 @@
+"""
+Responses
+
+This module contains the fast response pipeline of the API.
+
+FastJSONResponse is the default response class of the application. It encodes
+with orjson, which handles datetimes and UUIDs natively, and switches to
+MessagePack when the client sends `Accept: application/msgpack` and the
+optional msgpack package is installed.
+
+Routes that return rows just read from the database can skip response model
+validation: `dump` copies the schema fields from an ORM object, and returning a
+FastJSONResponse directly bypasses FastAPI's re-validation of the result. The
+`response_model` of such routes is kept for the OpenAPI schema.
+
+Classes:
+- FastJSONResponse: orjson response with optional MessagePack.
+- ContentNegotiationMiddleware: Record whether the client accepts MessagePack.
+
+Functions:
+- accepts_msgpack: Whether the current response is encoded as MessagePack.
+- dump: Read the fields of a response schema from an object without validation.
+"""
+
+from contextvars import ContextVar
+from datetime import date, datetime
+from typing import Any
+from uuid import UUID
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+_accepts_msgpack: ContextVar[bool] = ContextVar("accepts_msgpack", default=False)
+
+
+def _orjson_default(value: Any) -> Any:
+    # asyncpg returns its own UUID subclass, which orjson does not encode natively.
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def accepts_msgpack() -> bool:
+    return msgpack is not None and _accepts_msgpack.get()
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if accepts_msgpack():
+            self.media_type = MSGPACK_MEDIA_TYPE
+            return msgpack.packb(content, default=_msgpack_default)
+        return orjson.dumps(
+            content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS
+        )
+
+
+class ContentNegotiationMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or msgpack is None:
+            await self.app(scope, receive, send)
+            return
+
+        accepts = any(
+            name == b"accept" and MSGPACK_MEDIA_TYPE.encode() in value
+            for name, value in scope["headers"]
+        )
+
+        async def send_with_vary(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"vary", b"Accept")]
+            await send(message)
+
+        token = _accepts_msgpack.set(accepts)
+        try:
+            await self.app(scope, receive, send_with_vary)
+        finally:
+            _accepts_msgpack.reset(token)
+
+
+def dump(schema: type[BaseModel], obj: Any, **extra) -> dict:
+    """
+    Read the fields of a response schema from an object without validation.
+
+    Use it only for data that already satisfies the schema, such as rows just
+    read from the database.
+
+    :param schema: type[BaseModel]: The response schema.
+    :param obj: Any: The ORM object or any object with the schema attributes.
+    :param extra: Values of fields the object does not have.
+    :return: A dictionary ready for FastJSONResponse.
+    """
+    data = {
+        name: getattr(obj, name) for name in schema.model_fields if name not in extra
+    }
+    data.update(extra)
+    return data
@@ -0,0 +1,39 @@
+"""
+Test Configuration
+
+The tests run against the offline environment of the benchmarks (see
+benchmarks.offline): a temporary SQLite database and fakeredis. Placeholder
+values are set for the settings that have no default, unless the environment
+already provides them.
+"""
+
+import os
+
+for name, value in {
+    "POSTGRES_DB": "test",
+    "POSTGRES_USER": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_HOST": "localhost",
+    "REDIS_HOST": "localhost",
+    "REDIS_PORT": "6379",
+    "SECRET_KEY": "test",
+    "ALGORITHM": "HS256",
+    "MAIL_USERNAME": "test",
+    "MAIL_PASSWORD": "test",
+    "MAIL_FROM": "test@example.com",
+    "MAIL_PORT": "465",
+    "MAIL_SERVER": "localhost",
+    "MAIL_FROM_NAME": "test",
+    "CLOUDINARY_NAME": "test",
+    "CLOUDINARY_API_KEY": "1",
+    "CLOUDINARY_API_SECRET": "test",
+}.items():
+    os.environ.setdefault(name, value)
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from benchmarks.offline import use_redis
+from src.database.cache.redis_conn import cache_database
+from src.stream.broker import EventBroker, Subscription, image_channel, publish_event
+
+pytestmark = pytest.mark.anyio
+
+
+async def _wait_until(condition, timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+async def test_events_fan_out_to_every_listener_of_the_image():
+    use_redis(None)
+    broker = EventBroker(10)
+    first = await broker.subscribe(1)
+    second = await broker.subscribe(1)
+    other = await broker.subscribe(2)
+    await _wait_until(lambda: broker._channels == {1, 2})
+
+    await publish_event(await cache_database(), 1, "comment.created", comment_id=7)
+    frames = await asyncio.wait_for(asyncio.gather(first.get(), second.get()), 2)
+
+    assert frames[0] == frames[1]
+    assert frames[0][0].startswith(b"event: comment.created\ndata: ")
+    assert not other._pending
+    await broker.close()
+    await cache_database.close()
+
+
+async def test_pending_events_are_bounded_and_counted():
+    subscription = Subscription(1, 3)
+    for i in range(5):
+        subscription.put("comment.created", b"%d" % i)
+    for i in range(3):
+        subscription.put("rating.updated", b"rating %d" % i)
+
+    frames = await subscription.get()
+
+    assert frames == [b'event: overflow\ndata: {"dropped":3}\n\n', b"3", b"4", b"rating 2"]
+
+
+async def test_unsubscribe_drops_the_channel_and_stops_the_listener():
+    use_redis(None)
+    broker = EventBroker(10)
+    subscription = await broker.subscribe(1)
+    await _wait_until(lambda: broker._channels == {1})
+
+    await broker.unsubscribe(subscription)
+    await _wait_until(lambda: broker._listener.done())
+
+    assert broker._subscriptions == {}
+    assert broker._channels == set()
+    assert broker.stats() == {"subscriptions": 0, "pending_events": 0}
+    await broker.close()
+    await cache_database.close()
+
+
+async def test_subscribe_succeeds_while_redis_is_down(monkeypatch):
+    monkeypatch.setattr(cache_database, "redis", None)
+    monkeypatch.setattr(cache_database, "redis_url", "redis://127.0.0.1:1/0")
+    monkeypatch.setattr(cache_database, "clients", {})
+    monkeypatch.setattr(cache_database, "pools", {})
+    broker = EventBroker(10)
+
+    subscription = await broker.subscribe(1)
+    await asyncio.sleep(0.2)
+
+    assert broker.stats()["subscriptions"] == 1
+    assert broker._channels == set()
+    assert not broker._listener.done()
+    await broker.unsubscribe(subscription)
+    await broker.close()
+
+
+async def test_malformed_events_do_not_stop_the_listener():
+    use_redis(None)
+    broker = EventBroker(10)
+    subscription = await broker.subscribe(1)
+    await _wait_until(lambda: broker._channels == {1})
+    redis = await cache_database()
+
+    await redis.publish(image_channel(1), b"not json")
+    await publish_event(redis, 1, "comment.deleted", comment_id=7)
+    frames = await asyncio.wait_for(subscription.get(), 2)
+
+    assert frames[0].startswith(b"event: comment.deleted\n")
+    await broker.close()
+    await cache_database.close()
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from benchmarks.offline import use_redis
+from src.database.cache.caching import cached, invalidate_keys
+from src.database.cache.redis_conn import cache_database
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def redis():
+    use_redis(None)
+    yield await cache_database()
+    await cache_database.close()
+
+
+async def test_cancelled_leader_does_not_cancel_waiters(redis):
+    release = asyncio.Event()
+    calls = []
+
+    @cached("test:{item_id}", ttl=60)
+    async def load(item_id: int) -> dict:
+        calls.append(item_id)
+        await release.wait()
+        return {"id": item_id}
+
+    leader = asyncio.create_task(load(1))
+    await asyncio.sleep(0.01)
+    waiter = asyncio.create_task(load(1))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    await asyncio.sleep(0.01)
+    release.set()
+
+    assert await waiter == {"id": 1}
+    assert leader.cancelled()
+    assert calls == [1]
+
+
+async def test_load_does_not_write_back_after_invalidation(redis):
+    release = asyncio.Event()
+    version = {"value": "old"}
+    calls = []
+
+    @cached("test:{item_id}", ttl=60)
+    async def load(item_id: int) -> dict:
+        calls.append(item_id)
+        value = version["value"]
+        await release.wait()
+        return {"value": value}
+
+    stale = asyncio.create_task(load(2))
+    await asyncio.sleep(0.01)
+    version["value"] = "new"
+    await invalidate_keys("test:2")
+    release.set()
+    assert await stale == {"value": "old"}
+
+    assert await load(2) == {"value": "new"}
+    assert await load(2) == {"value": "new"}
+    assert len(calls) == 2
+
+
+async def test_tag_invalidation_without_redis_drops_local_entries(monkeypatch):
+    from redis.exceptions import ConnectionError
+
+    from src.database.cache.caching import invalidate_tags
+    from src.database.cache.local import MISSING, local_cache
+
+    async def fail(*args, **kwargs):
+        raise ConnectionError("Redis is down")
+
+    monkeypatch.setattr(local_cache, "live", True)
+    local_cache.set("image:1", b"{}", 2)
+    local_cache.set("tag:top", b"[]", 2)
+    monkeypatch.setattr(cache_database, "pipelined", fail)
+
+    await invalidate_tags("image:1")
+
+    assert local_cache.get("image:1") is MISSING
+    assert local_cache.get("tag:top") == b"[]"
+    local_cache.clear()
@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import select
+
+from benchmarks.offline import Volumes, login, offline_app
+from src.database.sql.models import Comment
+from src.database.sql.postgres import database
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_pages_cover_every_comment_once_in_order():
+    volumes = Volumes(users=3, images=2, comments=25, ratings=1, tags=1, tags_per_image=1)
+    async with offline_app(volumes, lifespan=False) as env:
+        image_id = env.dataset.images[0]
+        async with database.async_session() as session:
+            expected = (
+                await session.scalars(
+                    select(Comment.id)
+                    .where(Comment.image_id == image_id)
+                    .order_by(Comment.created_at, Comment.id)
+                )
+            ).all()
+        assert len(expected) > 3
+
+        seen, cursor = [], None
+        async with env.client() as client:
+            headers = await login(client, env.dataset.users[0][1])
+            while True:
+                params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+                response = await client.get(
+                    f"/api/comment/by-image/{image_id}", params=params, headers=headers
+                )
+                assert response.status_code == 200
+                page = response.json()
+                assert len(page["items"]) <= 3
+                assert all(item["username"] for item in page["items"])
+                seen += [item["id"] for item in page["items"]]
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+
+            response = await client.get(
+                f"/api/comment/by-image/{image_id}",
+                params={"cursor": "not-a-cursor"},
+                headers=headers,
+            )
+
+        assert seen == list(expected)
+        assert response.status_code == 400
@@ -0,0 +1,38 @@
+import pytest
+
+from benchmarks.offline import Volumes, login, offline_app
+
+msgpack = pytest.importorskip("msgpack")
+pytestmark = pytest.mark.anyio
+
+MSGPACK = {"Accept": "application/msgpack"}
+
+
+@pytest.mark.parametrize("resource", ["image", "comment", "rating"])
+async def test_each_encoding_has_its_own_body_and_etag(resource):
+    volumes = Volumes(users=1, images=1, comments=1, ratings=1, tags=1, tags_per_image=1)
+    async with offline_app(volumes, lifespan=False) as env:
+        async with env.client() as client:
+            headers = await login(client, env.dataset.users[0][1])
+            path = f"/api/{resource}/1"
+
+            as_json = await client.get(path, headers=headers)
+            as_msgpack = await client.get(path, headers={**headers, **MSGPACK})
+
+            assert as_json.status_code == as_msgpack.status_code == 200
+            assert as_json.headers["content-type"] == "application/json"
+            assert as_msgpack.headers["content-type"] == "application/msgpack"
+            assert msgpack.unpackb(as_msgpack.content) == as_json.json()
+            assert as_json.headers["etag"] != as_msgpack.headers["etag"]
+
+            for response, accept in ((as_json, {}), (as_msgpack, MSGPACK)):
+                revalidated = await client.get(
+                    path,
+                    headers={**headers, **accept, "If-None-Match": response.headers["etag"]},
+                )
+                assert revalidated.status_code == 304
+            stale = await client.get(
+                path,
+                headers={**headers, **MSGPACK, "If-None-Match": as_json.headers["etag"]},
+            )
+            assert stale.status_code == 200
@@ -0,0 +1,38 @@
+import pytest
+
+from src.monitoring.health import HealthChecker
+
+pytestmark = pytest.mark.anyio
+
+
+async def _ok() -> None:
+    pass
+
+
+async def _down() -> None:
+    raise ConnectionError("down")
+
+
+async def test_failing_optional_dependency_degrades_but_stays_ready():
+    checker = HealthChecker(interval=60, timeout=1)
+    checker.add_check("postgres", _ok)
+    checker.add_check("redis", _down, critical=False)
+    assert checker.readiness() == (False, {"status": "starting"})
+
+    await checker.check()
+    ready, report = checker.readiness()
+
+    assert ready
+    assert report["status"] == "degraded"
+    assert report["dependencies"]["redis"]["error"] == "ConnectionError: down"
+    assert report["pools"]["postgres"]["capacity"] >= report["pools"]["postgres"]["size"]
+
+
+async def test_failing_critical_dependency_is_not_ready():
+    checker = HealthChecker(interval=60, timeout=1)
+    checker.add_check("postgres", _down)
+
+    await checker.check()
+
+    assert checker.readiness()[0] is False
+    assert checker.readiness()[1]["status"] == "failing"
@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import select, update
+
+from benchmarks.offline import Volumes, login, offline_app
+from src.database.sql.models import Image, ImageTag, Tag
+from src.database.sql.postgres import database
+from src.image.repository import ImageQuery
+
+pytestmark = pytest.mark.anyio
+
+
+async def _usage_counts(session) -> dict[int, int]:
+    return dict((await session.execute(select(Tag.id, Tag.usage_count))).all())
+
+
+async def test_delete_releases_the_tags_of_the_image():
+    volumes = Volumes(users=1, images=3, comments=1, ratings=1, tags=4, tags_per_image=3)
+    async with offline_app(volumes, lifespan=False) as env:
+        image_id = env.dataset.images[0]
+        async with database.async_session() as session:
+            before = await _usage_counts(session)
+            tag_ids = set(
+                (
+                    await session.scalars(
+                        select(ImageTag.tag_id).where(ImageTag.image_id == image_id)
+                    )
+                ).all()
+            )
+            await ImageQuery.delete(await session.get(Image, image_id), session)
+
+        async with database.async_session() as session:
+            after = await _usage_counts(session)
+        assert tag_ids
+        assert after == {
+            tag_id: count - (tag_id in tag_ids) for tag_id, count in before.items()
+        }
+
+
+async def test_counters_follow_writes_and_reconcile_repairs_drift():
+    volumes = Volumes(users=1, images=2, comments=1, ratings=1, tags=2, tags_per_image=1)
+    async with offline_app(volumes, lifespan=False) as env:
+        image_id = env.dataset.images[1]
+        async with database.async_session() as session:
+            before = await session.get(Image, image_id)
+            comments = before.comment_count
+        async with env.client() as client:
+            headers = await login(client, env.dataset.users[0][1])
+            response = await client.post(
+                "/api/comment/create",
+                json={"image_id": image_id, "text": "nice"},
+                headers=headers,
+            )
+            assert response.status_code == 201
+
+        async with database.async_session() as session:
+            assert (await session.get(Image, image_id)).comment_count == comments + 1
+            await session.execute(
+                update(Image).where(Image.id == image_id).values(comment_count=99, tag_count=0)
+            )
+            await session.commit()
+            assert await ImageQuery.reconcile_counters(session) == 1
+
+        async with database.async_session() as session:
+            image = await session.get(Image, image_id)
+            assert image.comment_count == comments + 1
+            assert image.tag_count == 1
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from benchmarks.offline import use_redis
+from src.database.cache.local import MISSING, LocalCache
+from src.database.cache.redis_conn import cache_database
+
+pytestmark = pytest.mark.anyio
+
+
+async def _wait_until(condition, timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+async def test_start_without_redis_disables_the_cache(monkeypatch):
+    monkeypatch.setattr(cache_database, "redis", None)
+    monkeypatch.setattr(cache_database, "redis_url", "redis://127.0.0.1:1/0")
+    monkeypatch.setattr(cache_database, "clients", {})
+    monkeypatch.setattr(cache_database, "pools", {})
+    cache = LocalCache(1 << 20, 30.0)
+    await cache.start()
+    await asyncio.sleep(0.2)
+    cache.set("image:1", {"id": 1}, 10)
+    assert cache.get("image:1") is MISSING
+    assert not cache.live
+    await cache.close()
+
+
+async def test_cache_is_used_once_subscribed():
+    use_redis(None)
+    cache = LocalCache(1 << 20, 30.0)
+    await cache.start()
+    await _wait_until(lambda: cache.live)
+    cache.set("image:1", {"id": 1}, 10)
+    assert cache.get("image:1") == {"id": 1}
+
+    redis = await cache_database()
+    await redis.publish("cache:invalidate", '["image:1"]')
+    await _wait_until(lambda: cache.get("image:1") is MISSING)
+    await cache.close()
+    await cache_database.close()
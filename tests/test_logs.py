@@ -0,0 +1,49 @@
+import json
+import logging
+import queue
+
+import pytest
+
+from benchmarks.offline import Volumes, offline_app
+from src.monitoring.logs import ContextQueueHandler, JSONFormatter, _request_id
+
+
+def _record(records: queue.SimpleQueue) -> dict:
+    return json.loads(JSONFormatter().format(records.get_nowait()))
+
+
+def test_records_carry_the_request_id_extra_fields_and_exception():
+    records = queue.SimpleQueue()
+    logger = logging.getLogger("tests.logs")
+    logger.addHandler(ContextQueueHandler(records))
+    logger.propagate = False
+    token = _request_id.set("req-1")
+    try:
+        logger.warning("Image %s missing", 7, extra={"image_id": 7})
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("Failed")
+    finally:
+        _request_id.reset(token)
+        logger.handlers.clear()
+
+    first = _record(records)
+    assert first["message"] == "Image 7 missing"
+    assert first["level"] == "WARNING"
+    assert first["request_id"] == "req-1"
+    assert first["image_id"] == 7
+    second = _record(records)
+    assert "ValueError: boom" in second["exception"]
+
+
+@pytest.mark.anyio
+async def test_responses_echo_or_assign_a_request_id():
+    volumes = Volumes(users=1, images=1, comments=1, ratings=1, tags=1, tags_per_image=1)
+    async with offline_app(volumes, lifespan=False) as env:
+        async with env.client() as client:
+            echoed = await client.get("/livez", headers={"X-Request-ID": "abc"})
+            assigned = await client.get("/livez")
+
+    assert echoed.headers["x-request-id"] == "abc"
+    assert len(assigned.headers["x-request-id"]) == 32
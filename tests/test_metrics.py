@@ -0,0 +1,26 @@
+import pytest
+
+from src.monitoring.metrics import Registry, _Metric
+
+
+def test_metrics_render_in_the_text_format():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests.", ("method",))
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    requests.labels("GET").inc()
+    requests.labels("GET").inc(2)
+    latency.observe(0.05)
+    latency.observe(5)
+
+    text = registry.expose()
+
+    assert 'requests_total{method="GET"} 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1.0"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+    assert "latency_seconds_count 2" in text
+
+
+def test_metric_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        _Metric("name", "documentation")
@@ -0,0 +1,39 @@
+import asyncio
+import time
+
+import pytest
+
+from src.monitoring.profiler import AWAIT_FRAME, Profile, Sampler
+
+pytestmark = pytest.mark.anyio
+
+
+async def _busy() -> None:
+    time.sleep(0.1)
+
+
+async def _waiting(event: asyncio.Event) -> None:
+    await event.wait()
+
+
+async def test_samples_running_and_waiting_tasks():
+    sampler = Sampler(0.005)
+    event = asyncio.Event()
+    waiting = asyncio.create_task(_waiting(event))
+    await asyncio.sleep(0)
+    waiting_profile = Profile("GET", "/waiting", "test")
+    sampler.add(waiting, waiting_profile)
+
+    busy_profile = Profile("GET", "/busy", "test")
+    sampler.add(asyncio.current_task(), busy_profile)
+    await _busy()
+    sampler.remove(asyncio.current_task())
+    event.set()
+    await waiting
+    sampler.remove(waiting)
+
+    assert any(stack[-1].startswith("_busy ") for stack in busy_profile.samples)
+    assert any(
+        stack[-1] == AWAIT_FRAME and any(frame.startswith("_waiting ") for frame in stack)
+        for stack in waiting_profile.samples
+    )
@@ -0,0 +1,70 @@
+import pytest
+from redis.exceptions import ConnectionError
+
+from benchmarks.offline import Volumes, login, offline_app
+from src.database.cache.redis_conn import cache_database
+from src.database.sql.postgres import database
+from src.ranking.repository import RankingQuery
+
+pytestmark = pytest.mark.anyio
+
+
+async def _trending(cache) -> dict[int, float]:
+    _, items = await RankingQuery.read_trending(1, 100, cache)
+    return dict(items)
+
+
+async def _rebuilt(cache) -> dict[int, float]:
+    async with database.async_session() as session:
+        await RankingQuery.rebuild(session, cache)
+    return await _trending(cache)
+
+
+async def test_trending_votes_match_rebuild():
+    volumes = Volumes(users=2, images=2, comments=1, ratings=1, tags=2, tags_per_image=1)
+    async with offline_app(volumes, lifespan=False) as env:
+        cache = await cache_database()
+        image_id = env.dataset.images[0]
+        seeded = await _rebuilt(cache)
+        async with env.client() as client:
+            headers = await login(client, env.dataset.users[0][1])
+            response = await client.post(
+                "/api/rating/create",
+                json={"image_id": image_id, "value": 1},
+                headers=headers,
+            )
+            rating_id = response.json()["id"]
+            for value in (5, 1, 5, 1, 5, 1):
+                response = await client.put(
+                    f"/api/rating/update/{rating_id}", json={"value": value}, headers=headers
+                )
+                assert response.status_code == 200
+            await client.post(
+                "/api/rating/create",
+                json={"image_id": image_id, "value": 4},
+                headers=headers,
+            )
+
+            live = await _trending(cache)
+            assert live == pytest.approx(await _rebuilt(cache))
+            assert live[image_id] - seeded.get(image_id, 0) == pytest.approx(4 / 5, rel=1e-3)
+
+            response = await client.delete(f"/api/rating/delete/{rating_id}", headers=headers)
+            assert response.status_code == 204
+            live = await _trending(cache)
+            assert live == pytest.approx(seeded, rel=1e-3)
+            assert live == pytest.approx(await _rebuilt(cache))
+
+
+@pytest.mark.parametrize("ranking", ["top", "trending"])
+async def test_rankings_answer_503_without_redis(monkeypatch, ranking):
+    volumes = Volumes(users=1, images=1, comments=1, ratings=1, tags=1, tags_per_image=1)
+    async with offline_app(volumes, lifespan=False) as env:
+
+        async def unavailable(*args):
+            raise ConnectionError("Redis is down")
+
+        monkeypatch.setattr(RankingQuery, "_read_page", unavailable)
+        async with env.client() as client:
+            response = await client.get(f"/api/ranking/{ranking}")
+        assert response.status_code == 503
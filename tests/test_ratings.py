@@ -0,0 +1,45 @@
+from collections import Counter, defaultdict
+
+import pytest
+from sqlalchemy import select
+
+from benchmarks.offline import Volumes, login, offline_app
+from src.database.sql.models import Rating, User
+from src.database.sql.postgres import database
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_summary_matches_the_ratings_of_each_image():
+    volumes = Volumes(users=4, images=5, comments=1, ratings=15, tags=1, tags_per_image=1)
+    async with offline_app(volumes, lifespan=False) as env:
+        email = env.dataset.users[0][1]
+        async with database.async_session() as session:
+            user_id = await session.scalar(select(User.id).where(User.email == email))
+            rows = (
+                await session.execute(select(Rating.image_id, Rating.owner_id, Rating.value))
+            ).all()
+        values = defaultdict(list)
+        for image_id, owner_id, value in rows:
+            values[image_id].append((owner_id, value))
+        image_ids = [*env.dataset.images, env.dataset.images[0]]
+
+        async with env.client() as client:
+            headers = await login(client, email)
+            response = await client.get(
+                "/api/rating/summary", params={"image_ids": image_ids}, headers=headers
+            )
+
+        assert response.status_code == 200
+        summaries = {item["image_id"]: item for item in response.json()}
+        assert sorted(summaries) == sorted(env.dataset.images)
+        for image_id, summary in summaries.items():
+            votes = [value for _, value in values[image_id]]
+            histogram = Counter(votes)
+            assert summary["count"] == len(votes)
+            assert summary["average"] == pytest.approx(
+                sum(votes) / len(votes) if votes else 0, abs=0.01
+            )
+            assert {int(k): v for k, v in summary["histogram"].items() if v} == histogram
+            mine = [value for owner_id, value in values[image_id] if owner_id == user_id]
+            assert summary["my_vote"] == (mine[0] if mine else None)
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+from redis.exceptions import ConnectionError
+
+from benchmarks.offline import use_redis
+from src.database.cache.redis_conn import cache_database
+from src.database.cache.sharding import HashRing
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_pool_stats_count_checked_out_connections():
+    use_redis(None)
+    redis = await cache_database()
+    await redis.ping()
+    assert cache_database.pool_stats()["in_use"] == 0
+
+    pool = redis.connection_pool
+    connections = [await pool.get_connection("PING") for _ in range(3)]
+    stats = cache_database.pool_stats()
+    assert stats["in_use"] == 3
+    assert stats["created"] == stats["in_use"] + stats["idle"]
+
+    await asyncio.gather(*(pool.release(connection) for connection in connections))
+    stats = cache_database.pool_stats()
+    assert stats["in_use"] == 0
+    assert stats["idle"] == stats["created"] == 3
+    await cache_database.close()
+
+
+async def test_pipelined_keeps_the_results_of_reachable_nodes(monkeypatch):
+    dead = "redis://127.0.0.1:1/0"
+    monkeypatch.setattr(cache_database, "ring", HashRing(["redis://live", dead], 160))
+    use_redis(None)
+    cache_database.clients.pop(dead)
+    cache_database.pools.pop(dead)
+    keys = [f"key:{n}" for n in range(20)]
+    live = [key for key in keys if cache_database.ring.node_for(key) != dead]
+    assert live and len(live) < len(keys)
+
+    results = await cache_database.pipelined(("set", key, "1") for key in keys)
+
+    for key, result in zip(keys, results):
+        if key in live:
+            assert result is True
+        else:
+            assert isinstance(result, ConnectionError)
+    assert await cache_database.mget(live) == [b"1"] * len(live)
+    await cache_database.close()
@@ -0,0 +1,80 @@
+import math
+from collections import Counter, defaultdict
+from itertools import combinations
+
+import pytest
+from sqlalchemy import select
+
+from benchmarks.offline import Volumes, login, offline_app
+from src.config import settings
+from src.database.cache.redis_conn import cache_database
+from src.database.sql.models import ImageTag
+from src.database.sql.postgres import database
+from src.tag.related import RelatedTagsQuery
+
+
+def _pair(low: int, high: int) -> int:
+    return low << 32 | high
+
+
+def test_neighbours_are_ranked_by_cosine_similarity(monkeypatch):
+    monkeypatch.setattr(settings, "tag_related_top_k", 2)
+    frequencies = {1: 100, 2: 10, 3: 4, 4: 1}
+    pairs = {_pair(1, 2): 10, _pair(1, 3): 4, _pair(2, 3): 2, _pair(1, 4): 1}
+
+    neighbours = RelatedTagsQuery.top_neighbours(frequencies, pairs)
+
+    assert sorted(neighbours[1], reverse=True) == [
+        (10 / math.sqrt(100 * 10), 2),
+        (4 / math.sqrt(100 * 4), 3),
+    ]
+    assert max(neighbours[3])[1] == 2
+    assert neighbours[4] == [(1 / math.sqrt(100 * 1), 1)]
+
+
+def test_pruning_keeps_the_pair_table_within_budget(monkeypatch):
+    monkeypatch.setattr(settings, "tag_related_max_pairs", 2)
+    pairs = {_pair(1, 2): 5, _pair(1, 3): 1, _pair(2, 3): 2, _pair(3, 4): 1}
+
+    floor = RelatedTagsQuery._prune(pairs, 0)
+
+    assert floor == 1
+    assert pairs == {_pair(1, 2): 5, _pair(2, 3): 2}
+
+
+@pytest.mark.anyio
+async def test_related_tags_match_a_brute_force_count():
+    volumes = Volumes(users=1, images=60, comments=1, ratings=1, tags=12, tags_per_image=4)
+    async with offline_app(volumes, lifespan=False) as env:
+        cache = await cache_database()
+        async with database.async_session() as session:
+            rows = (await session.execute(select(ImageTag.image_id, ImageTag.tag_id))).all()
+            await RelatedTagsQuery.compute(session, cache)
+
+        tags_by_image = defaultdict(set)
+        for image_id, tag_id in rows:
+            tags_by_image[image_id].add(tag_id)
+        frequencies = Counter(tag_id for _, tag_id in rows)
+        pairs = Counter(
+            pair for tags in tags_by_image.values() for pair in combinations(sorted(tags), 2)
+        )
+        tag_id, tag_name = 1, env.dataset.tags[0]
+        expected = {
+            (high if low == tag_id else low): count
+            / math.sqrt(frequencies[low] * frequencies[high])
+            for (low, high), count in pairs.items()
+            if tag_id in (low, high)
+        }
+
+        async with env.client() as client:
+            headers = await login(client, env.dataset.users[0][1])
+            response = await client.get(
+                f"/api/tag/{tag_name}/related", params={"limit": 50}, headers=headers
+            )
+        assert response.status_code == 200
+        related = response.json()
+        top_k = min(settings.tag_related_top_k, len(expected))
+        assert len(related) == top_k
+        scores = [item["score"] for item in related]
+        assert scores == sorted(scores, reverse=True)
+        assert scores[0] == pytest.approx(max(expected.values()))
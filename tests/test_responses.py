@@ -0,0 +1,39 @@
+import json
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from src.comment.schemas import CommentSchemaResponse
+from src.utils.responses import FastJSONResponse, dump
+
+
+class _DriverUUID(uuid.UUID):
+    """A UUID subclass, like the one asyncpg returns."""
+
+
+def test_fast_path_renders_what_the_schema_would():
+    comment = SimpleNamespace(
+        id=1,
+        owner_id=_DriverUUID(int=7),
+        image_id=2,
+        text="nice",
+        created_at=datetime(2026, 1, 2, 3, 4, 5, 678000),
+        updated_at=None,
+        internal="not a schema field",
+    )
+
+    body = FastJSONResponse(dump(CommentSchemaResponse, comment)).body
+
+    expected = CommentSchemaResponse.model_validate(comment, from_attributes=True)
+    assert json.loads(body) == expected.model_dump(mode="json")
+
+
+def test_dump_takes_extra_fields_over_attributes():
+    item = SimpleNamespace(id=1, owner_id=uuid.UUID(int=1), image_id=2, text="a")
+
+    data = dump(
+        CommentSchemaResponse, item, text="b", created_at=datetime(2026, 1, 1), updated_at=None
+    )
+
+    assert data["text"] == "b"
+    assert set(data) == set(CommentSchemaResponse.model_fields)
@@ -0,0 +1,22 @@
+import pytest
+
+pytest.importorskip("gunicorn")
+
+from server import worker_count  # noqa: E402
+from src.config import settings  # noqa: E402
+from src.database.sql.postgres import pool_limits  # noqa: E402
+
+
+def test_workers_are_capped_at_the_connection_limit(monkeypatch):
+    monkeypatch.setattr(settings, "web_concurrency", 200)
+    monkeypatch.setattr(settings, "db_max_connections", 80)
+
+    assert worker_count() == 80
+
+
+def test_pools_of_all_workers_fit_the_connection_limit(monkeypatch):
+    monkeypatch.setattr(settings, "db_max_connections", 80)
+    for workers in (1, 3, 16, 80):
+        pool_size, max_overflow = pool_limits(workers)
+        assert pool_size >= 1
+        assert workers * (pool_size + max_overflow) <= 80
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from benchmarks.offline import Volumes, offline_app
+from src.config import settings
+from src.database.sql.postgres import database
+from src.image.repository import ImageQuery
+from src.monitoring.slow_queries import parameters_shape, slow_query_log
+
+pytestmark = pytest.mark.anyio
+
+
+def test_parameters_are_described_by_type_only():
+    assert parameters_shape((1, "secret", [1, 2])) == "(int, str, list[2])"
+    assert parameters_shape({"id": 1}) == "{id: int}"
+    assert parameters_shape([(1,), (2,)], executemany=True) == "2 x (int)"
+
+
+async def test_slow_statements_are_grouped_and_explained(monkeypatch):
+    volumes = Volumes(users=1, images=3, comments=1, ratings=1, tags=1, tags_per_image=1)
+    async with offline_app(volumes, lifespan=False) as env:
+        monkeypatch.setattr(settings, "slow_query_threshold", 1e-9)
+        monkeypatch.setattr(settings, "slow_query_explain", True)
+        slow_query_log.entries.clear()
+        async with database.async_session() as session:
+            for image_id in env.dataset.images[:2]:
+                await ImageQuery.read(image_id, session)
+        monkeypatch.setattr(settings, "slow_query_threshold", 0.0)
+        while slow_query_log._explains:
+            await asyncio.sleep(0.01)
+
+        entries = [
+            entry
+            for entry in slow_query_log.entries.values()
+            if entry.caller.startswith("ImageQuery.read ")
+        ]
+        assert len(entries) == 1
+        assert entries[0].count == 2
+        assert entries[0].plan and not entries[0].plan.startswith("EXPLAIN failed")
+        slow_query_log.entries.clear()
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from src.database.sql.models import Image
+from src.monitoring.sql import statement_shape
+
+
+def _asyncpg_sql(statement) -> str:
+    dialect = asyncpg.dialect(paramstyle="numeric_dollar")
+    return str(statement.compile(dialect=dialect, compile_kwargs={"render_postcompile": True}))
+
+
+def test_in_lists_with_bind_casts_share_a_shape():
+    shapes = {
+        statement_shape(
+            _asyncpg_sql(
+                select(Image.id).where(
+                    Image.id.in_(ids),
+                    Image.created_at > datetime(2026, 1, 1),
+                    Image.title.in_(["a", "b"][: len(ids) % 2 + 1]),
+                )
+            )
+        )
+        for ids in ([1], [1, 2], [1, 2, 3, 4])
+    }
+    assert len(shapes) == 1
+    shape = shapes.pop()
+    assert "images.id IN ($?)" in shape
+    assert "images.created_at > $?" in shape
+    assert "::" not in shape
+
+
+def test_placeholders_without_casts_collapse():
+    assert statement_shape("SELECT 1 WHERE id IN ($1, $2, $3)") == "SELECT 1 WHERE id IN ($?)"
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import random
+
+import pytest
+
+from benchmarks.offline import use_redis
+from src.database.cache.redis_conn import cache_database
+from src.tag.index import ARRAY_MAX, EVENTS_CHANNEL, Bitmap, TagIndex
+
+
+def _bitmap(values) -> Bitmap:
+    bitmap = Bitmap()
+    for value in values:
+        bitmap.add(value)
+    return bitmap
+
+
+def _random_values(rng: random.Random, dense: bool) -> set[int]:
+    if dense:
+        # More than ARRAY_MAX members in the first chunk: a bitset container.
+        return set(rng.sample(range(1 << 16), ARRAY_MAX + 500)) | {70000, 200000}
+    return set(rng.sample(range(1 << 20), rng.randint(0, 50)))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_bitmap_matches_set(seed):
+    rng = random.Random(seed)
+    left = _random_values(rng, dense=seed % 2 == 0)
+    right = _random_values(rng, dense=seed % 3 == 0)
+    a, b = _bitmap(left), _bitmap(right)
+
+    for bitmap, expected in (
+        (a & b, left & right),
+        (a | b, left | right),
+        (a - b, left - right),
+        (b - a, right - left),
+    ):
+        assert list(bitmap.iter_from()) == sorted(expected)
+        assert len(bitmap) == len(expected)
+
+    after = rng.choice(sorted(left)) if left else 0
+    assert list(a.iter_from(after)) == sorted(v for v in left if v > after)
+
+    removed = set(rng.sample(sorted(left), len(left) // 2))
+    for value in removed:
+        a.discard(value)
+    assert list(a.iter_from()) == sorted(left - removed)
+    assert all(value in a for value in left - removed)
+    assert not any(value in a for value in removed)
+    assert list(b.iter_from()) == sorted(right)
+
+
+def test_union_does_not_share_containers():
+    a, b = _bitmap([1, 2]), _bitmap([3])
+    union = a | b
+    union.add(4)
+    a.discard(1)
+    assert list(union.iter_from()) == [1, 2, 3, 4]
+    assert list(a.iter_from()) == [2]
+
+
+@pytest.mark.anyio
+async def test_listener_skips_bad_events():
+    use_redis(None)
+    index = TagIndex()
+    await index.start()
+    redis = await cache_database()
+    while not await redis.pubsub_numsub(EVENTS_CHANNEL) == [(EVENTS_CHANNEL.encode(), 1)]:
+        await asyncio.sleep(0.01)
+
+    await redis.publish(EVENTS_CHANNEL, b"not json")
+    await redis.publish(EVENTS_CHANNEL, json.dumps({"image_id": 1}))
+    event = {"op": "tag", "image_id": 1, "tags": {"cat": 5}}
+    await redis.publish(EVENTS_CHANNEL, json.dumps(event))
+    for _ in range(200):
+        if 1 in index._images:
+            break
+        await asyncio.sleep(0.01)
+
+    assert index._tag_ids == {"cat": 5}
+    assert not index._listener.done()
+    await index.close()
+    await cache_database.close()
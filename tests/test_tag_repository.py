@@ -0,0 +1,33 @@
+import pytest
+
+from benchmarks.offline import Volumes, offline_app
+from src.database.sql.models import Image, Tag
+from src.database.sql.postgres import database
+from src.tag.repository import TagRepository
+from src.tag.schemas import TagSchemaRequest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_create_after_merge_in_another_worker():
+    volumes = Volumes(users=1, images=2, comments=1, ratings=1, tags=3, tags_per_image=1)
+    async with offline_app(volumes, lifespan=False) as env:
+        async with env.engine.connect() as connection:
+            # The single pooled SQLite connection enforces foreign keys from now on.
+            await connection.exec_driver_sql("PRAGMA foreign_keys=ON")
+        merged, target = env.dataset.tags[:2]
+        async with database.async_session() as session:
+            merged_id = await TagRepository.read_id(merged, session)
+            await TagRepository.merge([merged], target, session)
+        # Another worker merged the tags: this one still has the old ID cached.
+        TagRepository.tag_ids.set(merged, merged_id)
+
+        async with database.async_session() as session:
+            image = await session.get(Image, env.dataset.images[0])
+            attached = await TagRepository.create(
+                image, TagSchemaRequest(image_id=image.id, names=[merged]), session
+            )
+            tag = await session.get(Tag, attached[merged])
+
+        assert tag.name == merged
+        assert TagRepository.tag_ids.get(merged) == tag.id != merged_id
@@ -0,0 +1,27 @@
+import pytest
+
+from benchmarks.offline import Volumes, login, offline_app
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_only_admins_rename_and_merge_tags():
+    volumes = Volumes(users=2, images=2, comments=1, ratings=1, tags=3, tags_per_image=1)
+    async with offline_app(volumes, lifespan=False) as env:
+        first, second, third = env.dataset.tags
+        async with env.client() as client:
+            # The seeded role has every permission but is not the admin role.
+            moderator = await login(client, env.dataset.users[1][1])
+            admin = await login(client, env.dataset.users[0][1])
+            rename = {"name": first, "new_name": "renamed"}
+            merge = {"names": [second], "target": third}
+
+            response = await client.post("/api/tag/rename", json=rename, headers=moderator)
+            assert response.status_code == 403
+            response = await client.post("/api/tag/merge", json=merge, headers=moderator)
+            assert response.status_code == 403
+
+            response = await client.post("/api/tag/rename", json=rename, headers=admin)
+            assert response.status_code == 200
+            response = await client.post("/api/tag/merge", json=merge, headers=admin)
+            assert response.status_code == 200
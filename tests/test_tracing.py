@@ -0,0 +1,38 @@
+import json
+
+from src.monitoring.metrics import registry
+from src.monitoring.tracing import Span, SpanExporter
+
+
+def _span(name: str) -> Span:
+    return Span(name, "0" * 32, None)
+
+
+def test_full_queue_drops_spans_and_counts_them(tmp_path):
+    exporter = SpanExporter(str(tmp_path / "missing" / "spans.json"), "test", 2)
+    for i in range(5):
+        exporter.export(_span(f"span-{i}"))
+    exporter.close(timeout=0.1)
+
+    assert exporter.queue_depth() == 2
+    assert exporter.dropped == 3
+
+
+def test_close_writes_queued_spans(tmp_path):
+    target = tmp_path / "spans.json"
+    exporter = SpanExporter(str(target), "test", 100)
+    for i in range(3):
+        exporter.export(_span(f"span-{i}"))
+    exporter.close()
+
+    names = [
+        span["name"]
+        for line in target.read_text().splitlines()
+        for span in json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    ]
+    assert names == ["span-0", "span-1", "span-2"]
+    assert exporter.dropped == 0
+
+
+def test_dropped_spans_are_exported_as_a_metric():
+    assert "tracing_spans_dropped_total" in registry.expose()